@@ -210,25 +210,34 @@ class BackupsController(wsgi.Controller):
         """Returns a list of backups, transformed through view builder."""
         context = req.environ['cinder.context']
         filters = req.params.copy()
+        marker, limit, offset = common.get_pagination_params(filters)
+        sort_keys, sort_dirs = common.get_sort_params(filters)
 
         utils.remove_invalid_filter_options(context,
                                             filters,
                                             self._get_backup_filter_options())
 
+        if 'name' in sort_keys:
+            sort_keys[sort_keys.index('name')] = 'display_name'
+
         if 'name' in filters:
             filters['display_name'] = filters['name']
             del filters['name']
 
-        backups = self.backup_api.get_all(context, search_opts=filters)
+        backups = self.backup_api.get_all(context, search_opts=filters,
+                                          marker=marker,
+                                          limit=limit,
+                                          offset=offset,
+                                          sort_keys=sort_keys,
+                                          sort_dirs=sort_dirs)
         backup_count = len(backups)
-        limited_list = common.limited(backups.objects, req)
-        req.cache_db_backups(limited_list)
+        req.cache_db_backups(backups.objects)
 
         if is_detail:
-            backups = self._view_builder.detail_list(req, limited_list,
+            backups = self._view_builder.detail_list(req, backups.objects,
                                                      backup_count)
         else:
-            backups = self._view_builder.summary_list(req, limited_list,
+            backups = self._view_builder.summary_list(req, backups.objects,
                                                       backup_count)
         return backups
 
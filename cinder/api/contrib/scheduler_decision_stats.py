@@ -0,0 +1,64 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""The Scheduler Decision Stats extension"""
+
+from cinder.api import extensions
+from cinder.api.openstack import wsgi
+from cinder.scheduler import rpcapi
+
+
+def authorize(context, action_name):
+    action = 'scheduler_decision_stats:%s' % action_name
+    extensions.extension_authorizer('scheduler', action)(context)
+
+
+class SchedulerDecisionStatsController(wsgi.Controller):
+    """The Scheduler Decision Stats controller for the OpenStack API."""
+
+    def __init__(self):
+        self.scheduler_api = rpcapi.SchedulerAPI()
+        super(SchedulerDecisionStatsController, self).__init__()
+
+    def index(self, req):
+        """Return the cumulative cost of the scheduler filters and weighers.
+
+        For each filter: the number of calls, the seconds spent, the number
+        of hosts checked and the number of hosts eliminated.  For each
+        weigher: the number of calls, the seconds spent and the number of
+        hosts weighed.
+        """
+        context = req.environ['cinder.context']
+        authorize(context, 'get_decision_stats')
+
+        stats = self.scheduler_api.get_decision_stats(context)
+        return {'decision_stats': stats}
+
+
+class Scheduler_decision_stats(extensions.ExtensionDescriptor):
+    """Scheduler filters and weighers timing support."""
+
+    name = "Scheduler_decision_stats"
+    alias = "scheduler-decision-stats"
+    namespace = ("http://docs.openstack.org/volume/ext/"
+                 "scheduler-decision-stats/api/v1")
+    updated = "2015-09-01T00:00:00+00:00"
+
+    def get_resources(self):
+        resources = []
+        res = extensions.ResourceExtension(
+            Scheduler_decision_stats.alias,
+            SchedulerDecisionStatsController())
+
+        resources.append(res)
+
+        return resources
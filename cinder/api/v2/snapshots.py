@@ -138,10 +138,11 @@ class SnapshotsController(wsgi.Controller):
         """Returns a list of snapshots, transformed through entity_maker."""
         context = req.environ['cinder.context']
 
-        # pop out limit and offset , they are not search_opts
+        # pop out the pagination and sort parameters, they are not
+        # search_opts
         search_opts = req.GET.copy()
-        search_opts.pop('limit', None)
-        search_opts.pop('offset', None)
+        marker, limit, offset = common.get_pagination_params(search_opts)
+        sort_keys, sort_dirs = common.get_sort_params(search_opts)
 
         # filter out invalid option
         allowed_search_options = ('status', 'volume_id', 'name')
@@ -149,15 +150,22 @@ class SnapshotsController(wsgi.Controller):
                                             allowed_search_options)
 
         # NOTE(thingee): v2 API allows name instead of display_name
+        if 'name' in sort_keys:
+            sort_keys[sort_keys.index('name')] = 'display_name'
+
         if 'name' in search_opts:
             search_opts['display_name'] = search_opts['name']
             del search_opts['name']
 
         snapshots = self.volume_api.get_all_snapshots(context,
-                                                      search_opts=search_opts)
-        limited_list = common.limited(snapshots.objects, req)
-        req.cache_db_snapshots(limited_list)
-        res = [entity_maker(snapshot) for snapshot in limited_list]
+                                                      search_opts=search_opts,
+                                                      marker=marker,
+                                                      limit=limit,
+                                                      sort_keys=sort_keys,
+                                                      sort_dirs=sort_dirs,
+                                                      offset=offset)
+        req.cache_db_snapshots(snapshots.objects)
+        res = [entity_maker(snapshot) for snapshot in snapshots.objects]
         return {'snapshots': res}
 
     @wsgi.response(202)
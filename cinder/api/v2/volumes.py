@@ -53,6 +53,8 @@ CONF.register_opt(query_volume_filters_opt)
 LOG = logging.getLogger(__name__)
 SCHEDULER_HINTS_NAMESPACE =\
     "http://docs.openstack.org/block-service/ext/scheduler-hints/api/v2"
+# Volume columns used by the summary view of the volume lists
+SUMMARY_COLUMNS = ('id', 'display_name')
 
 
 def make_attachment(elem):
@@ -249,17 +251,22 @@ class VolumeController(wsgi.Controller):
             except (ValueError, SyntaxError):
                 LOG.debug('Could not evaluate value %s, assuming string', v)
 
+        # The summary list only shows the id and name of the volumes, so
+        # only these columns are fetched, without the volume relationships.
+        columns = None if is_detail else SUMMARY_COLUMNS
         volumes = self.volume_api.get_all(context, marker, limit,
                                           sort_keys=sort_keys,
                                           sort_dirs=sort_dirs,
                                           filters=filters,
                                           viewable_admin_meta=True,
-                                          offset=offset)
+                                          offset=offset,
+                                          columns=columns)
 
         volumes = [dict(vol) for vol in volumes]
 
-        for volume in volumes:
-            utils.add_visible_admin_metadata(volume)
+        if is_detail:
+            for volume in volumes:
+                utils.add_visible_admin_metadata(volume)
 
         req.cache_db_volumes(volumes)
 
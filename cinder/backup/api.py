@@ -98,7 +98,8 @@ class API(base.Base):
         backup.save()
         self.backup_rpcapi.delete_backup(context, backup)
 
-    def get_all(self, context, search_opts=None):
+    def get_all(self, context, search_opts=None, marker=None, limit=None,
+                sort_keys=None, sort_dirs=None, offset=None):
         check_policy(context, 'get_all')
 
         search_opts = search_opts or {}
@@ -106,12 +107,19 @@ class API(base.Base):
         if (context.is_admin and 'all_tenants' in search_opts):
             # Need to remove all_tenants to pass the filtering below.
             search_opts.pop('all_tenants', None)
-            backups = objects.BackupList.get_all(context, filters=search_opts)
+            backups = objects.BackupList.get_all(
+                context, filters=search_opts, marker=marker, limit=limit,
+                sort_keys=sort_keys, sort_dirs=sort_dirs, offset=offset)
         else:
             backups = objects.BackupList.get_all_by_project(
                 context,
                 context.project_id,
-                filters=search_opts
+                filters=search_opts,
+                marker=marker,
+                limit=limit,
+                sort_keys=sort_keys,
+                sort_dirs=sort_dirs,
+                offset=offset
             )
 
         return backups
@@ -22,11 +22,23 @@
 """
 
 import abc
+import binascii
+import collections
+import ctypes
+import ctypes.util
+import errno
 import hashlib
+import itertools
 import json
 import os
+import stat
+import struct
+import sys
+import tempfile
 
 import eventlet
+from eventlet import queue
+from eventlet import tpool
 from oslo_config import cfg
 from oslo_log import log as logging
 from oslo_service import loopingcall
@@ -45,12 +57,188 @@ LOG = logging.getLogger(__name__)
 chunkedbackup_service_opts = [
     cfg.StrOpt('backup_compression_algorithm',
                default='zlib',
-               help='Compression algorithm (None to disable)'),
+               help='Compression algorithm (None to disable). One of zlib, '
+                    'bz2, lz4 or zstd; lz4 and zstd need the lz4 and zstd '
+                    'python modules respectively.'),
+    cfg.IntOpt('backup_compression_sample_size',
+               default=64 * units.Ki,
+               help='Size in bytes of the sample of each chunk that is '
+                    'compressed first to decide whether the chunk is worth '
+                    'compressing at all. 0 disables the trial compression.'),
+    cfg.FloatOpt('backup_compression_bypass_ratio',
+                 default=0.95,
+                 help='Chunks whose sample does not compress below this '
+                      'ratio of its original size, such as already '
+                      'compressed or encrypted data, are stored '
+                      'uncompressed.'),
+    cfg.IntOpt('backup_max_inflight_chunks',
+               default=1,
+               help='Maximum number of chunks that are transferred '
+                    'concurrently while backing up or restoring a volume. '
+                    'When greater than 1, volume reads and writes, hashing '
+                    'and (de)compression (run in native threads) and object '
+                    'transfers overlap. The default of 1 processes chunks '
+                    'one after another.'),
+    cfg.BoolOpt('backup_dedup',
+                default=False,
+                help='Store backup chunks in a content addressed container '
+                     'shared by all backups, so that identical chunks are '
+                     'only stored once.'),
+    cfg.StrOpt('backup_dedup_container',
+               default='volumebackups_dedup',
+               help='Container holding the deduplicated backup chunks when '
+                    'backup_dedup is enabled.'),
+    cfg.IntOpt('backup_dedup_delete_delay',
+               default=5,
+               help='Seconds to wait, when deleting a backup, between marking '
+                    'the deduplicated chunks it was the last user of and '
+                    'checking again that no other backup started using '
+                    'them. It should exceed the time taken by new objects '
+                    'to show up in container listings.'),
+    cfg.IntOpt('backup_checkpoint_interval',
+               default=0,
+               help='Number of chunks after which the progress of a backup '
+                    'is checkpointed to the backup repository. A backup '
+                    'interrupted by a restart of the backup service is '
+                    'resumed from its last checkpoint. 0 disables '
+                    'checkpointing.'),
 ]
 
 CONF = cfg.CONF
 CONF.register_opts(chunkedbackup_service_opts)
 
+# The sha256 file starts with this magic, followed by the length of a JSON
+# header as a 4 bytes big endian integer, the header and the raw 32 bytes
+# SHA-256 digests of the sha blocks. Older backups have a JSON sha256 file.
+SHA256FILE_MAGIC = b'CINDER-SHA256-RAW\n'
+SHA256_DIGEST_SIZE = 32
+# Number of digests read or copied at once when streaming a sha256 file.
+SHA256_DIGESTS_PER_READ = 32 * units.Ki
+
+
+FALLOC_FL_KEEP_SIZE = 0x01
+FALLOC_FL_PUNCH_HOLE = 0x02
+_fallocate = None
+
+
+def _get_fallocate():
+    global _fallocate
+    if _fallocate is None:
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+            _fallocate = libc.fallocate64
+        except (AttributeError, OSError, TypeError):
+            _fallocate = False
+        else:
+            _fallocate.argtypes = [ctypes.c_int, ctypes.c_int,
+                                   ctypes.c_int64, ctypes.c_int64]
+    return _fallocate
+
+
+def _punch_hole(fileno, offset, length):
+    """Deallocate a range of a file or block device, which reads as zeros.
+
+    The range of a regular file past its end is already a hole, the file
+    is only extended up to the end of the range. Raises OSError if the
+    file or the platform does not support punching holes.
+    """
+    end = offset + length
+    st = os.fstat(fileno)
+    if stat.S_ISREG(st.st_mode) and offset >= st.st_size:
+        os.ftruncate(fileno, end)
+        return
+    fallocate = _get_fallocate()
+    if not fallocate:
+        raise OSError(errno.ENOSYS, os.strerror(errno.ENOSYS))
+    if fallocate(fileno, FALLOC_FL_KEEP_SIZE | FALLOC_FL_PUNCH_HOLE,
+                 offset, length) != 0:
+        err = ctypes.get_errno()
+        raise OSError(err, os.strerror(err))
+    if stat.S_ISREG(st.st_mode) and end > st.st_size:
+        os.ftruncate(fileno, end)
+
+
+class ChunkPool(object):
+    """Bounded pool of green threads transferring backup chunks.
+
+    Spawning blocks while the pool is full, which bounds the number of
+    chunks held in memory.  Failures of finished tasks are re-raised in
+    the caller.  A pool of size 1 runs every task synchronously in the
+    calling thread.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self._pool = eventlet.GreenPool(size) if size > 1 else None
+        self._pending = collections.deque()
+
+    def spawn(self, func, *args, **kwargs):
+        if self._pool is None:
+            func(*args, **kwargs)
+            return
+        self._reap()
+        self._pending.append(self._pool.spawn(func, *args, **kwargs))
+
+    def _reap(self):
+        for thread in [thread for thread in self._pending if thread.dead]:
+            self._pending.remove(thread)
+            thread.wait()
+
+    def imap_unordered(self, func, iterable):
+        """Yield func(item) for every item, in order of completion.
+
+        At most `size` items are being processed or waiting to be consumed
+        at any time. The items still being processed are killed when an
+        item fails or the caller stops consuming the results.
+        """
+        if self._pool is None:
+            for item in iterable:
+                yield func(item)
+            return
+
+        results = queue.LightQueue()
+
+        def _run(item):
+            try:
+                results.put((True, func(item)))
+            except Exception:
+                results.put((False, sys.exc_info()))
+
+        items = iter(iterable)
+        exhausted = False
+        outstanding = 0
+        threads = []
+        try:
+            while True:
+                while not exhausted and outstanding < self.size:
+                    try:
+                        item = next(items)
+                    except StopIteration:
+                        exhausted = True
+                        break
+                    threads = [thread for thread in threads
+                               if not thread.dead]
+                    threads.append(self._pool.spawn(_run, item))
+                    outstanding += 1
+                if not outstanding:
+                    return
+                succeeded, result = results.get()
+                outstanding -= 1
+                if not succeeded:
+                    six.reraise(*result)
+                yield result
+        finally:
+            for thread in threads:
+                thread.kill()
+
+    def waitall(self):
+        while self._pending:
+            self._pending.popleft().wait()
+
+    def killall(self):
+        while self._pending:
+            self._pending.popleft().kill()
+
 
 @six.add_metaclass(abc.ABCMeta)
 class ChunkedBackupDriver(driver.BackupDriver):
@@ -64,8 +252,11 @@ class ChunkedBackupDriver(driver.BackupDriver):
        Provides abstract methods to be implmented in concrete chunking drivers.
     """
 
-    DRIVER_VERSION = '1.0.0'
-    DRIVER_VERSION_MAPPING = {'1.0.0': '_restore_v1'}
+    # Version 1.1.0 records the all-zero extents of the volume, which are
+    # not stored as objects.
+    DRIVER_VERSION = '1.1.0'
+    DRIVER_VERSION_MAPPING = {'1.0.0': '_restore_v1',
+                              '1.1.0': '_restore_v1'}
 
     def _get_compressor(self, algorithm):
         try:
@@ -77,6 +268,12 @@ class ChunkedBackupDriver(driver.BackupDriver):
             elif algorithm.lower() in ('bz2', 'bzip2'):
                 import bz2 as compressor
                 return compressor
+            elif algorithm.lower() == 'lz4':
+                import lz4.frame as compressor
+                return compressor
+            elif algorithm.lower() in ('zstd', 'zstandard'):
+                import zstd as compressor
+                return compressor
         except ImportError:
             pass
 
@@ -98,8 +295,27 @@ class ChunkedBackupDriver(driver.BackupDriver):
         self.backup_compression_algorithm = CONF.backup_compression_algorithm
         self.compressor = \
             self._get_compressor(CONF.backup_compression_algorithm)
+        self.max_inflight_chunks = max(1, CONF.backup_max_inflight_chunks)
+        self._zero_shas = {}
+        self.dedup = CONF.backup_dedup
+        self.dedup_container = CONF.backup_dedup_container
+        # Chunk object referenced by the current backup for each key
+        self._dedup_refs = {}
+        self.checkpoint_interval = CONF.backup_checkpoint_interval
+        self.backup_stats = driver.BackupStats()
         self.support_force_delete = True
 
+    def _execute(self, func, *args):
+        """Run CPU or disk bound work, in a native thread if pipelining.
+
+        Running it in a native thread lets the green threads uploading
+        previous chunks make progress in the meantime.  The work must not
+        log nor touch green primitives.
+        """
+        if self.max_inflight_chunks > 1:
+            return tpool.execute(func, *args)
+        return func(*args)
+
     # To create your own "chunked" backup driver, implement the following
     # abstract methods.
 
@@ -184,8 +400,19 @@ class ChunkedBackupDriver(driver.BackupDriver):
         filename = '%s_sha256file' % object_name
         return filename
 
+    def _checkpoint_filename(self, backup):
+        object_name = backup['service_metadata']
+        filename = '%s_checkpoint' % object_name
+        return filename
+
+    def _checkpoint_sha256_filename(self, backup, index):
+        object_name = backup['service_metadata']
+        filename = '%s_checkpoint_sha256s-%05d' % (object_name, index)
+        return filename
+
     def _write_metadata(self, backup, volume_id, container, object_list,
-                        volume_meta, extra_metadata=None):
+                        volume_meta, extra_metadata=None, zero_extents=None,
+                        dedup_container=None, backup_stats=None):
         filename = self._metadata_filename(backup)
         LOG.debug('_write_metadata started, container name: %(container)s,'
                   ' metadata filename: %(filename)s.',
@@ -202,6 +429,12 @@ class ChunkedBackupDriver(driver.BackupDriver):
         metadata['volume_meta'] = volume_meta
         if extra_metadata:
             metadata['extra_metadata'] = extra_metadata
+        if zero_extents:
+            metadata['zero_extents'] = zero_extents
+        if dedup_container:
+            metadata['dedup_container'] = dedup_container
+        if backup_stats:
+            metadata['backup_stats'] = backup_stats
         metadata_json = json.dumps(metadata, sort_keys=True, indent=2)
         if six.PY3:
             metadata_json = metadata_json.encode('utf-8')
@@ -209,7 +442,8 @@ class ChunkedBackupDriver(driver.BackupDriver):
             writer.write(metadata_json)
         LOG.debug('_write_metadata finished. Metadata: %s.', metadata_json)
 
-    def _write_sha256file(self, backup, volume_id, container, sha256_list):
+    def _write_sha256file(self, backup, volume_id, container, sha256_file):
+        """Write the sha256 file from a file holding the raw digests."""
         filename = self._sha256_filename(backup)
         LOG.debug('_write_sha256file started, container name: %(container)s,'
                   ' sha256file filename: %(filename)s.',
@@ -222,14 +456,33 @@ class ChunkedBackupDriver(driver.BackupDriver):
         sha256file['backup_description'] = backup['display_description']
         sha256file['created_at'] = six.text_type(backup['created_at'])
         sha256file['chunk_size'] = self.sha_block_size_bytes
-        sha256file['sha256s'] = sha256_list
-        sha256file_json = json.dumps(sha256file, sort_keys=True, indent=2)
+        header_json = json.dumps(sha256file, sort_keys=True)
         if six.PY3:
-            sha256file_json = sha256file_json.encode('utf-8')
+            header_json = header_json.encode('utf-8')
+        sha256_file.seek(0)
         with self.get_object_writer(container, filename) as writer:
-            writer.write(sha256file_json)
+            writer.write(SHA256FILE_MAGIC)
+            writer.write(struct.pack('>I', len(header_json)))
+            writer.write(header_json)
+            self._copy_digests(sha256_file, writer)
         LOG.debug('_write_sha256file finished.')
 
+    def _copy_digests(self, src, dest, length=None):
+        """Copy raw digests from a file-like object to another one.
+
+        The digests are copied in bounded pieces, up to length bytes or to
+        the end of src.
+        """
+        while length is None or length > 0:
+            size = SHA256_DIGEST_SIZE * SHA256_DIGESTS_PER_READ
+            if length is not None:
+                size = min(size, length)
+                length -= size
+            digests = src.read(size)
+            if not digests:
+                break
+            dest.write(digests)
+
     def _read_metadata(self, backup):
         container = backup['container']
         filename = self._metadata_filename(backup)
@@ -244,22 +497,164 @@ class ChunkedBackupDriver(driver.BackupDriver):
         LOG.debug('_read_metadata finished. Metadata: %s.', metadata_json)
         return metadata
 
-    def _read_sha256file(self, backup):
+    def _write_checkpoint(self, backup, container, object_meta,
+                          object_sha256, offset):
+        """Record the progress of a backup up to an offset of the volume.
+
+        All of the chunks below the offset must be stored already. The
+        digests computed since the previous checkpoint are stored in an
+        object of their own, so that each checkpoint only uploads new ones,
+        before the checkpoint referencing them is written.
+        """
+        sha256_file = object_sha256['sha256s']
+        index = object_sha256['checkpoints'] + 1
+        end = sha256_file.tell()
+        sha256_file.seek(object_sha256['checkpoint_pos'])
+        with self.get_object_writer(
+                container,
+                self._checkpoint_sha256_filename(backup, index)) as writer:
+            self._copy_digests(sha256_file, writer,
+                               end - object_sha256['checkpoint_pos'])
+
+        checkpoint = {}
+        checkpoint['version'] = self.DRIVER_VERSION
+        checkpoint['backup_id'] = backup['id']
+        checkpoint['offset'] = offset
+        checkpoint['chunk_size'] = self.chunk_size_bytes
+        checkpoint['sha_block_size'] = self.sha_block_size_bytes
+        checkpoint['sha256_objects'] = index
+        checkpoint['objects'] = object_meta['list']
+        checkpoint['object_id'] = object_meta['id']
+        checkpoint['zero_extents'] = object_meta.get('zero_extents', [])
+        checkpoint['dedup_container'] = object_meta.get('dedup_container')
+        checkpoint_json = json.dumps(checkpoint, sort_keys=True)
+        if six.PY3:
+            checkpoint_json = checkpoint_json.encode('utf-8')
+        with self.get_object_writer(
+                container, self._checkpoint_filename(backup)) as writer:
+            writer.write(checkpoint_json)
+        object_sha256['checkpoints'] = index
+        object_sha256['checkpoint_pos'] = end
+        LOG.debug('Checkpointed backup %(backup_id)s at offset %(offset)d.',
+                  {'backup_id': backup['id'], 'offset': offset})
+
+    def _read_checkpoint(self, backup):
+        """Return the last checkpoint of an incomplete backup, if any.
+
+        Checkpoints taken with another chunk size, sha block size or dedup
+        setting than the current ones cannot be resumed from and are
+        ignored.
+        """
+        container = backup['container']
+        if not container or not backup['service_metadata']:
+            return None
+        filename = self._checkpoint_filename(backup)
+        try:
+            with self.get_object_reader(container, filename) as reader:
+                checkpoint_json = reader.read()
+            if six.PY3:
+                checkpoint_json = checkpoint_json.decode('utf-8')
+            checkpoint = json.loads(checkpoint_json)
+        except Exception:
+            LOG.debug('No checkpoint readable for backup %s.', backup['id'])
+            return None
+        dedup_container = self.dedup_container if self.dedup else None
+        if (checkpoint['backup_id'] != backup['id'] or
+                checkpoint['chunk_size'] != self.chunk_size_bytes or
+                checkpoint['sha_block_size'] != self.sha_block_size_bytes or
+                checkpoint['dedup_container'] != dedup_container):
+            LOG.info(_LI('Ignoring the checkpoint of backup %s taken with '
+                         'another configuration.'), backup['id'])
+            return None
+        return checkpoint
+
+    def _delete_checkpoint(self, backup, container, object_sha256):
+        if not object_sha256['checkpoints']:
+            return
+        self.delete_object(container, self._checkpoint_filename(backup))
+        for index in range(1, object_sha256['checkpoints'] + 1):
+            self.delete_object(container,
+                               self._checkpoint_sha256_filename(backup,
+                                                                index))
+
+    def has_checkpoint(self, backup):
+        return self._read_checkpoint(backup) is not None
+
+    def _delete_objects_past_checkpoint(self, backup, container, checkpoint):
+        """Delete the objects an interrupted backup stored after its last
+        checkpoint.
+
+        The resumed backup stores the rest of the volume again, possibly
+        split differently, so these objects would be left over.
+        """
+        keep = set(object_name for metadata_object in checkpoint['objects']
+                   for object_name in metadata_object)
+        keep.add(self._checkpoint_filename(backup))
+        for index in range(1, checkpoint['sha256_objects'] + 1):
+            keep.add(self._checkpoint_sha256_filename(backup, index))
+        for object_name in self._generate_object_names(backup):
+            if object_name in keep:
+                continue
+            self.delete_object(container, object_name)
+            LOG.debug('deleted object past the checkpoint: %(object_name)s'
+                      ' in container: %(container)s.',
+                      {'object_name': object_name, 'container': container})
+            eventlet.sleep(0)
+
+    def _iter_sha256file(self, backup):
+        """Stream the sha256 file of a backup.
+
+        The first item yielded is the header of the file, a dict with the
+        same keys as the JSON sha256 files of older backups except for
+        'sha256s'. It is followed by the raw digests of the sha blocks.
+        """
         container = backup['container']
         filename = self._sha256_filename(backup)
-        LOG.debug('_read_sha256file started, container name: %(container)s, '
+        LOG.debug('_iter_sha256file started, container name: %(container)s, '
                   'sha256 filename: %(filename)s.',
                   {'container': container, 'filename': filename})
         with self.get_object_reader(container, filename) as reader:
-            sha256file_json = reader.read()
-        if six.PY3:
-            sha256file_json = sha256file_json.decode('utf-8')
-        sha256file = json.loads(sha256file_json)
-        LOG.debug('_read_sha256file finished (%s).', sha256file)
+            magic = reader.read(len(SHA256FILE_MAGIC))
+            if magic != SHA256FILE_MAGIC:
+                sha256file_json = magic + reader.read()
+                if six.PY3:
+                    sha256file_json = sha256file_json.decode('utf-8')
+                sha256file = json.loads(sha256file_json)
+                sha256s = sha256file.pop('sha256s')
+                yield sha256file
+                for sha in sha256s:
+                    yield binascii.unhexlify(sha)
+                return
+
+            header_size = struct.unpack('>I', reader.read(4))[0]
+            header_json = reader.read(header_size)
+            if six.PY3:
+                header_json = header_json.decode('utf-8')
+            yield json.loads(header_json)
+            while True:
+                digests = reader.read(SHA256_DIGEST_SIZE *
+                                      SHA256_DIGESTS_PER_READ)
+                for off in range(0, len(digests), SHA256_DIGEST_SIZE):
+                    yield digests[off:off + SHA256_DIGEST_SIZE]
+                if len(digests) < (SHA256_DIGEST_SIZE *
+                                   SHA256_DIGESTS_PER_READ):
+                    break
+        LOG.debug('_iter_sha256file finished.')
+
+    def _read_sha256file(self, backup):
+        """Read a whole sha256 file, with the digests in hex form."""
+        sha256_iter = self._iter_sha256file(backup)
+        sha256file = next(sha256_iter)
+        sha256file['sha256s'] = [binascii.hexlify(sha).decode('ascii')
+                                 for sha in sha256_iter]
         return sha256file
 
-    def _prepare_backup(self, backup):
-        """Prepare the backup process and return the backup metadata."""
+    def _prepare_backup(self, backup, checkpoint=None):
+        """Prepare the backup process and return the backup metadata.
+
+        If a checkpoint is given, the backup metadata is that of the
+        interrupted backup at the time of the checkpoint.
+        """
         volume = self.db.volume_get(self.context, backup.volume_id)
 
         if volume['size'] <= 0:
@@ -268,9 +663,12 @@ class ChunkedBackupDriver(driver.BackupDriver):
 
         container = self._create_container(self.context, backup)
 
-        object_prefix = self._generate_object_name_prefix(backup)
-        backup.service_metadata = object_prefix
-        backup.save()
+        if checkpoint:
+            object_prefix = backup.service_metadata
+        else:
+            object_prefix = self._generate_object_name_prefix(backup)
+            backup.service_metadata = object_prefix
+            backup.save()
 
         volume_size_bytes = volume['size'] * units.Gi
         availability_zone = self.az
@@ -286,17 +684,50 @@ class ChunkedBackupDriver(driver.BackupDriver):
                   })
         object_meta = {'id': 1, 'list': [], 'prefix': object_prefix,
                        'volume_meta': None}
-        object_sha256 = {'id': 1, 'sha256s': [], 'prefix': object_prefix}
+        # The digests are spooled to a temporary file rather than kept in
+        # memory, as there are millions of them for large volumes.
+        object_sha256 = {'id': 1, 'sha256s': tempfile.TemporaryFile(),
+                         'prefix': object_prefix, 'checkpoints': 0,
+                         'checkpoint_pos': 0}
         extra_metadata = self.get_extra_metadata(backup, volume)
         if extra_metadata is not None:
             object_meta['extra_metadata'] = extra_metadata
+        if self.dedup:
+            self.put_container(self.dedup_container)
+            object_meta['dedup_container'] = self.dedup_container
+            self._dedup_refs = {}
+        if checkpoint:
+            object_meta['list'] = checkpoint['objects']
+            object_meta['id'] = checkpoint['object_id']
+            if checkpoint['zero_extents']:
+                object_meta['zero_extents'] = checkpoint['zero_extents']
+            sha256_file = object_sha256['sha256s']
+            for index in range(1, checkpoint['sha256_objects'] + 1):
+                with self.get_object_reader(
+                        container,
+                        self._checkpoint_sha256_filename(backup,
+                                                         index)) as reader:
+                    self._copy_digests(reader, sha256_file)
+            object_sha256['checkpoints'] = checkpoint['sha256_objects']
+            object_sha256['checkpoint_pos'] = sha256_file.tell()
 
         return (object_meta, object_sha256, extra_metadata, container,
                 volume_size_bytes)
 
     def _backup_chunk(self, backup, container, data, data_offset,
-                      object_meta, extra_metadata):
-        """Backup data chunk based on the object metadata and offset."""
+                      object_meta, extra_metadata, chunk_pool=None,
+                      shas=None):
+        """Backup data chunk based on the object metadata and offset.
+
+        The object is added to the object list right away so that the list
+        stays ordered by offset. If a chunk pool is given, compression and
+        upload of the data happen in one of its green threads.
+        """
+        if 'dedup_container' in object_meta:
+            self._backup_dedup_chunk(backup, data, data_offset, object_meta,
+                                     extra_metadata, chunk_pool, shas)
+            return
+
         object_prefix = object_meta['prefix']
         object_list = object_meta['list']
 
@@ -306,37 +737,228 @@ class ChunkedBackupDriver(driver.BackupDriver):
         obj[object_name] = {}
         obj[object_name]['offset'] = data_offset
         obj[object_name]['length'] = len(data)
+        object_list.append(obj)
+        object_id += 1
+        object_meta['list'] = object_list
+        object_meta['id'] = object_id
+
+        if chunk_pool is None:
+            self._write_chunk(container, object_name, obj[object_name], data,
+                              extra_metadata)
+        else:
+            chunk_pool.spawn(self._write_chunk, container, object_name,
+                             obj[object_name], data, extra_metadata)
+
+        LOG.debug('Calling eventlet.sleep(0)')
+        eventlet.sleep(0)
+
+    def _write_chunk(self, container, object_name, obj, data,
+                     extra_metadata):
+        """Compress a chunk and store it in the backup repository."""
         LOG.debug('Backing up chunk of data from volume.')
         algorithm, output_data = self._prepare_output_data(data)
-        obj[object_name]['compression'] = algorithm
+        obj['compression'] = algorithm
         LOG.debug('About to put_object')
-        with self.get_object_writer(
-                container, object_name, extra_metadata=extra_metadata
-        ) as writer:
-            writer.write(output_data)
+        with self.backup_stats.timed('upload'):
+            with self.get_object_writer(
+                    container, object_name, extra_metadata=extra_metadata
+            ) as writer:
+                writer.write(output_data)
+        self.backup_stats.bytes_stored += len(data)
+        self.backup_stats.bytes_uploaded += len(output_data)
         md5 = hashlib.md5(data).hexdigest()
-        obj[object_name]['md5'] = md5
+        obj['md5'] = md5
         LOG.debug('backup MD5 for %(object_name)s: %(md5)s',
                   {'object_name': object_name, 'md5': md5})
-        object_list.append(obj)
-        object_id += 1
-        object_meta['list'] = object_list
-        object_meta['id'] = object_id
 
-        LOG.debug('Calling eventlet.sleep(0)')
+    def _dedup_ref_name(self, key, backup_id):
+        return '%s.ref.%s' % (key, backup_id)
+
+    def _dedup_mark_name(self, key):
+        return '%s.deleting' % key
+
+    def _get_dedup_entries(self, key):
+        """Return the stored objects, the references and the deletion marks
+        of a chunk.
+        """
+        objects = []
+        refs = []
+        marks = []
+        for name in self.get_container_entries(self.dedup_container, key):
+            if name.startswith(key + '.ref.'):
+                refs.append(name)
+            elif name == self._dedup_mark_name(key):
+                marks.append(name)
+            else:
+                objects.append(name)
+        return objects, refs, marks
+
+    def _backup_dedup_chunk(self, backup, data, data_offset, object_meta,
+                            extra_metadata, chunk_pool, shas):
+        """Backup data chunk in the deduplicated chunk store.
+
+        Chunks are keyed by the SHA-256 of the SHA-256s of their sha blocks
+        and stored as '<key>.<compression>'. Every backup using a chunk
+        adds a '<key>.ref.<backup id>' reference object before looking the
+        chunk up, and the chunk is only uploaded if it is not stored yet.
+
+        Writing the reference first is what makes reusing a stored chunk
+        safe against a concurrent delete of its last other user: the
+        delete marks the chunk before listing its references a last time
+        (see _delete_dedup_references), so it either sees this reference
+        or the lookup below sees the mark. A marked chunk is not reused, a
+        copy named '<key>.<backup id>.<compression>' is uploaded instead,
+        which the delete has not listed and does not remove.
+
+        The reference and the lookup cost an empty PUT and a LIST, against
+        the upload of a whole chunk saved on every hit; they are only done
+        once per chunk and backup.
+        """
+        key = hashlib.sha256(b''.join(shas)).hexdigest()
+        obj = {}
+        object_meta['list'].append(obj)
+        object_meta['id'] += 1
+
+        object_name = self._dedup_refs.get(key)
+        marks = []
+        if object_name is None:
+            with self.get_object_writer(
+                    self.dedup_container,
+                    self._dedup_ref_name(key, backup.id),
+                    extra_metadata=extra_metadata) as writer:
+                writer.write(b'')
+            stored, _refs, marks = self._get_dedup_entries(key)
+            if stored and not marks:
+                object_name = stored[0]
+                self._dedup_refs[key] = object_name
+
+        if object_name is not None:
+            LOG.debug('Chunk %s is already stored, skipping upload.',
+                      object_name)
+            self.backup_stats.bytes_skipped += len(data)
+            obj[object_name] = {
+                'offset': data_offset,
+                'length': len(data),
+                'compression': object_name.rsplit('.', 1)[1],
+                'md5': hashlib.md5(data).hexdigest(),
+            }
+            eventlet.sleep(0)
+            return
+
+        if marks:
+            LOG.debug('Chunk %s is being deleted, storing a copy of it.',
+                      key)
+            object_key = '%s.%s' % (key, backup.id)
+        else:
+            object_key = key
+        if chunk_pool is None:
+            self._write_dedup_chunk(key, object_key, obj, data, data_offset,
+                                    extra_metadata)
+        else:
+            chunk_pool.spawn(self._write_dedup_chunk, key, object_key, obj,
+                             data, data_offset, extra_metadata)
+
         eventlet.sleep(0)
 
+    def _write_dedup_chunk(self, key, object_key, obj, data, data_offset,
+                           extra_metadata):
+        algorithm, output_data = self._prepare_output_data(data)
+        object_name = '%s.%s' % (object_key, algorithm)
+        with self.backup_stats.timed('upload'):
+            with self.get_object_writer(
+                    self.dedup_container, object_name,
+                    extra_metadata=extra_metadata) as writer:
+                writer.write(output_data)
+        self.backup_stats.bytes_stored += len(data)
+        self.backup_stats.bytes_uploaded += len(output_data)
+        obj[object_name] = {
+            'offset': data_offset,
+            'length': len(data),
+            'compression': algorithm,
+            'md5': hashlib.md5(data).hexdigest(),
+        }
+        self._dedup_refs[key] = object_name
+
+    def _find_dedup_references(self, backup, container):
+        """Return the keys of the chunks a backup holds references to.
+
+        This lists the whole deduplicated chunk store, it is only used for
+        backups which have no metadata listing their chunks, such as
+        cancelled or failed ones.
+        """
+        suffix = '.ref.%s' % backup['id']
+        return set(name.split('.', 1)[0]
+                   for name in self.get_container_entries(container, '')
+                   if name.endswith(suffix))
+
+    def _delete_dedup_references(self, backup, container, keys):
+        """Drop the references of a backup to the deduplicated chunks.
+
+        Chunks left without any reference are deleted. They are marked for
+        deletion first and their references are listed again once the
+        marks had time to show up in listings: a backup which referenced
+        one of them meanwhile either shows up then, and the chunk is kept,
+        or has seen the mark and stored a copy of its own.
+        """
+        unreferenced = []
+        for key in keys:
+            self.delete_object(container,
+                               self._dedup_ref_name(key, backup['id']))
+            _stored, refs, _marks = self._get_dedup_entries(key)
+            if not refs:
+                with self.get_object_writer(
+                        container, self._dedup_mark_name(key)) as writer:
+                    writer.write(b'')
+                unreferenced.append(key)
+            eventlet.sleep(0)
+
+        if unreferenced and CONF.backup_dedup_delete_delay > 0:
+            eventlet.sleep(CONF.backup_dedup_delete_delay)
+
+        for key in unreferenced:
+            stored, refs, _marks = self._get_dedup_entries(key)
+            if refs:
+                LOG.debug('Chunk %s was referenced again, keeping it.', key)
+                stored = []
+            for object_name in stored:
+                self.delete_object(container, object_name)
+                LOG.debug('deleted unreferenced object: %(object_name)s'
+                          ' in container: %(container)s.',
+                          {
+                              'object_name': object_name,
+                              'container': container
+                          })
+            self.delete_object(container, self._dedup_mark_name(key))
+            eventlet.sleep(0)
+
     def _prepare_output_data(self, data):
         if self.compressor is None:
             return 'none', data
         data_size_bytes = len(data)
-        compressed_data = self.compressor.compress(data)
+        sample_size = CONF.backup_compression_sample_size
+        if 0 < sample_size < data_size_bytes:
+            sample = data[:sample_size]
+            with self.backup_stats.timed('compress'):
+                comp_sample_size = len(
+                    self._execute(self.compressor.compress, sample))
+            if (comp_sample_size >=
+                    sample_size * CONF.backup_compression_bypass_ratio):
+                LOG.debug('Compression of a %(sample_size)d bytes sample of '
+                          'this chunk was ineffective: compressed length: '
+                          '%(comp_sample_size)d. Using original data for '
+                          'this chunk.',
+                          {'sample_size': sample_size,
+                           'comp_sample_size': comp_sample_size,
+                           })
+                return 'none', data
+        with self.backup_stats.timed('compress'):
+            compressed_data = self._execute(self.compressor.compress, data)
         comp_size_bytes = len(compressed_data)
         algorithm = CONF.backup_compression_algorithm.lower()
         if comp_size_bytes >= data_size_bytes:
             LOG.debug('Compression of this chunk was ineffective: '
                       'original length: %(data_size_bytes)d, '
-                      'compressed length: %(compressed_size_bytes)d. '
+                      'compressed length: %(comp_size_bytes)d. '
                       'Using original data for this chunk.',
                       {'data_size_bytes': data_size_bytes,
                        'comp_size_bytes': comp_size_bytes,
@@ -355,22 +977,84 @@ class ChunkedBackupDriver(driver.BackupDriver):
         object_list = object_meta['list']
         object_id = object_meta['id']
         volume_meta = object_meta['volume_meta']
-        sha256_list = object_sha256['sha256s']
+        sha256_file = object_sha256['sha256s']
         extra_metadata = object_meta.get('extra_metadata')
-        self._write_sha256file(backup,
-                               backup.volume_id,
-                               container,
-                               sha256_list)
-        self._write_metadata(backup,
-                             backup.volume_id,
-                             container,
-                             object_list,
-                             volume_meta,
-                             extra_metadata)
+        backup_stats = self.backup_stats.to_dict()
+        with self.backup_stats.timed('metadata'):
+            self._write_sha256file(backup,
+                                   backup.volume_id,
+                                   container,
+                                   sha256_file)
+            self._write_metadata(backup,
+                                 backup.volume_id,
+                                 container,
+                                 object_list,
+                                 volume_meta,
+                                 extra_metadata,
+                                 object_meta.get('zero_extents'),
+                                 object_meta.get('dedup_container'),
+                                 backup_stats)
         backup.object_count = object_id
+        backup.stats = json.dumps(backup_stats, sort_keys=True)
         backup.save()
         LOG.debug('backup %s finished.', backup['id'])
 
+    def _calculate_shas(self, data):
+        """Return the SHA-256 digest of each sha block of the given data."""
+        shalist = []
+        off = 0
+        datalen = len(data)
+        while off < datalen:
+            chunk_start = off
+            chunk_end = chunk_start + self.sha_block_size_bytes
+            if chunk_end > datalen:
+                chunk_end = datalen
+            chunk = data[chunk_start:chunk_end]
+            sha = hashlib.sha256(chunk).digest()
+            shalist.append(sha)
+            off += self.sha_block_size_bytes
+        return shalist
+
+    def _zero_sha(self, length):
+        """Return the SHA-256 digest of a block of zeros of some length."""
+        if length not in self._zero_shas:
+            self._zero_shas[length] = hashlib.sha256(b'\0' * length).digest()
+        return self._zero_shas[length]
+
+    def _find_extents(self, data, shalist, parent_shalist=None):
+        """Split a chunk of data into the extents that must be backed up.
+
+        Yields (is_zero, start, end) tuples covering the runs of sha blocks
+        that changed since the parent backup, or all of them for a full
+        backup. Runs of blocks made only of zeros are yielded separately.
+        """
+        datalen = len(data)
+        extent_kind = None
+        extent_off = -1
+        for idx, sha in enumerate(shalist):
+            block_off = idx * self.sha_block_size_bytes
+            if (parent_shalist is not None and idx < len(parent_shalist) and
+                    sha == parent_shalist[idx]):
+                kind = None
+            else:
+                block_len = min(self.sha_block_size_bytes,
+                                datalen - block_off)
+                kind = 'zero' if sha == self._zero_sha(block_len) else 'data'
+            if kind != extent_kind:
+                if extent_kind is not None:
+                    yield extent_kind == 'zero', extent_off, block_off
+                extent_kind = kind
+                extent_off = block_off
+        if extent_kind is not None:
+            yield extent_kind == 'zero', extent_off, datalen
+
+    def _add_zero_extent(self, object_meta, offset, length):
+        zero_extents = object_meta.setdefault('zero_extents', [])
+        if zero_extents and sum(zero_extents[-1]) == offset:
+            zero_extents[-1][1] += length
+        else:
+            zero_extents.append([offset, length])
+
     def _backup_metadata(self, backup, object_meta):
         """Backup volume metadata.
 
@@ -379,7 +1063,8 @@ class ChunkedBackupDriver(driver.BackupDriver):
                        We must also be sure that the service that will perform
                        the restore is compatible with version used.
         """
-        json_meta = self.get_metadata(backup['volume_id'])
+        with self.backup_stats.timed('metadata'):
+            json_meta = self.get_metadata(backup['volume_id'])
         if not json_meta:
             LOG.debug("No volume metadata to backup.")
             return
@@ -388,6 +1073,7 @@ class ChunkedBackupDriver(driver.BackupDriver):
 
     def _send_progress_end(self, context, backup, object_meta):
         object_meta['backup_percent'] = 100
+        object_meta['backup_stats'] = self.backup_stats.to_dict()
         volume_utils.notify_about_backup_usage(context,
                                                backup,
                                                "createprogress",
@@ -398,6 +1084,7 @@ class ChunkedBackupDriver(driver.BackupDriver):
                                     total_block_sent_num, total_volume_size):
         backup_percent = total_block_sent_num * 100 / total_volume_size
         object_meta['backup_percent'] = backup_percent
+        object_meta['backup_stats'] = self.backup_stats.to_dict()
         volume_utils.notify_about_backup_usage(context,
                                                backup,
                                                "createprogress",
@@ -408,22 +1095,27 @@ class ChunkedBackupDriver(driver.BackupDriver):
         """Backup the given volume.
 
            If backup['parent_id'] is given, then an incremental backup
-           is performed.
+           is performed. If the backup was interrupted after a checkpoint,
+           it is resumed from there.
         """
         if self.chunk_size_bytes % self.sha_block_size_bytes:
             err = _('Chunk size is not multiple of '
                     'block size for creating hash.')
             raise exception.InvalidBackup(reason=err)
 
+        checkpoint = self._read_checkpoint(backup)
+
         # Read the shafile of the parent backup if backup['parent_id']
         # is given.
+        # The parent's digests are streamed and compared as the volume is
+        # read, so that they are never all held in memory.
         parent_backup_shafile = None
         parent_backup = None
         if backup.parent_id:
             parent_backup = objects.Backup.get_by_id(self.context,
                                                      backup.parent_id)
-            parent_backup_shafile = self._read_sha256file(parent_backup)
-            parent_backup_shalist = parent_backup_shafile['sha256s']
+            parent_backup_shas = self._iter_sha256file(parent_backup)
+            parent_backup_shafile = next(parent_backup_shas)
             if (parent_backup_shafile['chunk_size'] !=
                     self.sha_block_size_bytes):
                 err = (_('Hash block size has changed since the last '
@@ -440,8 +1132,25 @@ class ChunkedBackupDriver(driver.BackupDriver):
                 raise exception.InvalidBackup(reason=err)
 
         (object_meta, object_sha256, extra_metadata, container,
-         volume_size_bytes) = self._prepare_backup(backup)
-
+         volume_size_bytes) = self._prepare_backup(backup, checkpoint)
+
+        if checkpoint:
+            LOG.info(_LI('Resuming backup %(backup_id)s from offset '
+                         '%(offset)d.'),
+                     {'backup_id': backup.id, 'offset': checkpoint['offset']})
+            self._delete_objects_past_checkpoint(backup, container,
+                                                 checkpoint)
+            volume_file.seek(checkpoint['offset'])
+            if parent_backup:
+                # Skip the digests of the part of the volume backed up
+                # already.
+                done_shas = (object_sha256['checkpoint_pos'] //
+                             SHA256_DIGEST_SIZE)
+                collections.deque(itertools.islice(parent_backup_shas,
+                                                   done_shas), maxlen=0)
+
+        self.backup_stats = driver.BackupStats()
+        checkpoint_counter = 0
         counter = 0
         total_block_sent_num = 0
 
@@ -460,99 +1169,109 @@ class ChunkedBackupDriver(driver.BackupDriver):
         if self.enable_progress_timer:
             timer.start(interval=self.backup_timer_interval)
 
-        sha256_list = object_sha256['sha256s']
-        shaindex = 0
+        sha256_file = object_sha256['sha256s']
         is_backup_canceled = False
-        while True:
-            # First of all, we check the status of this backup. If it
-            # has been changed to delete or has been deleted, we cancel the
-            # backup process to do forcing delete.
-            backup = objects.Backup.get_by_id(self.context, backup.id)
-            if 'deleting' == backup.status or 'deleted' == backup.status:
-                is_backup_canceled = True
-                # To avoid the chunk left when deletion complete, need to
-                # clean up the object of chunk again.
-                self.delete(backup)
-                LOG.debug('Cancel the backup process of %s.', backup.id)
-                break
-            data_offset = volume_file.tell()
-            data = volume_file.read(self.chunk_size_bytes)
-            if data == b'':
-                break
-
-            # Calculate new shas with the datablock.
-            shalist = []
-            off = 0
-            datalen = len(data)
-            while off < datalen:
-                chunk_start = off
-                chunk_end = chunk_start + self.sha_block_size_bytes
-                if chunk_end > datalen:
-                    chunk_end = datalen
-                chunk = data[chunk_start:chunk_end]
-                sha = hashlib.sha256(chunk).hexdigest()
-                shalist.append(sha)
-                off += self.sha_block_size_bytes
-            sha256_list.extend(shalist)
-
-            # If parent_backup is not None, that means an incremental
-            # backup will be performed.
-            if parent_backup:
-                # Find the extent that needs to be backed up.
-                extent_off = -1
-                for idx, sha in enumerate(shalist):
-                    if sha != parent_backup_shalist[shaindex]:
-                        if extent_off == -1:
-                            # Start of new extent.
-                            extent_off = idx * self.sha_block_size_bytes
-                    else:
-                        if extent_off != -1:
-                            # We've reached the end of extent.
-                            extent_end = idx * self.sha_block_size_bytes
-                            segment = data[extent_off:extent_end]
-                            self._backup_chunk(backup, container, segment,
-                                               data_offset + extent_off,
-                                               object_meta,
-                                               extra_metadata)
-                            extent_off = -1
-                    shaindex += 1
-
-                # The last extent extends to the end of data buffer.
-                if extent_off != -1:
-                    extent_end = datalen
+        chunk_pool = ChunkPool(self.max_inflight_chunks)
+        try:
+            while True:
+                # First of all, we check the status of this backup. If it
+                # has been changed to delete or has been deleted, we cancel
+                # the backup process to do forcing delete.
+                backup = objects.Backup.get_by_id(self.context, backup.id)
+                if 'deleting' == backup.status or 'deleted' == backup.status:
+                    is_backup_canceled = True
+                    # Let in-flight uploads settle so that the deletion
+                    # below sees all of the objects.
+                    chunk_pool.waitall()
+                    # To avoid the chunk left when deletion complete, need to
+                    # clean up the object of chunk again.
+                    self.delete(backup)
+                    LOG.debug('Cancel the backup process of %s.', backup.id)
+                    break
+                data_offset = volume_file.tell()
+                with self.backup_stats.timed('read'):
+                    data = self._execute(volume_file.read,
+                                         self.chunk_size_bytes)
+                if data == b'':
+                    break
+                self.backup_stats.bytes_read += len(data)
+
+                # Calculate new shas with the datablock.
+                with self.backup_stats.timed('hash'):
+                    shalist = self._execute(self._calculate_shas, data)
+                sha256_file.write(b''.join(shalist))
+
+                # If parent_backup is not None, that means an incremental
+                # backup will be performed and only the extents that changed
+                # since the parent backup are stored.
+                parent_shas = None
+                if parent_backup:
+                    parent_shas = list(itertools.islice(parent_backup_shas,
+                                                        len(shalist)))
+                skipped = len(data)
+                for is_zero, extent_off, extent_end in self._find_extents(
+                        data, shalist, parent_shas):
+                    if is_zero:
+                        # All-zero extents are only recorded in the metadata.
+                        self._add_zero_extent(object_meta,
+                                              data_offset + extent_off,
+                                              extent_end - extent_off)
+                        continue
                     segment = data[extent_off:extent_end]
+                    skipped -= len(segment)
+                    bs = self.sha_block_size_bytes
+                    block_shas = shalist[extent_off // bs:
+                                         (extent_end + bs - 1) // bs]
                     self._backup_chunk(backup, container, segment,
                                        data_offset + extent_off,
-                                       object_meta, extra_metadata)
-                    extent_off = -1
-            else:  # Do a full backup.
-                self._backup_chunk(backup, container, data, data_offset,
-                                   object_meta, extra_metadata)
-
-            # Notifications
-            total_block_sent_num += self.data_block_num
-            counter += 1
-            if counter == self.data_block_num:
-                # Send the notification to Ceilometer when the chunk
-                # number reaches the data_block_num.  The backup percentage
-                # is put in the metadata as the extra information.
-                self._send_progress_notification(self.context, backup,
-                                                 object_meta,
-                                                 total_block_sent_num,
-                                                 volume_size_bytes)
-                # Reset the counter
-                counter = 0
+                                       object_meta, extra_metadata,
+                                       chunk_pool, block_shas)
+                self.backup_stats.bytes_skipped += skipped
+
+                # Notifications
+                total_block_sent_num += self.data_block_num
+                counter += 1
+                if counter == self.data_block_num:
+                    # Send the notification to Ceilometer when the chunk
+                    # number reaches the data_block_num.  The backup
+                    # percentage is put in the metadata as the extra
+                    # information.
+                    self._send_progress_notification(self.context, backup,
+                                                     object_meta,
+                                                     total_block_sent_num,
+                                                     volume_size_bytes)
+                    # Reset the counter
+                    counter = 0
+
+                checkpoint_counter += 1
+                if checkpoint_counter == self.checkpoint_interval:
+                    # The chunks must be stored before the checkpoint
+                    # referencing them is written.
+                    chunk_pool.waitall()
+                    self._write_checkpoint(backup, container, object_meta,
+                                           object_sha256,
+                                           data_offset + len(data))
+                    checkpoint_counter = 0
+
+            # All of the chunks must be stored before the metadata
+            # referencing them is written.
+            chunk_pool.waitall()
+        except Exception:
+            with excutils.save_and_reraise_exception():
+                chunk_pool.killall()
+                timer.stop()
+                sha256_file.close()
+        finally:
+            if parent_backup:
+                parent_backup_shas.close()
 
         # Stop the timer.
         timer.stop()
         # If backup has been cancelled we have nothing more to do
         # but timer.stop().
         if is_backup_canceled:
+            sha256_file.close()
             return
-        # All the data have been sent, the backup_percent reaches 100.
-        self._send_progress_end(self.context, backup, object_meta)
-
-        object_sha256['sha256s'] = sha256_list
         if backup_metadata:
             try:
                 self._backup_metadata(backup, object_meta)
@@ -562,8 +1281,16 @@ class ChunkedBackupDriver(driver.BackupDriver):
                     LOG.exception(_LE("Backup volume metadata failed: %s."),
                                   err)
                     self.delete(backup)
+                    sha256_file.close()
 
         self._finalize_backup(backup, container, object_meta, object_sha256)
+        sha256_file.close()
+        self._delete_checkpoint(backup, container, object_sha256)
+        # All the data have been sent, the backup_percent reaches 100.
+        self._send_progress_end(self.context, backup, object_meta)
+        LOG.info(_LI('Backup %(backup_id)s stats: %(stats)s.'),
+                 {'backup_id': backup.id,
+                  'stats': self.backup_stats.to_dict()})
 
     def _restore_v1(self, backup, volume_id, metadata, volume_file):
         """Restore a v1 volume backup."""
@@ -576,17 +1303,22 @@ class ChunkedBackupDriver(driver.BackupDriver):
         for obj in metadata_objects:
             metadata_object_names.extend(obj.keys())
         LOG.debug('metadata_object_names = %s.', metadata_object_names)
-        prune_list = [self._metadata_filename(backup),
-                      self._sha256_filename(backup)]
-        object_names = [object_name for object_name in
-                        self._generate_object_names(backup)
-                        if object_name not in prune_list]
-        if sorted(object_names) != sorted(metadata_object_names):
-            err = _('restore_backup aborted, actual object list '
-                    'does not match object list stored in metadata.')
-            raise exception.InvalidBackup(reason=err)
+        if 'dedup_container' in metadata:
+            # The chunks are shared with other backups, so the container
+            # listing can't be compared with the metadata.
+            container = metadata['dedup_container']
+        else:
+            prune_list = [self._metadata_filename(backup),
+                          self._sha256_filename(backup)]
+            object_names = [object_name for object_name in
+                            self._generate_object_names(backup)
+                            if object_name not in prune_list]
+            if sorted(object_names) != sorted(metadata_object_names):
+                err = _('restore_backup aborted, actual object list '
+                        'does not match object list stored in metadata.')
+                raise exception.InvalidBackup(reason=err)
 
-        for metadata_object in metadata_objects:
+        def _fetch(metadata_object):
             object_name, obj = list(metadata_object.items())[0]
             LOG.debug('restoring object. backup: %(backup_id)s, '
                       'container: %(container)s, object name: '
@@ -597,21 +1329,19 @@ class ChunkedBackupDriver(driver.BackupDriver):
                           'object_name': object_name,
                           'volume_id': volume_id,
                       })
+            data = self._read_object(container, object_name,
+                                     obj['compression'], extra_metadata)
+            return obj, data
+
+        for offset, length in metadata.get('zero_extents', []):
+            self._restore_zero_extent(volume_file, offset, length)
 
-            with self.get_object_reader(
-                    container, object_name,
-                    extra_metadata=extra_metadata) as reader:
-                body = reader.read()
-            compression_algorithm = metadata_object[object_name]['compression']
-            decompressor = self._get_compressor(compression_algorithm)
+        # Objects are fetched and decompressed concurrently and written in
+        # the order they complete; they never overlap within a backup.
+        chunk_pool = ChunkPool(self.max_inflight_chunks)
+        for obj, data in chunk_pool.imap_unordered(_fetch, metadata_objects):
             volume_file.seek(obj['offset'])
-            if decompressor is not None:
-                LOG.debug('decompressing data using %s algorithm',
-                          compression_algorithm)
-                decompressed = decompressor.decompress(body)
-                volume_file.write(decompressed)
-            else:
-                volume_file.write(body)
+            volume_file.write(data)
 
             # force flush every write to avoid long blocking write on close
             volume_file.flush()
@@ -633,6 +1363,45 @@ class ChunkedBackupDriver(driver.BackupDriver):
         LOG.debug('v1 volume backup restore of %s finished.',
                   backup_id)
 
+    def _restore_zero_extent(self, volume_file, offset, length):
+        """Make an extent of the volume read as zeros.
+
+        A hole is punched over the extent when the volume file supports it,
+        which leaves the extent unallocated on thin volumes. Zeros are
+        written over the extent otherwise.
+        """
+        LOG.debug('restoring zero extent at offset %(offset)d, length '
+                  '%(length)d.', {'offset': offset, 'length': length})
+        volume_file.flush()
+        try:
+            _punch_hole(volume_file.fileno(), offset, length)
+            return
+        except (AttributeError, IOError, OSError, ValueError) as err:
+            LOG.debug('Cannot punch a hole in the volume file, writing '
+                      'zeros: %s', err)
+        end = offset + length
+        volume_file.seek(offset)
+        while offset < end:
+            block_len = min(units.Mi, end - offset)
+            volume_file.write(b'\0' * block_len)
+            offset += block_len
+            eventlet.sleep(0)
+        volume_file.flush()
+
+    def _read_object(self, container, object_name, compression_algorithm,
+                     extra_metadata=None):
+        """Read an object from the backup repository and decompress it."""
+        with self.get_object_reader(
+                container, object_name,
+                extra_metadata=extra_metadata) as reader:
+            body = reader.read()
+        decompressor = self._get_compressor(compression_algorithm)
+        if decompressor is None:
+            return body
+        LOG.debug('decompressing data using %s algorithm',
+                  compression_algorithm)
+        return self._execute(decompressor.decompress, body)
+
     def restore(self, backup, volume_id, volume_file):
         """Restore the given volume backup from backup repository."""
         backup_id = backup['id']
@@ -702,6 +1471,34 @@ class ChunkedBackupDriver(driver.BackupDriver):
                    'pre': backup['service_metadata']})
 
         if container is not None:
+            metadata = None
+            try:
+                metadata = self._read_metadata(backup)
+            except Exception:
+                LOG.debug('No metadata readable for backup %s.',
+                          backup['id'])
+            if metadata and 'dedup_container' in metadata:
+                # The objects are named '<key>.[<backup id>.]<compression>'.
+                keys = set(object_name.split('.', 1)[0]
+                           for metadata_object in metadata['objects']
+                           for object_name in metadata_object)
+                self._delete_dedup_references(
+                    backup, metadata['dedup_container'], keys)
+            elif metadata is None and self.dedup:
+                # The backup may have referenced chunks before it was
+                # cancelled or failed.
+                try:
+                    keys = self._find_dedup_references(backup,
+                                                       self.dedup_container)
+                except Exception:
+                    LOG.warning(_LW('Error while listing the deduplicated '
+                                    'chunks of backup %s, continuing with '
+                                    'delete.'), backup['id'])
+                    keys = set()
+                if keys:
+                    self._delete_dedup_references(
+                        backup, self.dedup_container, keys)
+
             object_names = []
             try:
                 object_names = self._generate_object_names(backup)
@@ -17,6 +17,8 @@
 
 import abc
 import base64
+import contextlib
+import time
 
 from oslo_config import cfg
 from oslo_log import log as logging
@@ -317,6 +319,49 @@ class BackupMetadataAPI(base.Base):
                 LOG.debug("No metadata of type '%s' to restore", type)
 
 
+class BackupStats(object):
+    """Throughput counters and per stage timings of a single backup.
+
+    Stage times are cumulative, so with several chunks in flight the sum
+    of the stage times can exceed the elapsed time of the backup.
+    """
+
+    STAGES = ('read', 'hash', 'compress', 'upload', 'metadata')
+
+    def __init__(self):
+        self.start_time = time.time()
+        self.stage_seconds = dict.fromkeys(self.STAGES, 0.0)
+        # Bytes read from the volume.
+        self.bytes_read = 0
+        # Bytes not stored because they were unchanged since the parent
+        # backup, all zeros or already present in the dedup store.
+        self.bytes_skipped = 0
+        # Uncompressed and compressed bytes sent to the backup store.
+        self.bytes_stored = 0
+        self.bytes_uploaded = 0
+
+    @contextlib.contextmanager
+    def timed(self, stage):
+        start = time.time()
+        try:
+            yield
+        finally:
+            self.stage_seconds[stage] += time.time() - start
+
+    def to_dict(self):
+        elapsed = time.time() - self.start_time
+        bytes_per_second = int(self.bytes_read / elapsed) if elapsed else 0
+        return {'elapsed_seconds': round(elapsed, 3),
+                'stage_seconds': dict((stage, round(seconds, 3))
+                                      for stage, seconds in
+                                      self.stage_seconds.items()),
+                'bytes_read': self.bytes_read,
+                'bytes_skipped': self.bytes_skipped,
+                'bytes_stored': self.bytes_stored,
+                'bytes_uploaded': self.bytes_uploaded,
+                'bytes_per_second': bytes_per_second}
+
+
 @six.add_metaclass(abc.ABCMeta)
 class BackupDriver(base.Base):
 
@@ -376,6 +421,17 @@ class BackupDriver(base.Base):
         """
         return jsonutils.loads(base64.decodestring(backup_url))
 
+    def has_checkpoint(self, backup):
+        """Returns True if an incomplete backup can be resumed.
+
+        Drivers checkpointing the progress of their backups return True if
+        calling backup() again for this backup picks up from where the
+        interrupted one stopped.
+
+        :param backup: backup entry of the incomplete backup
+        """
+        return False
+
 
 @six.add_metaclass(abc.ABCMeta)
 class BackupDriverWithVerify(BackupDriver):
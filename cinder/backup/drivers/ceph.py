@@ -51,6 +51,7 @@ import time
 import eventlet
 from oslo_config import cfg
 from oslo_log import log as logging
+from oslo_serialization import jsonutils
 from oslo_utils import excutils
 from oslo_utils import units
 from six.moves import range
@@ -60,6 +61,7 @@ from cinder import exception
 from cinder.i18n import _, _LE, _LI, _LW
 from cinder import utils
 import cinder.volume.drivers.rbd as rbd_driver
+from cinder.volume import utils as volume_utils
 
 try:
     import rados
@@ -170,6 +172,7 @@ class CephBackupDriver(driver.BackupDriver):
         self.rados = rados
         self.chunk_size = CONF.backup_ceph_chunk_size
         self._execute = execute or utils.execute
+        self.backup_stats = driver.BackupStats()
 
         if self._supports_stripingv2:
             self.rbd_stripe_unit = CONF.backup_ceph_stripe_unit
@@ -307,7 +310,8 @@ class CephBackupDriver(driver.BackupDriver):
 
         for chunk in range(0, chunks):
             before = time.time()
-            data = src.read(self.chunk_size)
+            with self.backup_stats.timed('read'):
+                data = src.read(self.chunk_size)
             # If we have reach end of source, discard any extraneous bytes from
             # destination volume if trim is enabled and stop writing.
             if data == '':
@@ -317,8 +321,12 @@ class CephBackupDriver(driver.BackupDriver):
 
                 return
 
-            dest.write(data)
-            dest.flush()
+            self.backup_stats.bytes_read += len(data)
+            with self.backup_stats.timed('upload'):
+                dest.write(data)
+                dest.flush()
+            self.backup_stats.bytes_stored += len(data)
+            self.backup_stats.bytes_uploaded += len(data)
             delta = (time.time() - before)
             rate = (self.chunk_size / delta) / 1024
             LOG.debug("Transferred chunk %(chunk)s of %(chunks)s "
@@ -333,13 +341,18 @@ class CephBackupDriver(driver.BackupDriver):
         rem = int(length % self.chunk_size)
         if rem:
             LOG.debug("Transferring remaining %s bytes", rem)
-            data = src.read(rem)
+            with self.backup_stats.timed('read'):
+                data = src.read(rem)
             if data == '':
                 if CONF.restore_discard_excess_bytes:
                     self._discard_bytes(dest, dest.tell(), rem)
             else:
-                dest.write(data)
-                dest.flush()
+                self.backup_stats.bytes_read += len(data)
+                with self.backup_stats.timed('upload'):
+                    dest.write(data)
+                    dest.flush()
+                self.backup_stats.bytes_stored += len(data)
+                self.backup_stats.bytes_uploaded += len(data)
                 # yield to any other pending backups
                 eventlet.sleep(0)
 
@@ -648,14 +661,17 @@ class CephBackupDriver(driver.BackupDriver):
         #                rather than brute force approach.
         try:
             before = time.time()
-            self._rbd_diff_transfer(volume_name, rbd_pool, base_name,
-                                    self._ceph_backup_pool,
-                                    src_user=rbd_user,
-                                    src_conf=rbd_conf,
-                                    dest_user=self._ceph_backup_user,
-                                    dest_conf=self._ceph_backup_conf,
-                                    src_snap=new_snap,
-                                    from_snap=from_snap)
+            # The diff is piped from the source to the backup image, so
+            # reading and uploading cannot be told apart here.
+            with self.backup_stats.timed('upload'):
+                self._rbd_diff_transfer(volume_name, rbd_pool, base_name,
+                                        self._ceph_backup_pool,
+                                        src_user=rbd_user,
+                                        src_conf=rbd_conf,
+                                        dest_user=self._ceph_backup_user,
+                                        dest_conf=self._ceph_backup_conf,
+                                        src_snap=new_snap,
+                                        from_snap=from_snap)
 
             LOG.debug("Differential backup transfer completed in %.4fs",
                       (time.time() - before))
@@ -821,7 +837,8 @@ class CephBackupDriver(driver.BackupDriver):
                        We must also be sure that the service that will perform
                        the restore is compatible with version used.
         """
-        json_meta = self.get_metadata(backup['volume_id'])
+        with self.backup_stats.timed('metadata'):
+            json_meta = self.get_metadata(backup['volume_id'])
         if not json_meta:
             LOG.debug("No metadata to backup for volume %s.",
                       backup['volume_id'])
@@ -830,7 +847,8 @@ class CephBackupDriver(driver.BackupDriver):
         LOG.debug("Backing up metadata for volume %s.",
                   backup['volume_id'])
         try:
-            with rbd_driver.RADOSClient(self) as client:
+            with self.backup_stats.timed('metadata'), \
+                    rbd_driver.RADOSClient(self) as client:
                 vol_meta_backup = VolumeMetadataBackup(client, backup['id'])
                 vol_meta_backup.set(json_meta)
         except exception.VolumeMetadataBackupExists as e:
@@ -850,6 +868,7 @@ class CephBackupDriver(driver.BackupDriver):
         volume_name = volume['name']
 
         LOG.debug("Starting backup of volume='%s'.", volume_id)
+        self.backup_stats = driver.BackupStats()
 
         # Ensure we are at the beginning of the volume
         volume_file.seek(0)
@@ -882,8 +901,18 @@ class CephBackupDriver(driver.BackupDriver):
                     # Cleanup.
                     self.delete(backup)
 
+        backup_stats = self.backup_stats.to_dict()
+        backup.stats = jsonutils.dumps(backup_stats, sort_keys=True)
+        backup.save()
+        volume_utils.notify_about_backup_usage(
+            self.context, backup, "createprogress",
+            extra_usage_info={'backup_percent': 100,
+                              'backup_stats': backup_stats})
+
         LOG.debug("Backup '%(backup_id)s' of volume %(volume_id)s finished.",
                   {'backup_id': backup_id, 'volume_id': volume_id})
+        LOG.info(_LI("Backup %(backup_id)s stats: %(stats)s."),
+                 {'backup_id': backup_id, 'stats': backup_stats})
 
     def _full_restore(self, backup_id, volume_id, dest_file, dest_name,
                       length, src_snap=None):
@@ -39,6 +39,7 @@
 
 import hashlib
 import socket
+import tempfile
 
 from oslo_config import cfg
 from oslo_log import log as logging
@@ -180,7 +181,11 @@ class SwiftBackupDriver(chunkeddriver.ChunkedBackupDriver):
             self.container = container
             self.object_name = object_name
             self.conn = conn
-            self.data = bytearray()
+            # Objects larger than a chunk, such as the sha256 file of a
+            # large volume, are spooled to disk and streamed from there.
+            self.data = tempfile.SpooledTemporaryFile(
+                max_size=CONF.backup_swift_object_size)
+            self.md5 = hashlib.md5()
 
         def __enter__(self):
             return self
@@ -189,19 +194,23 @@ class SwiftBackupDriver(chunkeddriver.ChunkedBackupDriver):
             self.close()
 
         def write(self, data):
-            self.data += data
+            self.data.write(data)
+            self.md5.update(data)
 
         def close(self):
-            reader = six.BytesIO(self.data)
+            content_length = self.data.tell()
+            self.data.seek(0)
             try:
                 etag = self.conn.put_object(self.container, self.object_name,
-                                            reader,
-                                            content_length=len(self.data))
+                                            self.data,
+                                            content_length=content_length)
             except socket.error as err:
                 raise exception.SwiftConnectionFailed(reason=err)
+            finally:
+                self.data.close()
             LOG.debug('swift MD5 for %(object_name)s: %(etag)s',
                       {'object_name': self.object_name, 'etag': etag, })
-            md5 = hashlib.md5(self.data).hexdigest()
+            md5 = self.md5.hexdigest()
             LOG.debug('backup MD5 for %(object_name)s: %(md5)s',
                       {'object_name': self.object_name, 'md5': md5})
             if etag != md5:
@@ -216,6 +225,8 @@ class SwiftBackupDriver(chunkeddriver.ChunkedBackupDriver):
             self.container = container
             self.object_name = object_name
             self.conn = conn
+            self.body_chunks = None
+            self.buffer = b''
 
         def __enter__(self):
             return self
@@ -223,13 +234,37 @@ class SwiftBackupDriver(chunkeddriver.ChunkedBackupDriver):
         def __exit__(self, exc_type, exc_value, traceback):
             pass
 
-        def read(self):
+        def read(self, size=None):
+            """Read the whole object, or its next size bytes if size is set.
+
+            Once a size has been given the object is streamed, and reading
+            without a size returns the rest of it.
+            """
+            if size is None and self.body_chunks is None:
+                try:
+                    (_resp, body) = self.conn.get_object(self.container,
+                                                         self.object_name)
+                except socket.error as err:
+                    raise exception.SwiftConnectionFailed(reason=err)
+                return body
+
             try:
-                (_resp, body) = self.conn.get_object(self.container,
-                                                     self.object_name)
+                if self.body_chunks is None:
+                    (_resp, self.body_chunks) = self.conn.get_object(
+                        self.container, self.object_name,
+                        resp_chunk_size=size)
+                while size is None or len(self.buffer) < size:
+                    chunk = next(self.body_chunks, None)
+                    if chunk is None:
+                        break
+                    self.buffer += chunk
             except socket.error as err:
                 raise exception.SwiftConnectionFailed(reason=err)
-            return body
+            if size is None:
+                size = len(self.buffer)
+            data = self.buffer[:size]
+            self.buffer = self.buffer[size:]
+            return data
 
     def put_container(self, container):
         """Create the container if needed. No failure if it pre-exists."""
@@ -234,15 +234,19 @@ class BackupManager(manager.SchedulerDependentManager):
                     self.db.volume_update(ctxt, volume['id'],
                                           {'status': 'error_restoring'})
 
-        # TODO(smulcahy) implement full resume of backup and restore
-        # operations on restart (rather than simply resetting)
+        # TODO(smulcahy) implement full resume of restore operations on
+        # restart (rather than simply resetting)
         backups = objects.BackupList.get_all_by_host(ctxt, self.host)
         for backup in backups:
             if backup['status'] == 'creating':
-                LOG.info(_LI('Resetting backup %s to error (was creating).'),
-                         backup['id'])
-                err = 'incomplete backup reset on manager restart'
-                self._update_backup_error(backup, ctxt, err)
+                if self._resume_backup(ctxt, backup):
+                    LOG.info(_LI('Resuming backup %s from its last '
+                                 'checkpoint (was creating).'), backup['id'])
+                else:
+                    LOG.info(_LI('Resetting backup %s to error (was '
+                                 'creating).'), backup['id'])
+                    err = 'incomplete backup reset on manager restart'
+                    self._update_backup_error(backup, ctxt, err)
             if backup['status'] == 'restoring':
                 LOG.info(_LI('Resetting backup %s to '
                              'available (was restoring).'),
@@ -255,6 +259,37 @@ class BackupManager(manager.SchedulerDependentManager):
 
         self._cleanup_temp_volumes_snapshots(backups)
 
+    def _resume_backup(self, ctxt, backup):
+        """Restart an incomplete backup if the driver can resume it.
+
+        Only backups of volumes that were not in use are resumed: the data
+        of in-use volumes is read from a temporary volume or snapshot, which
+        would not match the data the checkpoint was taken from.
+        """
+        if backup.temp_volume_id or backup.temp_snapshot_id:
+            return False
+        try:
+            volume = self.db.volume_get(ctxt, backup.volume_id)
+        except exception.VolumeNotFound:
+            return False
+        if (volume['previous_status'] != 'available' or
+                volume['status'] not in ('available', 'backing-up')):
+            return False
+        try:
+            backup_service = self.service.get_backup_driver(ctxt)
+            if not backup_service.has_checkpoint(backup):
+                return False
+        except Exception:
+            LOG.exception(_LE('Failed to look up the checkpoint of backup '
+                              '%s.'), backup.id)
+            return False
+
+        self.db.volume_update(ctxt, volume['id'],
+                              {'status': 'backing-up',
+                               'previous_status': 'available'})
+        self.backup_rpcapi.create_backup(ctxt, backup)
+        return True
+
     def _cleanup_temp_volumes_snapshots(self, backups):
         # NOTE(xyang): If the service crashes or gets restarted during the
         # backup operation, there could be temporary volumes or snapshots
@@ -57,6 +57,7 @@ from __future__ import print_function
 
 import os
 import sys
+import time
 
 from oslo_config import cfg
 from oslo_db.sqlalchemy import migration
@@ -238,14 +239,29 @@ class DbCommands(object):
 
     @args('age_in_days', type=int,
           help='Purge deleted rows older than age in days')
-    def purge(self, age_in_days):
+    @args('--batch', type=int, default=None,
+          help='Number of rows deleted per transaction, all the rows of a '
+               'table are deleted at once by default')
+    @args('--sleep', type=float, default=0,
+          help='Seconds to sleep between the batches')
+    def purge(self, age_in_days, batch=None, sleep=0):
         """Purge deleted rows older than a given age from cinder tables."""
         age_in_days = int(age_in_days)
         if age_in_days <= 0:
             print(_("Must supply a positive, non-zero value for age"))
             exit(1)
+        if batch is not None and batch <= 0:
+            print(_("Must supply a positive, non-zero value for batch"))
+            exit(1)
         ctxt = context.get_admin_context()
-        db.purge_deleted_rows(ctxt, age_in_days)
+        start = time.time()
+        rows = db.purge_deleted_rows(ctxt, age_in_days, batch_size=batch,
+                                     batch_interval=sleep)
+        elapsed = time.time() - start
+        print(_("Purged %(rows)d rows in %(seconds).2f seconds "
+                "(%(rate).1f rows/s)") %
+              {'rows': rows, 'seconds': elapsed,
+               'rate': rows / elapsed if elapsed else 0})
 
 
 class VersionCommands(object):
@@ -42,6 +42,9 @@ def paginate_query(query, model, limit, sort_keys, marker=None,
     With a compound-values sort_key, (k1, k2, k3) we must do this to repeat
     the lexicographical ordering:
     (k1 > X1) or (k1 == X1 && k2 > X2) or (k1 == X1 && k2 == X2 && k3 > X3)
+    To which (k1 >= X1) is added, so that the database can seek to the
+    marker in an index on the sort keys instead of scanning it from the
+    first page.
 
     We also have to cope with different sort_directions.
 
@@ -122,6 +125,15 @@ def paginate_query(query, model, limit, sort_keys, marker=None,
         f = sqlalchemy.sql.or_(*criteria_list)
         query = query.filter(f)
 
+        # Bound the range of the first sort key, NULL markers can't be
+        # compared and are left to the criteria above.
+        if marker_values[0] is not None:
+            model_attr = getattr(model, sort_keys[0])
+            if sort_dirs[0] == 'desc':
+                query = query.filter(model_attr <= marker_values[0])
+            else:
+                query = query.filter(model_attr >= marker_values[0])
+
     if limit is not None:
         query = query.limit(limit)
 
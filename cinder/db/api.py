@@ -180,6 +180,11 @@ def volume_data_get_for_host(context, host, count_only=False):
                                          count_only)
 
 
+def volume_count_get_for_hosts(context, hosts):
+    """Get a dict of the volume count of each of the hosts."""
+    return IMPL.volume_count_get_for_hosts(context, hosts)
+
+
 def volume_data_get_for_project(context, project_id):
     """Get (volume_count, gigabytes) for project."""
     return IMPL.volume_data_get_for_project(context, project_id)
@@ -206,11 +211,11 @@ def volume_get(context, volume_id):
 
 
 def volume_get_all(context, marker, limit, sort_keys=None, sort_dirs=None,
-                   filters=None, offset=None):
+                   filters=None, offset=None, columns=None):
     """Get all volumes."""
     return IMPL.volume_get_all(context, marker, limit, sort_keys=sort_keys,
                                sort_dirs=sort_dirs, filters=filters,
-                               offset=offset)
+                               offset=offset, columns=columns)
 
 
 def volume_get_all_by_host(context, host, filters=None):
@@ -225,13 +230,14 @@ def volume_get_all_by_group(context, group_id, filters=None):
 
 def volume_get_all_by_project(context, project_id, marker, limit,
                               sort_keys=None, sort_dirs=None, filters=None,
-                              offset=None):
+                              offset=None, columns=None):
     """Get all volumes belonging to a project."""
     return IMPL.volume_get_all_by_project(context, project_id, marker, limit,
                                           sort_keys=sort_keys,
                                           sort_dirs=sort_dirs,
                                           filters=filters,
-                                          offset=offset)
+                                          offset=offset,
+                                          columns=columns)
 
 
 def volume_get_iscsi_target_num(context, volume_id):
@@ -292,14 +298,20 @@ def snapshot_get(context, snapshot_id):
     return IMPL.snapshot_get(context, snapshot_id)
 
 
-def snapshot_get_all(context, filters=None):
+def snapshot_get_all(context, filters=None, marker=None, limit=None,
+                     sort_keys=None, sort_dirs=None, offset=None):
     """Get all snapshots."""
-    return IMPL.snapshot_get_all(context, filters)
+    return IMPL.snapshot_get_all(context, filters, marker, limit, sort_keys,
+                                 sort_dirs, offset)
 
 
-def snapshot_get_all_by_project(context, project_id, filters=None):
+def snapshot_get_all_by_project(context, project_id, filters=None,
+                                marker=None, limit=None, sort_keys=None,
+                                sort_dirs=None, offset=None):
     """Get all snapshots belonging to a project."""
-    return IMPL.snapshot_get_all_by_project(context, project_id, filters)
+    return IMPL.snapshot_get_all_by_project(context, project_id, filters,
+                                            marker, limit, sort_keys,
+                                            sort_dirs, offset)
 
 
 def snapshot_get_by_host(context, host, filters=None):
@@ -655,6 +667,11 @@ def volume_glance_metadata_get_all(context):
     return IMPL.volume_glance_metadata_get_all(context)
 
 
+def volume_glance_metadata_list_get(context, volume_id_list):
+    """Return the glance metadata for a list of volumes."""
+    return IMPL.volume_glance_metadata_list_get(context, volume_id_list)
+
+
 def volume_glance_metadata_get(context, volume_id):
     """Return the glance metadata for a volume."""
     return IMPL.volume_glance_metadata_get(context, volume_id)
@@ -832,9 +849,12 @@ def backup_get(context, backup_id):
     return IMPL.backup_get(context, backup_id)
 
 
-def backup_get_all(context, filters=None):
+def backup_get_all(context, filters=None, marker=None, limit=None,
+                   sort_keys=None, sort_dirs=None, offset=None):
     """Get all backups."""
-    return IMPL.backup_get_all(context, filters=filters)
+    return IMPL.backup_get_all(context, filters=filters, marker=marker,
+                               limit=limit, sort_keys=sort_keys,
+                               sort_dirs=sort_dirs, offset=offset)
 
 
 def backup_get_all_by_host(context, host):
@@ -847,10 +867,14 @@ def backup_create(context, values):
     return IMPL.backup_create(context, values)
 
 
-def backup_get_all_by_project(context, project_id, filters=None):
+def backup_get_all_by_project(context, project_id, filters=None, marker=None,
+                              limit=None, sort_keys=None, sort_dirs=None,
+                              offset=None):
     """Get all backups belonging to a project."""
     return IMPL.backup_get_all_by_project(context, project_id,
-                                          filters=filters)
+                                          filters=filters, marker=marker,
+                                          limit=limit, sort_keys=sort_keys,
+                                          sort_dirs=sort_dirs, offset=offset)
 
 
 def backup_get_all_by_volume(context, volume_id, filters=None):
@@ -982,13 +1006,19 @@ def cgsnapshot_destroy(context, cgsnapshot_id):
     return IMPL.cgsnapshot_destroy(context, cgsnapshot_id)
 
 
-def purge_deleted_rows(context, age_in_days):
+def purge_deleted_rows(context, age_in_days, batch_size=None,
+                       batch_interval=0):
     """Purge deleted rows older than given age from cinder tables
 
-    Raises InvalidParameterValue if age_in_days is incorrect.
+    The rows are deleted in batches of batch_size rows when given, sleeping
+    batch_interval seconds between the batches.
+
+    Raises InvalidParameterValue if age_in_days or batch_size is incorrect.
     :returns: number of deleted rows
     """
-    return IMPL.purge_deleted_rows(context, age_in_days=age_in_days)
+    return IMPL.purge_deleted_rows(context, age_in_days=age_in_days,
+                                   batch_size=batch_size,
+                                   batch_interval=batch_interval)
 
 
 ###################
@@ -1003,3 +1033,48 @@ def driver_initiator_data_update(context, initiator, namespace, updates):
 def driver_initiator_data_get(context, initiator, namespace):
     """Query for an DriverPrivateData that has the specified key"""
     return IMPL.driver_initiator_data_get(context, initiator, namespace)
+
+
+###################
+
+
+def image_volume_cache_create(context, host, image_id, image_updated_at,
+                              volume_id, size):
+    """Create a new image volume cache entry."""
+    return IMPL.image_volume_cache_create(context,
+                                          host,
+                                          image_id,
+                                          image_updated_at,
+                                          volume_id,
+                                          size)
+
+
+def image_volume_cache_delete(context, volume_id):
+    """Delete an image volume cache entry specified by volume id."""
+    return IMPL.image_volume_cache_delete(context, volume_id)
+
+
+def image_volume_cache_get_and_update_last_used(context, image_id, host,
+                                                max_size=None):
+    """Query for an image volume cache entry and bump its last_used.
+
+    Only the entries of at most max_size GB are considered when given, so
+    that the cached volume can be cloned into the requested volume.
+    """
+    return IMPL.image_volume_cache_get_and_update_last_used(context,
+                                                            image_id,
+                                                            host,
+                                                            max_size)
+
+
+def image_volume_cache_get_by_volume_id(context, volume_id):
+    """Query to see if a volume id is an image-volume contained in the cache"""
+    return IMPL.image_volume_cache_get_by_volume_id(context, volume_id)
+
+
+def image_volume_cache_get_all_for_host(context, host):
+    """Query for all image volume cache entry for a host.
+
+    The entries are ordered from the most to the least recently used.
+    """
+    return IMPL.image_volume_cache_get_all_for_host(context, host)
@@ -39,7 +39,7 @@ import six
 import sqlalchemy
 from sqlalchemy import MetaData
 from sqlalchemy import or_
-from sqlalchemy.orm import joinedload, joinedload_all
+from sqlalchemy.orm import joinedload, joinedload_all, subqueryload
 from sqlalchemy.orm import RelationshipProperty
 from sqlalchemy.schema import Table
 from sqlalchemy.sql.expression import literal_column
@@ -735,12 +735,20 @@ def _reservation_create(context, uuid, usage, project_id, resource, delta,
 # code always acquires the lock on quota_usages before acquiring the lock
 # on reservations.
 
-def _get_quota_usages(context, session, project_id):
+def _get_quota_usages(context, session, project_id, resources=None):
     # Broken out for testability
-    rows = model_query(context, models.QuotaUsage,
-                       read_deleted="no",
-                       session=session).\
-        filter_by(project_id=project_id).\
+    query = model_query(context, models.QuotaUsage,
+                        read_deleted="no",
+                        session=session).\
+        filter_by(project_id=project_id)
+    # Only lock the usages of the given resources, so that reservations
+    # of unrelated resources of the project don't wait on each other.
+    if resources is not None:
+        query = query.filter(
+            models.QuotaUsage.resource.in_(sorted(resources)))
+    # Lock the rows in the same order in every transaction, overlapping
+    # reservations then wait on each other instead of deadlocking.
+    rows = query.order_by(models.QuotaUsage.resource).\
         with_lockmode('update').\
         all()
     return {row.resource: row for row in rows}
@@ -756,8 +764,9 @@ def quota_reserve(context, resources, quotas, deltas, expire,
         if project_id is None:
             project_id = context.project_id
 
-        # Get the current usages
-        usages = _get_quota_usages(context, session, project_id)
+        # Get the current usages of the resources in the deltas
+        usages = _get_quota_usages(context, session, project_id,
+                                   resources=deltas.keys())
 
         # Handle usage refresh
         work = set(deltas.keys())
@@ -800,6 +809,11 @@ def quota_reserve(context, resources, quotas, deltas, expire,
                                volume_type_name=volume_type_name,
                                session=session)
                 for res, in_use in updates.items():
+                    # Only the usages of the deltas are locked. The sync
+                    # routines refresh the resource they belong to, any
+                    # other usage is left to its own reservations.
+                    if res not in deltas:
+                        continue
                     # Make sure we have a destination for the usage!
                     if res not in usages:
                         usages[res] = _quota_usage_create(
@@ -898,12 +912,26 @@ def _quota_reservations(session, context, reservations):
         all()
 
 
+def _quota_reservation_resources(session, context, reservations):
+    """Return the resources of the reservations, without locking them."""
+    rows = model_query(context, models.Reservation.resource,
+                       read_deleted="no",
+                       session=session).\
+        filter(models.Reservation.uuid.in_(reservations)).\
+        distinct().\
+        all()
+    return [row.resource for row in rows]
+
+
 @require_context
 @_retry_on_deadlock
 def reservation_commit(context, reservations, project_id=None):
     session = get_session()
     with session.begin():
-        usages = _get_quota_usages(context, session, project_id)
+        usages = _get_quota_usages(
+            context, session, project_id,
+            resources=_quota_reservation_resources(session, context,
+                                                   reservations))
 
         for reservation in _quota_reservations(session, context, reservations):
             usage = usages[reservation.resource]
@@ -919,7 +947,10 @@ def reservation_commit(context, reservations, project_id=None):
 def reservation_rollback(context, reservations, project_id=None):
     session = get_session()
     with session.begin():
-        usages = _get_quota_usages(context, session, project_id)
+        usages = _get_quota_usages(
+            context, session, project_id,
+            resources=_quota_reservation_resources(session, context,
+                                                   reservations))
 
         for reservation in _quota_reservations(session, context, reservations):
             usage = usages[reservation.resource]
@@ -1094,6 +1125,36 @@ def volume_data_get_for_host(context, host, count_only=False):
         return (result[0] or 0, result[1] or 0)
 
 
+@require_admin_context
+def volume_count_get_for_hosts(context, hosts):
+    """Returns the number of volumes of each host with a single query.
+
+    As in volume_data_get_for_host, the volumes of the pools of a host are
+    counted for the host too.
+    """
+    if not hosts:
+        return {}
+
+    host_attr = models.Volume.host
+    conditions = [host_attr.in_(hosts)]
+    conditions.extend(host_attr.op('LIKE')(host + '#%') for host in hosts)
+    rows = model_query(context, host_attr, func.count(models.Volume.id),
+                       read_deleted="no").\
+        filter(or_(*conditions)).\
+        group_by(host_attr).\
+        all()
+
+    counts = dict.fromkeys(hosts, 0)
+    for volume_host, count in rows:
+        # Add the count to the host and to each host it is a pool of
+        parts = volume_host.split('#')
+        for i in range(1, len(parts) + 1):
+            host = '#'.join(parts[:i])
+            if host in counts:
+                counts[host] += count
+    return counts
+
+
 @require_admin_context
 def _volume_data_get_for_project(context, project_id, volume_type_id=None,
                                  session=None):
@@ -1256,24 +1317,26 @@ def volume_detached(context, volume_id, attachment_id):
 
 
 @require_context
-def _volume_get_query(context, session=None, project_only=False):
+def _volume_get_query(context, session=None, project_only=False,
+                      batch_load=False):
+    """Returns a volume query eager loading the volume relationships.
+
+    :param batch_load: load the metadata, attachments and volume type extra
+                       specs of all the volumes with one query each instead
+                       of joining them to the volumes, which avoids
+                       fetching a cartesian product when listing volumes
+    """
+    load = subqueryload if batch_load else joinedload
+    query = model_query(context, models.Volume, session=session,
+                        project_only=project_only).\
+        options(load('volume_metadata'))
     if is_admin_context(context):
-        return model_query(context, models.Volume, session=session,
-                           project_only=project_only).\
-            options(joinedload('volume_metadata')).\
-            options(joinedload('volume_admin_metadata')).\
-            options(joinedload('volume_type')).\
-            options(joinedload('volume_type.extra_specs')).\
-            options(joinedload('volume_attachment')).\
-            options(joinedload('consistencygroup'))
-    else:
-        return model_query(context, models.Volume, session=session,
-                           project_only=project_only).\
-            options(joinedload('volume_metadata')).\
-            options(joinedload('volume_type')).\
-            options(joinedload('volume_type.extra_specs')).\
-            options(joinedload('volume_attachment')).\
-            options(joinedload('consistencygroup'))
+        query = query.options(load('volume_admin_metadata'))
+    return query.\
+        options(joinedload('volume_type')).\
+        options(load('volume_type.extra_specs')).\
+        options(load('volume_attachment')).\
+        options(joinedload('consistencygroup'))
 
 
 @require_context
@@ -1343,7 +1406,7 @@ def volume_get(context, volume_id):
 
 @require_admin_context
 def volume_get_all(context, marker, limit, sort_keys=None, sort_dirs=None,
-                   filters=None, offset=None):
+                   filters=None, offset=None, columns=None):
     """Retrieves all volumes.
 
     If no sort parameters are specified then the returned volumes are sorted
@@ -1362,16 +1425,23 @@ def volume_get_all(context, marker, limit, sort_keys=None, sort_dirs=None,
                     or sets cause an 'IN' operation, while exact matching
                     is used for other values, see _process_volume_filters
                     function for more information
+    :param offset: number of items to skip
+    :param columns: names of the only volume columns to fetch, the volumes
+                    are then returned as dictionaries of these columns,
+                    without their relationships
     :returns: list of matching volumes
     """
     session = get_session()
     with session.begin():
         # Generate the query
         query = _generate_paginate_query(context, session, marker, limit,
-                                         sort_keys, sort_dirs, filters, offset)
+                                         sort_keys, sort_dirs, filters, offset,
+                                         columns)
         # No volumes would match, return empty list
         if query is None:
             return []
+        if columns:
+            return [dict(zip(columns, row)) for row in query.all()]
         return query.all()
 
 
@@ -1434,7 +1504,7 @@ def volume_get_all_by_group(context, group_id, filters=None):
 @require_context
 def volume_get_all_by_project(context, project_id, marker, limit,
                               sort_keys=None, sort_dirs=None, filters=None,
-                              offset=None):
+                              offset=None, columns=None):
     """Retrieves all volumes in a project.
 
     If no sort parameters are specified then the returned volumes are sorted
@@ -1454,6 +1524,10 @@ def volume_get_all_by_project(context, project_id, marker, limit,
                     or sets cause an 'IN' operation, while exact matching
                     is used for other values, see _process_volume_filters
                     function for more information
+    :param offset: number of items to skip
+    :param columns: names of the only volume columns to fetch, the volumes
+                    are then returned as dictionaries of these columns,
+                    without their relationships
     :returns: list of matching volumes
     """
     session = get_session()
@@ -1464,15 +1538,18 @@ def volume_get_all_by_project(context, project_id, marker, limit,
         filters['project_id'] = project_id
         # Generate the query
         query = _generate_paginate_query(context, session, marker, limit,
-                                         sort_keys, sort_dirs, filters, offset)
+                                         sort_keys, sort_dirs, filters, offset,
+                                         columns)
         # No volumes would match, return empty list
         if query is None:
             return []
+        if columns:
+            return [dict(zip(columns, row)) for row in query.all()]
         return query.all()
 
 
 def _generate_paginate_query(context, session, marker, limit, sort_keys,
-                             sort_dirs, filters, offset=None):
+                             sort_dirs, filters, offset=None, columns=None):
     """Generate the query to include the filters and the paginate options.
 
     Returns a query with sorting / pagination criteria added or None
@@ -1492,29 +1569,72 @@ def _generate_paginate_query(context, session, marker, limit, sort_keys,
                     is used for other values, see _process_volume_filters
                     function for more information
     :param offset: number of items to skip
+    :param columns: names of the only volume columns to query
     :returns: updated query or None
     """
     sort_keys, sort_dirs = process_sort_params(sort_keys,
                                                sort_dirs,
                                                default_dir='desc')
-    query = _volume_get_query(context, session=session)
+    if columns:
+        query = model_query(context,
+                            *[getattr(models.Volume, column)
+                              for column in columns],
+                            session=session)
+    else:
+        query = _volume_get_query(context, session=session, batch_load=True)
 
     if filters:
         query = _process_volume_filters(query, filters)
         if query is None:
             return None
 
-    marker_volume = None
+    return _paginate_query(context, session, query, models.Volume, marker,
+                           limit, sort_keys, sort_dirs, offset,
+                           exception.VolumeNotFound(volume_id=marker))
+
+
+def _paginate_query(context, session, query, model, marker, limit,
+                    sort_keys, sort_dirs, offset, marker_not_found):
+    """Adds the sorting and keyset pagination criteria to a query.
+
+    :param marker: id of the last item of the previous page
+    :param marker_not_found: exception raised if there is no such item
+    :returns: updated query
+    """
+    marker_values = None
     if marker is not None:
-        marker_volume = _volume_get(context, marker, session)
+        marker_values = _get_marker_sort_values(context, session, model,
+                                                marker, sort_keys,
+                                                marker_not_found)
 
-    return sqlalchemyutils.paginate_query(query, models.Volume, limit,
+    return sqlalchemyutils.paginate_query(query, model, limit,
                                           sort_keys,
-                                          marker=marker_volume,
+                                          marker=marker_values,
                                           sort_dirs=sort_dirs,
                                           offset=offset)
 
 
+def _get_marker_sort_values(context, session, model, marker, sort_keys,
+                            marker_not_found):
+    """Returns the values of the sort keys of the marker of a page.
+
+    Only the sort key columns of the marker are fetched, instead of the
+    whole item with its relationships.
+    """
+    try:
+        columns = [getattr(model, sort_key) for sort_key in sort_keys]
+    except AttributeError:
+        raise exception.InvalidInput(reason='Invalid sort key')
+
+    result = model_query(context, *columns, session=session,
+                         project_only=True).\
+        filter(model.id == marker).\
+        first()
+    if not result:
+        raise marker_not_found
+    return result
+
+
 def _process_volume_filters(query, filters):
     """Common filter processing for Volume queries.
 
@@ -2023,8 +2143,27 @@ def snapshot_get(context, snapshot_id):
     return _snapshot_get(context, snapshot_id)
 
 
+def _paginate_snapshot_query(context, query, marker, limit, sort_keys,
+                             sort_dirs, offset):
+    if not (marker or limit or sort_keys or sort_dirs or offset):
+        return query
+    sort_keys, sort_dirs = process_sort_params(sort_keys,
+                                               sort_dirs,
+                                               default_dir='desc')
+    return _paginate_query(context, None, query, models.Snapshot, marker,
+                           limit, sort_keys, sort_dirs, offset,
+                           exception.SnapshotNotFound(snapshot_id=marker))
+
+
 @require_admin_context
-def snapshot_get_all(context, filters=None):
+def snapshot_get_all(context, filters=None, marker=None, limit=None,
+                     sort_keys=None, sort_dirs=None, offset=None):
+    """Retrieves all snapshots.
+
+    The snapshots are only sorted and paginated if any of the marker, limit,
+    sort_keys, sort_dirs or offset parameters is given, see volume_get_all
+    for their meaning.
+    """
     # Ensure that the filter value exists on the model
     if filters:
         for key in filters.keys():
@@ -2039,6 +2178,8 @@ def snapshot_get_all(context, filters=None):
     if filters:
         query = query.filter_by(**filters)
 
+    query = _paginate_snapshot_query(context, query, marker, limit,
+                                     sort_keys, sort_dirs, offset)
     return query.options(joinedload('snapshot_metadata')).all()
 
 
@@ -2074,15 +2215,23 @@ def snapshot_get_all_for_cgsnapshot(context, cgsnapshot_id):
 
 
 @require_context
-def snapshot_get_all_by_project(context, project_id, filters=None):
+def snapshot_get_all_by_project(context, project_id, filters=None,
+                                marker=None, limit=None, sort_keys=None,
+                                sort_dirs=None, offset=None):
+    """Retrieves all snapshots in a project.
+
+    See snapshot_get_all for the sorting and pagination parameters.
+    """
     authorize_project_context(context, project_id)
     query = model_query(context, models.Snapshot)
 
     if filters:
         query = query.filter_by(**filters)
 
-    return query.filter_by(project_id=project_id).\
-        options(joinedload('snapshot_metadata')).all()
+    query = query.filter_by(project_id=project_id)
+    query = _paginate_snapshot_query(context, query, marker, limit,
+                                     sort_keys, sort_dirs, offset)
+    return query.options(joinedload('snapshot_metadata')).all()
 
 
 @require_context
@@ -3088,6 +3237,18 @@ def volume_glance_metadata_get_all(context):
     return _volume_glance_metadata_get_all(context)
 
 
+@require_context
+def volume_glance_metadata_list_get(context, volume_id_list):
+    """Return the Glance metadata for a list of volumes."""
+    query = model_query(context, models.VolumeGlanceMetadata).\
+        filter(models.VolumeGlanceMetadata.volume_id.in_(volume_id_list))
+    if is_user_context(context):
+        query = query.filter(
+            models.Volume.id == models.VolumeGlanceMetadata.volume_id,
+            models.Volume.project_id == context.project_id)
+    return query.all()
+
+
 @require_context
 @require_volume_exists
 def _volume_glance_metadata_get(context, volume_id, session=None):
@@ -3295,20 +3456,38 @@ def backup_get(context, backup_id):
     return result
 
 
-def _backup_get_all(context, filters=None):
+def _backup_get_all(context, filters=None, marker=None, limit=None,
+                    sort_keys=None, sort_dirs=None, offset=None):
     session = get_session()
     with session.begin():
         # Generate the query
-        query = model_query(context, models.Backup)
+        query = model_query(context, models.Backup, session=session)
         if filters:
             query = query.filter_by(**filters)
 
+        if marker or limit or sort_keys or sort_dirs or offset:
+            sort_keys, sort_dirs = process_sort_params(sort_keys,
+                                                       sort_dirs,
+                                                       default_dir='desc')
+            query = _paginate_query(
+                context, session, query, models.Backup, marker, limit,
+                sort_keys, sort_dirs, offset,
+                exception.BackupNotFound(backup_id=marker))
+
         return query.all()
 
 
 @require_admin_context
-def backup_get_all(context, filters=None):
-    return _backup_get_all(context, filters)
+def backup_get_all(context, filters=None, marker=None, limit=None,
+                   sort_keys=None, sort_dirs=None, offset=None):
+    """Retrieves all backups.
+
+    The backups are only sorted and paginated if any of the marker, limit,
+    sort_keys, sort_dirs or offset parameters is given, see volume_get_all
+    for their meaning.
+    """
+    return _backup_get_all(context, filters, marker, limit, sort_keys,
+                           sort_dirs, offset)
 
 
 @require_admin_context
@@ -3317,7 +3496,9 @@ def backup_get_all_by_host(context, host):
 
 
 @require_context
-def backup_get_all_by_project(context, project_id, filters=None):
+def backup_get_all_by_project(context, project_id, filters=None, marker=None,
+                              limit=None, sort_keys=None, sort_dirs=None,
+                              offset=None):
 
     authorize_project_context(context, project_id)
     if not filters:
@@ -3327,7 +3508,8 @@ def backup_get_all_by_project(context, project_id, filters=None):
 
     filters['project_id'] = project_id
 
-    return _backup_get_all(context, filters)
+    return _backup_get_all(context, filters, marker, limit, sort_keys,
+                           sort_dirs, offset)
 
 
 @require_context
@@ -3730,8 +3912,17 @@ def cgsnapshot_destroy(context, cgsnapshot_id):
 
 
 @require_admin_context
-def purge_deleted_rows(context, age_in_days):
-    """Purge deleted rows older than age from cinder tables."""
+def purge_deleted_rows(context, age_in_days, batch_size=None,
+                       batch_interval=0):
+    """Purge deleted rows older than age from cinder tables.
+
+    The tables are purged from the children to the parents of the foreign
+    key graph. When batch_size is given, the rows of a table are deleted
+    in primary key batches of that size, each in its own transaction,
+    sleeping batch_interval seconds between the batches.
+
+    :returns: number of purged rows
+    """
     try:
         age_in_days = int(age_in_days)
     except ValueError:
@@ -3742,40 +3933,72 @@ def purge_deleted_rows(context, age_in_days):
         msg = _('Must supply a positive value for age')
         LOG.error(msg)
         raise exception.InvalidParameterValue(msg)
+    if batch_size is not None and batch_size <= 0:
+        msg = _('Must supply a positive value for the batch size')
+        LOG.error(msg)
+        raise exception.InvalidParameterValue(msg)
 
     engine = get_engine()
     session = get_session()
     metadata = MetaData()
     metadata.bind = engine
-    tables = []
+    tables = set()
 
     for model_class in models.__dict__.values():
         if hasattr(model_class, "__tablename__") \
                 and hasattr(model_class, "deleted"):
-            tables.append(model_class.__tablename__)
-
-    # Reorder the list so the volumes table is last to avoid FK constraints
-    tables.remove("volumes")
-    tables.append("volumes")
-    for table in tables:
-        t = Table(table, metadata, autoload=True)
+            tables.add(model_class.__tablename__)
+            Table(model_class.__tablename__, metadata, autoload=True)
+
+    total_purged = 0
+    # sorted_tables lists the referenced tables before the tables
+    # referencing them, purge in the reverse order to avoid FK constraints
+    for t in reversed(metadata.sorted_tables):
+        if t.name not in tables:
+            continue
         LOG.info(_LI('Purging deleted rows older than age=%(age)d days '
                      'from table=%(table)s'), {'age': age_in_days,
-                                               'table': table})
+                                               'table': t.name})
         deleted_age = timeutils.utcnow() - dt.timedelta(days=age_in_days)
+        start = time.time()
         try:
-            with session.begin():
-                result = session.execute(
-                    t.delete()
-                    .where(t.c.deleted_at < deleted_age))
+            rows_purged = _purge_table(session, t, deleted_age, batch_size,
+                                       batch_interval)
         except db_exc.DBReferenceError:
             LOG.exception(_LE('DBError detected when purging from '
-                              'table=%(table)s'), {'table': table})
+                              'table=%(table)s'), {'table': t.name})
             raise
 
-        rows_purged = result.rowcount
-        LOG.info(_LI("Deleted %(row)d rows from table=%(table)s"),
-                 {'row': rows_purged, 'table': table})
+        elapsed = time.time() - start
+        LOG.info(_LI("Deleted %(row)d rows from table=%(table)s in "
+                     "%(seconds).2f seconds (%(rate).1f rows/s)"),
+                 {'row': rows_purged, 'table': t.name, 'seconds': elapsed,
+                  'rate': rows_purged / elapsed if elapsed else 0})
+        total_purged += rows_purged
+
+    return total_purged
+
+
+def _purge_table(session, table, deleted_age, batch_size, batch_interval):
+    criterion = table.c.deleted_at < deleted_age
+    pk_columns = list(table.primary_key.columns)
+    if batch_size is None or len(pk_columns) != 1:
+        with session.begin():
+            return session.execute(table.delete().where(criterion)).rowcount
+
+    pk = pk_columns[0]
+    rows_purged = 0
+    while True:
+        with session.begin():
+            ids = [row[0] for row in session.execute(
+                sqlalchemy.select([pk]).where(criterion).
+                order_by(pk).limit(batch_size))]
+            if ids:
+                rows_purged += session.execute(
+                    table.delete().where(pk.in_(ids))).rowcount
+        if len(ids) < batch_size:
+            return rows_purged
+        time.sleep(batch_interval)
 
 
 ###############################
@@ -3821,3 +4044,70 @@ def driver_initiator_data_get(context, initiator, namespace):
             filter_by(initiator=initiator).\
             filter_by(namespace=namespace).\
             all()
+
+
+###############################
+
+
+@require_admin_context
+def image_volume_cache_create(context, host, image_id, image_updated_at,
+                              volume_id, size):
+    session = get_session()
+    with session.begin():
+        cache_entry = models.ImageVolumeCacheEntry()
+        cache_entry.host = host
+        cache_entry.image_id = image_id
+        cache_entry.image_updated_at = image_updated_at
+        cache_entry.volume_id = volume_id
+        cache_entry.size = size
+        session.add(cache_entry)
+        return cache_entry
+
+
+@require_admin_context
+def image_volume_cache_delete(context, volume_id):
+    session = get_session()
+    with session.begin():
+        session.query(models.ImageVolumeCacheEntry).\
+            filter_by(volume_id=volume_id).\
+            delete()
+
+
+@require_admin_context
+def image_volume_cache_get_and_update_last_used(context, image_id, host,
+                                                max_size=None):
+    session = get_session()
+    with session.begin():
+        query = session.query(models.ImageVolumeCacheEntry).\
+            filter_by(image_id=image_id).\
+            filter_by(host=host)
+        if max_size is not None:
+            query = query.filter(
+                models.ImageVolumeCacheEntry.size <= max_size)
+        entry = query.\
+            order_by(models.ImageVolumeCacheEntry.last_used.desc()).\
+            first()
+
+        if entry:
+            entry.last_used = timeutils.utcnow()
+            entry.save(session=session)
+        return entry
+
+
+@require_admin_context
+def image_volume_cache_get_by_volume_id(context, volume_id):
+    session = get_session()
+    with session.begin():
+        return session.query(models.ImageVolumeCacheEntry).\
+            filter_by(volume_id=volume_id).\
+            first()
+
+
+@require_admin_context
+def image_volume_cache_get_all_for_host(context, host):
+    session = get_session()
+    with session.begin():
+        return session.query(models.ImageVolumeCacheEntry).\
+            filter_by(host=host).\
+            order_by(models.ImageVolumeCacheEntry.last_used.desc()).\
+            all()
@@ -0,0 +1,71 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from sqlalchemy import Index, MetaData, Table
+
+
+# Indexes for the predicates of the queries run by the services and the
+# quota syncs, which filter out the deleted rows. The host and project
+# listings are covered by the indexes of migration 053.
+INDEXES = (
+    # volume_data_get_for_project, covering the summed size on InnoDB.
+    ('volumes', 'volumes_project_quota_idx',
+     ('project_id', 'deleted', 'volume_type_id', 'size')),
+    # volume_get_all_by_group
+    ('volumes', 'volumes_consistencygroup_id_idx',
+     ('consistencygroup_id', 'deleted')),
+    # snapshot_get_all_for_volume
+    ('snapshots', 'snapshots_volume_id_idx',
+     ('volume_id', 'deleted')),
+    # snapshot_get_all_for_cgsnapshot
+    ('snapshots', 'snapshots_cgsnapshot_id_idx',
+     ('cgsnapshot_id', 'deleted')),
+    # backup_get_all_by_host
+    ('backups', 'backups_host_idx',
+     ('host', 'deleted')),
+    # backup_get_all_by_volume
+    ('backups', 'backups_volume_id_idx',
+     ('volume_id', 'deleted')),
+    # volume_attachment_get_used_by_volume_id and friends
+    ('volume_attachment', 'volume_attachment_volume_id_idx',
+     ('volume_id', 'deleted', 'attach_status')),
+)
+
+
+def _get_index(table, name):
+    for idx in table.indexes:
+        if idx.name == name:
+            return idx
+
+
+def upgrade(migrate_engine):
+    meta = MetaData()
+    meta.bind = migrate_engine
+
+    for table_name, index_name, columns in INDEXES:
+        table = Table(table_name, meta, autoload=True)
+        if _get_index(table, index_name):
+            continue
+
+        index = Index(index_name, *[table.c[column] for column in columns])
+        index.create(migrate_engine)
+
+
+def downgrade(migrate_engine):
+    meta = MetaData()
+    meta.bind = migrate_engine
+
+    for table_name, index_name, columns in INDEXES:
+        table = Table(table_name, meta, autoload=True)
+        index = _get_index(table, index_name)
+        if index:
+            index.drop(migrate_engine)
@@ -0,0 +1,227 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Cache of image-volumes kept on a volume backend.
+
+Volumes created from an image are cloned from a volume of the internal
+tenant holding that image instead of downloading the image from Glance
+again. The entries are keyed by image id and host and invalidated when
+the image is updated.
+"""
+
+from oslo_log import log as logging
+from oslo_utils import timeutils
+import six
+
+from cinder.i18n import _LE, _LW
+from cinder import rpc
+
+LOG = logging.getLogger(__name__)
+
+
+class ImageVolumeCache(object):
+    def __init__(self, db, volume_api, max_cache_size_gb=0,
+                 max_cache_size_count=0):
+        self.db = db
+        self.volume_api = volume_api
+        self.max_cache_size_gb = int(max_cache_size_gb)
+        self.max_cache_size_count = int(max_cache_size_count)
+
+    def get_by_image_volume(self, context, volume_id):
+        return self.db.image_volume_cache_get_by_volume_id(context, volume_id)
+
+    def evict(self, context, cache_entry):
+        LOG.debug('Evicting image cache entry: %(entry)s.',
+                  {'entry': self._entry_to_str(cache_entry)})
+        self.db.image_volume_cache_delete(context, cache_entry['volume_id'])
+        self._notify_cache_eviction(context, cache_entry['image_id'],
+                                    cache_entry['host'])
+
+    def get_entry(self, context, volume_ref, image_id, image_meta):
+        """Return the most recently used entry cloneable into volume_ref.
+
+        Stale entries, left behind by an update of the image, are evicted
+        and their image-volumes deleted. None is returned on a cache miss.
+        """
+        cache_entry = self.db.image_volume_cache_get_and_update_last_used(
+            context,
+            image_id,
+            volume_ref['host'],
+            volume_ref['size']
+        )
+
+        if cache_entry:
+            LOG.debug('Found image-volume cache entry: %(entry)s.',
+                      {'entry': self._entry_to_str(cache_entry)})
+
+            if self._should_update_entry(cache_entry, image_meta):
+                LOG.debug('Image-volume cache entry is out-dated, evicting: '
+                          '%(entry)s.',
+                          {'entry': self._entry_to_str(cache_entry)})
+                self._delete_image_volume(context, cache_entry)
+                cache_entry = None
+
+        if cache_entry:
+            self._notify_cache_hit(context, cache_entry['image_id'],
+                                   cache_entry['host'])
+        else:
+            self._notify_cache_miss(context, image_id,
+                                    volume_ref['host'])
+        return cache_entry
+
+    def create_cache_entry(self, context, volume_ref, image_id, image_meta):
+        """Create a new cache entry for an image.
+
+        This assumes that the volume described by volume_ref has already been
+        created and is in an available state.
+        """
+        LOG.debug('Creating new image-volume cache entry for image '
+                  '%(image_id)s on host %(host)s.',
+                  {'image_id': image_id, 'host': volume_ref['host']})
+
+        image_updated_at = self._image_updated_at(image_meta)
+
+        cache_entry = self.db.image_volume_cache_create(
+            context,
+            volume_ref['host'],
+            image_id,
+            image_updated_at,
+            volume_ref['id'],
+            volume_ref['size']
+        )
+
+        LOG.debug('New image-volume cache entry created: %(entry)s.',
+                  {'entry': self._entry_to_str(cache_entry)})
+        return cache_entry
+
+    def ensure_space(self, context, space_required, host):
+        """Makes room for a cache entry.
+
+        The least recently used entries of the host are evicted until the
+        new entry fits within the size and count limits.
+
+        :returns: True if there is room for the entry, False otherwise
+        """
+
+        # Check to see if the cache is actually limited.
+        if self.max_cache_size_gb == 0 and self.max_cache_size_count == 0:
+            return True
+
+        # Make sure that we can potentially fit the image in the cache
+        # and bail out before evicting everything else to try and make
+        # room for it.
+        if (self.max_cache_size_gb != 0 and
+                space_required > self.max_cache_size_gb):
+            LOG.warning(_LW('Image-volume cache for host %(host)s can not '
+                            'hold an entry of %(size)s GB.'),
+                        {'host': host, 'size': space_required})
+            return False
+
+        # Assume the entries are ordered by most recently used to least used.
+        entries = self.db.image_volume_cache_get_all_for_host(context, host)
+
+        current_count = len(entries)
+
+        current_size = 0
+        for entry in entries:
+            current_size += entry['size']
+
+        # Add values for the entry we intend to create.
+        current_size += space_required
+        current_count += 1
+
+        LOG.debug('Image-volume cache for host %(host)s current_size (GB) = '
+                  '%(size_gb)s (max = %(max_gb)s), current count = %(count)s '
+                  '(max = %(max_count)s).',
+                  {'host': host,
+                   'size_gb': current_size,
+                   'max_gb': self.max_cache_size_gb,
+                   'count': current_count,
+                   'max_count': self.max_cache_size_count})
+
+        while ((current_size > self.max_cache_size_gb and
+                self.max_cache_size_gb > 0)
+                or (current_count > self.max_cache_size_count and
+                    self.max_cache_size_count > 0)):
+            # Evict the least recently used entries until there is room.
+            entry = entries.pop()
+            LOG.debug('Reclaiming image-volume cache space; removing cache '
+                      'entry %(entry)s.', {'entry': self._entry_to_str(entry)})
+            self._delete_image_volume(context, entry)
+            current_size -= entry['size']
+            current_count -= 1
+            LOG.debug('Image-volume cache for host %(host)s new size (GB) = '
+                      '%(size_gb)s, new count = %(count)s.',
+                      {'host': host,
+                       'size_gb': current_size,
+                       'count': current_count})
+
+        return True
+
+    def _notify_cache_hit(self, context, image_id, host):
+        self._notify_cache_action(context, image_id, host, 'hit')
+
+    def _notify_cache_miss(self, context, image_id, host):
+        self._notify_cache_action(context, image_id, host, 'miss')
+
+    def _notify_cache_eviction(self, context, image_id, host):
+        self._notify_cache_action(context, image_id, host, 'evict')
+
+    def _notify_cache_action(self, context, image_id, host, action):
+        data = {
+            'image_id': image_id,
+            'host': host,
+        }
+        LOG.debug('ImageVolumeCache notification: action=%(action)s'
+                  ' data=%(data)s.', {'action': action, 'data': data})
+        rpc.get_notifier('image_volume_cache', host).info(
+            context, 'image_volume_cache.%s' % action, data)
+
+    def _delete_image_volume(self, context, cache_entry):
+        """Remove the cache entry and delete its image-volume."""
+        self.evict(context, cache_entry)
+        try:
+            volume_ref = self.db.volume_get(context, cache_entry['volume_id'])
+            self.volume_api.delete(context, volume_ref)
+        except Exception:
+            LOG.exception(_LE('Failed to delete image-volume %(volume_id)s '
+                              'of the image-volume cache.'),
+                          {'volume_id': cache_entry['volume_id']})
+
+    def _image_updated_at(self, image_meta):
+        """Return the updated_at of the image as a naive UTC datetime."""
+        image_updated_at = image_meta['updated_at']
+        if isinstance(image_updated_at, six.string_types):
+            image_updated_at = timeutils.parse_isotime(image_updated_at)
+        return timeutils.normalize_time(image_updated_at)
+
+    def _should_update_entry(self, cache_entry, image_meta):
+        """Ensure that the cache entry image data is still valid."""
+        image_updated_at = self._image_updated_at(image_meta)
+        cache_updated_at = cache_entry['image_updated_at']
+
+        LOG.debug('Image-volume cache entry image_updated_at = %(entry)s, '
+                  'requested image updated_at = %(image)s.',
+                  {'entry': cache_updated_at, 'image': image_updated_at})
+
+        return image_updated_at != cache_updated_at
+
+    def _entry_to_str(self, cache_entry):
+        return str({
+            'id': cache_entry['id'],
+            'image_id': cache_entry['image_id'],
+            'volume_id': cache_entry['volume_id'],
+            'host': cache_entry['host'],
+            'size': cache_entry['size'],
+            'image_updated_at': cache_entry['image_updated_at'],
+            'last_used': cache_entry['last_used'],
+        })
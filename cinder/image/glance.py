@@ -19,24 +19,29 @@
 
 from __future__ import absolute_import
 
+import collections
 import copy
+import hashlib
 import itertools
 import random
 import shutil
 import sys
 import time
 
+from eventlet import greenthread
 import glanceclient.exc
 from oslo_config import cfg
 from oslo_log import log as logging
 from oslo_serialization import jsonutils
+from oslo_utils import excutils
 from oslo_utils import timeutils
+from oslo_utils import units
 import six
 from six.moves import range
 from six.moves import urllib
 
 from cinder import exception
-from cinder.i18n import _LE, _LW
+from cinder.i18n import _, _LE, _LW
 
 
 glance_opts = [
@@ -45,6 +50,16 @@ glance_opts = [
                 help='A list of url schemes that can be downloaded directly '
                      'via the direct_url.  Currently supported schemes: '
                      '[file].'),
+    cfg.IntOpt('glance_download_workers',
+               default=1,
+               help='Number of byte ranges of an image downloaded in '
+                    'parallel from Glance. With 1 the image is downloaded '
+                    'as a single stream.'),
+    cfg.IntOpt('glance_download_range_size',
+               default=16,
+               help='Size in MB of the byte ranges of an image downloaded '
+                    'in parallel from Glance. At most '
+                    'glance_download_workers ranges are held in memory.'),
 ]
 glance_core_properties = [
     cfg.ListOpt('glance_core_properties',
@@ -163,6 +178,8 @@ class GlanceClientWrapper(object):
         """
         version = kwargs.pop('version', self.version)
 
+        controller_name = kwargs.pop('controller', 'images')
+
         retry_excs = (glanceclient.exc.ServiceUnavailable,
                       glanceclient.exc.InvalidEndpoint,
                       glanceclient.exc.CommunicationError)
@@ -172,8 +189,7 @@ class GlanceClientWrapper(object):
             client = self.client or self._create_onetime_client(context,
                                                                 version)
             try:
-                controller = getattr(client,
-                                     kwargs.pop('controller', 'images'))
+                controller = getattr(client, controller_name)
                 return getattr(controller, method)(*args, **kwargs)
             except retry_excs as e:
                 netloc = self.netloc
@@ -287,6 +303,16 @@ class GlanceImageService(object):
                         shutil.copyfileobj(f, data)
                     return
 
+        image_meta = None
+        if data:
+            # The checksum of the image is verified as it is written.
+            image_meta = self.show(context, image_id)
+        if data and CONF.glance_download_workers > 1:
+            range_size = CONF.glance_download_range_size * units.Mi
+            if (image_meta.get('size') or 0) > range_size:
+                self._download_ranges(context, image_id, image_meta, data)
+                return
+
         try:
             image_chunks = self._client.call(context, 'data', image_id)
         except Exception:
@@ -295,8 +321,96 @@ class GlanceImageService(object):
         if not data:
             return image_chunks
         else:
-            for chunk in image_chunks:
-                data.write(chunk)
+            checksum = hashlib.md5()
+            self._write_chunks(image_chunks, data, checksum)
+            self._verify_checksum(image_id, image_meta, checksum)
+
+    def _download_ranges(self, context, image_id, image_meta, data):
+        """Download an image in byte ranges fetched in parallel.
+
+        The ranges are written to data in order, at most
+        glance_download_workers of them being held in memory, and the MD5
+        checksum of the image is computed as they are written.
+        """
+        size = image_meta['size']
+        range_size = CONF.glance_download_range_size * units.Mi
+        ranges = [(start, min(start + range_size, size) - 1)
+                  for start in range(0, size, range_size)]
+        checksum = hashlib.md5()
+
+        # A Glance server, or store, ignoring the Range header sends the
+        # whole image with a 200 status, which is then written as is.
+        resp, body = self._get_range(context, image_id, *ranges[0])
+        if resp.status_code != 206:
+            LOG.debug("Glance does not support range requests, downloading "
+                      "image %s as a single stream.", image_id)
+            self._write_chunks(body, data, checksum)
+            self._verify_checksum(image_id, image_meta, checksum)
+            return
+
+        self._write_chunks(self._check_range(image_id, ranges[0], resp, body),
+                           data, checksum)
+        pending = collections.deque()
+        try:
+            for image_range in ranges[1:]:
+                pending.append(greenthread.spawn(self._fetch_range, context,
+                                                 image_id, image_range))
+                if len(pending) == CONF.glance_download_workers:
+                    self._write_chunks(pending.popleft().wait(), data,
+                                       checksum)
+            while pending:
+                self._write_chunks(pending.popleft().wait(), data, checksum)
+        except Exception:
+            with excutils.save_and_reraise_exception():
+                for thread in pending:
+                    thread.kill()
+
+        self._verify_checksum(image_id, image_meta, checksum)
+
+    def _get_range(self, context, image_id, start, end):
+        if int(self._client.version or CONF.glance_api_version) == 1:
+            url = '/v1/images/%s' % image_id
+        else:
+            url = '/v2/images/%s/file' % image_id
+        try:
+            return self._client.call(context, 'get', url,
+                                     headers={'Range': 'bytes=%d-%d' %
+                                              (start, end)},
+                                     controller='http_client')
+        except Exception:
+            _reraise_translated_image_exception(image_id)
+
+    def _fetch_range(self, context, image_id, image_range):
+        resp, body = self._get_range(context, image_id, *image_range)
+        return self._check_range(image_id, image_range, resp, body)
+
+    def _check_range(self, image_id, image_range, resp, body):
+        chunks = list(body)
+        start, end = image_range
+        length = sum(len(chunk) for chunk in chunks)
+        if resp.status_code != 206 or length != end - start + 1:
+            reason = (_("got %(length)d bytes with status %(status)d for the "
+                        "range %(start)d-%(end)d of image %(image_id)s") %
+                      {'length': length, 'status': resp.status_code,
+                       'start': start, 'end': end, 'image_id': image_id})
+            raise exception.GlanceConnectionFailed(reason=reason)
+        return chunks
+
+    @staticmethod
+    def _write_chunks(chunks, data, checksum):
+        for chunk in chunks:
+            checksum.update(chunk)
+            data.write(chunk)
+
+    @staticmethod
+    def _verify_checksum(image_id, image_meta, checksum):
+        expected = image_meta.get('checksum')
+        if expected and checksum.hexdigest() != expected:
+            reason = (_("checksum of the downloaded data %(actual)s does "
+                        "not match the image checksum %(expected)s") %
+                      {'actual': checksum.hexdigest(), 'expected': expected})
+            raise exception.ImageUnacceptable(image_id=image_id,
+                                              reason=reason)
 
     def create(self, context, image_meta, data=None):
         """Store the image data and return the new image object."""
@@ -33,6 +33,7 @@ import tempfile
 from oslo_concurrency import processutils
 from oslo_config import cfg
 from oslo_log import log as logging
+from oslo_utils import strutils
 from oslo_utils import timeutils
 from oslo_utils import units
 
@@ -54,6 +55,24 @@ image_helper_opt = [cfg.StrOpt('image_conversion_dir',
 CONF = cfg.CONF
 CONF.register_opts(image_helper_opt)
 
+# Magic numbers of the formats probed by qemu-img, as (offset, magic,
+# format). The data of a raw image must match none of them, otherwise
+# qemu would take it for that format, backing file included.
+IMAGE_FORMAT_MAGICS = (
+    (0, b'QFI\xfb', 'qcow2'),
+    (0, b'QED\x00', 'qed'),
+    (0, b'KDMV', 'vmdk'),
+    (0, b'COWD', 'vmdk'),
+    (0, b'# Disk DescriptorFile', 'vmdk'),
+    (0, b'conectix', 'vpc'),
+    (0, b'vhdxfile', 'vhdx'),
+    (0, b'LUKS\xba\xbe', 'luks'),
+    (0, b'WithoutFreeSpace', 'parallels'),
+    (0, b'WithouFreSpacExt', 'parallels'),
+    (0, b'Bochs Virtual HD Image', 'bochs'),
+    (64, b'\x7f\x10\xda\xbe', 'vdi'),
+)
+
 
 def qemu_img_info(path, run_as_root=True):
     """Return a object containing the parsed output from qemu-img info."""
@@ -210,6 +229,167 @@ def fetch_verify_image(context, image_service, image_id, dest,
             raise exception.ImageUnacceptable(image_id=image_id, reason=reason)
 
 
+def detect_image_format(header):
+    """Return the format matching the first bytes of an image, if any."""
+    for offset, magic, fmt in IMAGE_FORMAT_MAGICS:
+        if header[offset:offset + len(magic)] == magic:
+            return fmt
+    return None
+
+
+class RawImageWriter(object):
+    """File-like object streaming the data of a raw image into a volume.
+
+    The data is written in blocks of blocksize bytes at block aligned
+    offsets. The first bytes are checked against the magic numbers of the
+    other image formats. With sparse, the blocks holding only zeros are
+    skipped, the destination must then read back as zeros, like a new thin
+    provisioned volume does. The image is rejected once more than max_size
+    bytes are written.
+    """
+
+    def __init__(self, image_id, dest_file, blocksize, sparse=False,
+                 max_size=None):
+        self.image_id = image_id
+        self.dest_file = dest_file
+        self.blocksize = blocksize
+        self.sparse = sparse
+        self.max_size = max_size
+        self.offset = 0
+        self.skipped = 0
+        self._buffer = []
+        self._buffered = 0
+        self._checked = False
+        self._zero_block = b'\0' * blocksize if sparse else None
+
+    def write(self, data):
+        self._buffer.append(data)
+        self._buffered += len(data)
+        if (self.max_size is not None and
+                self.offset + self._buffered > self.max_size):
+            raise exception.ImageUnacceptable(
+                image_id=self.image_id,
+                reason=_("Image is larger than the volume of %d bytes.") %
+                self.max_size)
+        if self._buffered < self.blocksize:
+            return
+        data = b''.join(self._buffer)
+        end = len(data) - len(data) % self.blocksize
+        self._write_blocks(data[:end])
+        self._buffer = [data[end:]]
+        self._buffered = len(data) - end
+
+    def close(self):
+        """Write the last partial block and flush the data to the volume."""
+        data = b''.join(self._buffer)
+        self._buffer = []
+        self._buffered = 0
+        self._write_blocks(data)
+        # Skipping the zero blocks at the end of the image would leave a
+        # file shorter than the image.
+        if (os.path.isfile(self.dest_file.name) and
+                os.fstat(self.dest_file.fileno()).st_size < self.offset):
+            self.dest_file.truncate(self.offset)
+        self.dest_file.flush()
+        os.fsync(self.dest_file.fileno())
+
+    def _check_format(self, header):
+        fmt = detect_image_format(header)
+        if fmt is not None:
+            raise exception.ImageUnacceptable(
+                image_id=self.image_id,
+                reason=_("Image is registered as raw but its data is "
+                         "%s.") % fmt)
+        self._checked = True
+
+    def _write_blocks(self, data):
+        if not self._checked:
+            self._check_format(data)
+        if not self.sparse:
+            self._write_at(data)
+            return
+
+        for start in range(0, len(data), self.blocksize):
+            block = data[start:start + self.blocksize]
+            if block == self._zero_block[:len(block)]:
+                self.offset += len(block)
+                self.skipped += len(block)
+            else:
+                self._write_at(block)
+
+    def _write_at(self, data):
+        if not data:
+            return
+        if self.dest_file.tell() != self.offset:
+            self.dest_file.seek(self.offset)
+        self.dest_file.write(data)
+        self.offset += len(data)
+
+
+def _get_blocksize_bytes(blocksize):
+    """Return the bytes of a dd block size such as 512, 4k or 1M."""
+    # dd takes lower case and B suffixed units, string_to_bytes doesn't.
+    blocksize = str(blocksize).strip().upper()
+    if blocksize.endswith('B'):
+        blocksize = blocksize[:-1]
+    try:
+        return strutils.string_to_bytes('%sB' % blocksize, return_int=True)
+    except ValueError:
+        LOG.warning(_LW("Incorrect value error: %(blocksize)s, using a "
+                        "block size of 1M to write the image."),
+                    {'blocksize': blocksize})
+        return units.Mi
+
+
+def _is_raw_image(image_meta):
+    return (image_meta is not None and
+            image_meta.get('disk_format') == 'raw' and
+            image_meta.get('container_format') in (None, 'bare'))
+
+
+def _is_throttled():
+    """Whether the volume copies are throttled by a spawned command."""
+    throttle = throttling.Throttle.get_default()
+    return (isinstance(throttle, throttling.BlkioCgroup) or
+            bool(throttle.prefix))
+
+
+def fetch_raw_to_volume(context, image_service, image_id, dest, blocksize,
+                        sparse=False, run_as_root=True, size=None):
+    """Stream a raw image into the volume without a temporary file.
+
+    :param size: the size of the volume in GB, larger images are rejected
+    """
+    start_time = timeutils.utcnow()
+    max_size = size * units.Gi if size is not None else None
+
+    def _fetch():
+        with fileutils.file_open(dest, 'r+b', 0) as dest_file:
+            writer = RawImageWriter(image_id, dest_file,
+                                    _get_blocksize_bytes(blocksize),
+                                    sparse=sparse, max_size=max_size)
+            image_service.download(context, image_id, writer)
+            writer.close()
+            return writer
+
+    if os.name == 'nt' or not run_as_root or os.access(dest, os.W_OK):
+        writer = _fetch()
+    else:
+        with utils.temporary_chown(dest):
+            writer = _fetch()
+
+    duration = max(timeutils.delta_seconds(start_time, timeutils.utcnow()),
+                   1)
+    size_mb = float(writer.offset) / units.Mi
+    LOG.debug("Image fetch details: dest %(dest)s, size %(sz).2f MB, "
+              "skipped %(skipped).2f MB of zeros, duration %(duration).2f "
+              "sec", {"dest": dest, "sz": size_mb,
+                      "skipped": float(writer.skipped) / units.Mi,
+                      "duration": duration})
+    LOG.info(_LI("Image download %(sz).2f MB at %(mbps).2f MB/s"),
+             {"sz": size_mb, "mbps": size_mb / duration})
+
+
 def fetch_to_vhd(context, image_service,
                  image_id, dest, blocksize,
                  user_id=None, project_id=None, run_as_root=True):
@@ -220,19 +400,45 @@ def fetch_to_vhd(context, image_service,
 
 def fetch_to_raw(context, image_service,
                  image_id, dest, blocksize,
-                 user_id=None, project_id=None, size=None, run_as_root=True):
+                 user_id=None, project_id=None, size=None, run_as_root=True,
+                 sparse=False):
     fetch_to_volume_format(context, image_service, image_id, dest, 'raw',
                            blocksize, user_id, project_id, size,
-                           run_as_root=run_as_root)
+                           run_as_root=run_as_root, sparse=sparse)
 
 
 def fetch_to_volume_format(context, image_service,
                            image_id, dest, volume_format, blocksize,
                            user_id=None, project_id=None, size=None,
-                           run_as_root=True):
+                           run_as_root=True, sparse=False):
+    """Fetch an image and write it to dest in volume_format.
+
+    Raw images written to a raw volume are streamed straight into dest,
+    unless the volume copies are throttled. The other images are
+    downloaded to a temporary file and converted by qemu-img. sparse tells
+    that dest reads back as zeros, the zero blocks of a streamed image are
+    then not written.
+    """
     qemu_img = True
     image_meta = image_service.show(context, image_id)
 
+    if (volume_format == 'raw' and _is_raw_image(image_meta) and
+            not _is_throttled()):
+        image_size = image_meta.get('size')
+        if (size is not None and image_size is not None and
+                image_size > size * units.Gi):
+            params = {'image_size': math.ceil(float(image_size) / units.Gi),
+                      'volume_size': size}
+            reason = _("Size is %(image_size)dGB and doesn't fit in a "
+                       "volume of size %(volume_size)dGB.") % params
+            raise exception.ImageUnacceptable(image_id=image_id, reason=reason)
+
+        LOG.debug("%s is raw, streaming it to %s", image_id, dest)
+        fetch_raw_to_volume(context, image_service, image_id, dest,
+                            blocksize, sparse=sparse,
+                            run_as_root=run_as_root, size=size)
+        return
+
     # NOTE(avishay): I'm not crazy about creating temp files which may be
     # large and cause disk full errors which would confuse users.
     # Unfortunately it seems that you can't pipe to 'qemu-img convert' because
@@ -307,11 +513,6 @@ def fetch_to_volume_format(context, image_service,
 
         # NOTE(jdg): I'm using qemu-img convert to write
         # to the volume regardless if it *needs* conversion or not
-        # TODO(avishay): We can speed this up by checking if the image is raw
-        # and if so, writing directly to the device. However, we need to keep
-        # check via 'qemu-img info' that what we copied was in fact a raw
-        # image and not a different format with a backing file, which may be
-        # malicious.
         LOG.debug("%s was %s, converting to %s ", image_id, fmt, volume_format)
         convert_image(tmp, dest, volume_format,
                       run_as_root=run_as_root)
@@ -30,7 +30,8 @@ LOG = logging.getLogger(__name__)
 class Backup(base.CinderPersistentObject, base.CinderObject,
              base.CinderObjectDictCompat):
     # Version 1.0: Initial version
-    VERSION = '1.0'
+    # Version 1.1: Add stats field
+    VERSION = '1.1'
 
     fields = {
         'id': fields.UUIDField(),
@@ -59,6 +60,10 @@ class Backup(base.CinderPersistentObject, base.CinderObject,
 
         'temp_volume_id': fields.StringField(nullable=True),
         'temp_snapshot_id': fields.StringField(nullable=True),
+
+        # JSON summary of the throughput and stage timings of the backup,
+        # as reported by the backup driver.
+        'stats': fields.StringField(nullable=True),
     }
 
     obj_extra_fields = ['name']
@@ -70,6 +75,8 @@ class Backup(base.CinderPersistentObject, base.CinderObject,
     def obj_make_compatible(self, primitive, target_version):
         """Make an object representation compatible with a target version."""
         target_version = utils.convert_version_to_tuple(target_version)
+        if target_version < (1, 1):
+            primitive.pop('stats', None)
 
     @staticmethod
     def _from_db_object(context, backup, db_backup):
@@ -114,18 +121,23 @@ class Backup(base.CinderPersistentObject, base.CinderObject,
 
 @base.CinderObjectRegistry.register
 class BackupList(base.ObjectListBase, base.CinderObject):
-    VERSION = '1.0'
+    # Version 1.0: Initial version
+    # Version 1.1: Backup version 1.1
+    VERSION = '1.1'
 
     fields = {
         'objects': fields.ListOfObjectsField('Backup'),
     }
     child_versions = {
-        '1.0': '1.0'
+        '1.0': '1.0',
+        '1.1': '1.1',
     }
 
     @base.remotable_classmethod
-    def get_all(cls, context, filters=None):
-        backups = db.backup_get_all(context, filters)
+    def get_all(cls, context, filters=None, marker=None, limit=None,
+                sort_keys=None, sort_dirs=None, offset=None):
+        backups = db.backup_get_all(context, filters, marker, limit,
+                                    sort_keys, sort_dirs, offset)
         return base.obj_make_list(context, cls(context), objects.Backup,
                                   backups)
 
@@ -136,8 +148,12 @@ class BackupList(base.ObjectListBase, base.CinderObject):
                                   backups)
 
     @base.remotable_classmethod
-    def get_all_by_project(cls, context, project_id, filters=None):
-        backups = db.backup_get_all_by_project(context, project_id, filters)
+    def get_all_by_project(cls, context, project_id, filters=None,
+                           marker=None, limit=None, sort_keys=None,
+                           sort_dirs=None, offset=None):
+        backups = db.backup_get_all_by_project(context, project_id, filters,
+                                               marker, limit, sort_keys,
+                                               sort_dirs, offset)
         return base.obj_make_list(context, cls(context), objects.Backup,
                                   backups)
 
@@ -18,6 +18,7 @@
 
 
 import datetime
+import time
 
 from oslo_config import cfg
 from oslo_log import log as logging
@@ -73,7 +74,11 @@ quota_opts = [
                      'with default quota.'),
     cfg.IntOpt('per_volume_size_limit',
                default=-1,
-               help='Max size allowed per volume, in gigabytes'), ]
+               help='Max size allowed per volume, in gigabytes'),
+    cfg.IntOpt('quota_resources_cache_time',
+               default=60,
+               help='Number of seconds the quota resources of the volume '
+                    'types are cached for, 0 disables the cache'), ]
 
 CONF = cfg.CONF
 CONF.register_opts(quota_opts)
@@ -903,10 +908,45 @@ class QuotaEngine(object):
 class VolumeTypeQuotaEngine(QuotaEngine):
     """Represent the set of all quotas."""
 
+    def __init__(self, quota_driver_class=None):
+        super(VolumeTypeQuotaEngine, self).__init__(quota_driver_class)
+        self._resources_cached_at = None
+
     @property
     def resources(self):
-        """Fetches all possible quota resources."""
+        """Fetches all possible quota resources.
+
+        The resources are cached for quota_resources_cache_time seconds,
+        instead of querying the volume types on every access.
+        """
+        if (self._resources_cached_at is None or
+                time.time() - self._resources_cached_at >=
+                CONF.quota_resources_cache_time):
+            self._resources = self._get_resources()
+            self._resources_cached_at = time.time()
+        return self._resources
+
+    def invalidate_resources(self):
+        """Drops the cached resources, e.g. when a volume type changed."""
+        self._resources_cached_at = None
+
+    def _check_resources(self, names):
+        # The volume type of a resource may have been created after the
+        # resources were cached, possibly by another service.
+        if not set(names).issubset(self.resources):
+            self.invalidate_resources()
+
+    def limit_check(self, context, project_id=None, **values):
+        self._check_resources(values)
+        return super(VolumeTypeQuotaEngine, self).limit_check(
+            context, project_id=project_id, **values)
+
+    def reserve(self, context, expire=None, project_id=None, **deltas):
+        self._check_resources(deltas)
+        return super(VolumeTypeQuotaEngine, self).reserve(
+            context, expire=expire, project_id=project_id, **deltas)
 
+    def _get_resources(self):
         result = {}
         # Global quotas.
         argses = [('volumes', '_sync_volumes', 'quota_volumes'),
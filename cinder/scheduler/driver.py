@@ -100,6 +100,28 @@ class Scheduler(object):
         """Must override schedule method for scheduler to work."""
         raise NotImplementedError(_("Must implement schedule_create_volume"))
 
+    def schedule_create_volumes(self, context, request_spec_list,
+                                filter_properties_list=None):
+        """Schedule a batch of volume creations.
+
+        Drivers without a batch implementation place the volumes one at a
+        time.
+
+        :returns: a list of (request_spec, exception) tuples for the volumes
+                  which could not be scheduled
+        """
+        if filter_properties_list is None:
+            filter_properties_list = [None] * len(request_spec_list)
+        failures = []
+        for request_spec, filter_properties in zip(request_spec_list,
+                                                   filter_properties_list):
+            try:
+                self.schedule_create_volume(context, request_spec,
+                                            filter_properties or {})
+            except Exception as e:
+                failures.append((request_spec, e))
+        return failures
+
     def schedule_create_consistencygroup(self, context, group,
                                          request_spec_list,
                                          filter_properties_list):
@@ -111,3 +133,7 @@ class Scheduler(object):
         """Must override schedule method for scheduler to work."""
         raise NotImplementedError(_(
             "Must implement schedule_get_pools"))
+
+    def get_decision_stats(self, context):
+        """Returns the cumulative cost of the filters and weighers."""
+        return self.host_manager.decision_stats.to_dict()
@@ -13,6 +13,7 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import collections
 import operator
 import re
 
@@ -34,34 +35,52 @@ def _operatorOperands(tokenList):
             break
 
 
+def _to_number(value):
+    try:
+        return int(value)
+    except ValueError:
+        try:
+            return float(value)
+        except ValueError as e:
+            raise exception.EvaluatorParseException(
+                _("ValueError: %s") % six.text_type(e))
+
+
 class EvalConstant(object):
     def __init__(self, toks):
         self.value = toks[0]
-
-    def eval(self):
-        result = self.value
-        if (isinstance(result, six.string_types) and
-                re.match("^[a-zA-Z_]+\.[a-zA-Z_]+$", result)):
-            (which_dict, entry) = result.split('.')
+        self.variable = None
+        self.error = None
+        if (isinstance(self.value, six.string_types) and
+                re.match("^[a-zA-Z_]+\.[a-zA-Z_]+$", self.value)):
+            self.variable = self.value.split('.')
+        else:
+            # Numbers are only converted once, when the expression is
+            # compiled.  Function names are parsed as constants too before
+            # being matched as functions, so failing to convert them must
+            # not fail the parsing.
             try:
-                result = _vars[which_dict][entry]
-            except KeyError as e:
-                raise exception.EvaluatorParseException(
-                    _("KeyError: %s") % six.text_type(e))
-            except TypeError as e:
-                raise exception.EvaluatorParseException(
-                    _("TypeError: %s") % six.text_type(e))
+                self.value = _to_number(self.value)
+            except exception.EvaluatorParseException as e:
+                self.error = e
+
+    def eval(self, variables):
+        if self.error is not None:
+            raise self.error
+        if self.variable is None:
+            return self.value
 
+        (which_dict, entry) = self.variable
         try:
-            result = int(result)
-        except ValueError:
-            try:
-                result = float(result)
-            except ValueError as e:
-                raise exception.EvaluatorParseException(
-                    _("ValueError: %s") % six.text_type(e))
+            result = variables[which_dict][entry]
+        except KeyError as e:
+            raise exception.EvaluatorParseException(
+                _("KeyError: %s") % six.text_type(e))
+        except TypeError as e:
+            raise exception.EvaluatorParseException(
+                _("TypeError: %s") % six.text_type(e))
 
-        return result
+        return _to_number(result)
 
 
 class EvalSignOp(object):
@@ -73,21 +92,21 @@ class EvalSignOp(object):
     def __init__(self, toks):
         self.sign, self.value = toks[0]
 
-    def eval(self):
-        return self.operations[self.sign] * self.value.eval()
+    def eval(self, variables):
+        return self.operations[self.sign] * self.value.eval(variables)
 
 
 class EvalAddOp(object):
     def __init__(self, toks):
         self.value = toks[0]
 
-    def eval(self):
-        sum = self.value[0].eval()
+    def eval(self, variables):
+        sum = self.value[0].eval(variables)
         for op, val in _operatorOperands(self.value[1:]):
             if op == '+':
-                sum += val.eval()
+                sum += val.eval(variables)
             elif op == '-':
-                sum -= val.eval()
+                sum -= val.eval(variables)
         return sum
 
 
@@ -95,14 +114,14 @@ class EvalMultOp(object):
     def __init__(self, toks):
         self.value = toks[0]
 
-    def eval(self):
-        prod = self.value[0].eval()
+    def eval(self, variables):
+        prod = self.value[0].eval(variables)
         for op, val in _operatorOperands(self.value[1:]):
             try:
                 if op == '*':
-                    prod *= val.eval()
+                    prod *= val.eval(variables)
                 elif op == '/':
-                    prod /= float(val.eval())
+                    prod /= float(val.eval(variables))
             except ZeroDivisionError as e:
                 raise exception.EvaluatorParseException(
                     _("ZeroDivisionError: %s") % six.text_type(e))
@@ -113,10 +132,10 @@ class EvalPowerOp(object):
     def __init__(self, toks):
         self.value = toks[0]
 
-    def eval(self):
-        prod = self.value[0].eval()
+    def eval(self, variables):
+        prod = self.value[0].eval(variables)
         for op, val in _operatorOperands(self.value[1:]):
-            prod = pow(prod, val.eval())
+            prod = pow(prod, val.eval(variables))
         return prod
 
 
@@ -124,8 +143,8 @@ class EvalNegateOp(object):
     def __init__(self, toks):
         self.negation, self.value = toks[0]
 
-    def eval(self):
-        return not self.value.eval()
+    def eval(self, variables):
+        return not self.value.eval(variables)
 
 
 class EvalComparisonOp(object):
@@ -142,11 +161,11 @@ class EvalComparisonOp(object):
     def __init__(self, toks):
         self.value = toks[0]
 
-    def eval(self):
-        val1 = self.value[0].eval()
+    def eval(self, variables):
+        val1 = self.value[0].eval(variables)
         for op, val in _operatorOperands(self.value[1:]):
             fn = self.operations[op]
-            val2 = val.eval()
+            val2 = val.eval(variables)
             if not fn(val1, val2):
                 break
             val1 = val2
@@ -159,12 +178,12 @@ class EvalTernaryOp(object):
     def __init__(self, toks):
         self.value = toks[0]
 
-    def eval(self):
-        condition = self.value[0].eval()
+    def eval(self, variables):
+        condition = self.value[0].eval(variables)
         if condition:
-            return self.value[2].eval()
+            return self.value[2].eval(variables)
         else:
-            return self.value[4].eval()
+            return self.value[4].eval(variables)
 
 
 class EvalFunction(object):
@@ -177,8 +196,8 @@ class EvalFunction(object):
     def __init__(self, toks):
         self.func, self.value = toks[0]
 
-    def eval(self):
-        args = self.value.eval()
+    def eval(self, variables):
+        args = self.value.eval(variables)
         if type(args) is list:
             return self.functions[self.func](*args)
         else:
@@ -189,9 +208,9 @@ class EvalCommaSeperator(object):
     def __init__(self, toks):
         self.value = toks[0]
 
-    def eval(self):
-        val1 = self.value[0].eval()
-        val2 = self.value[2].eval()
+    def eval(self, variables):
+        val1 = self.value[0].eval(variables)
+        val2 = self.value[2].eval(variables)
         if type(val2) is list:
             val_list = []
             val_list.append(val1)
@@ -206,9 +225,9 @@ class EvalBoolAndOp(object):
     def __init__(self, toks):
         self.value = toks[0]
 
-    def eval(self):
-        left = self.value[0].eval()
-        right = self.value[2].eval()
+    def eval(self, variables):
+        left = self.value[0].eval(variables)
+        right = self.value[2].eval(variables)
         return left and right
 
 
@@ -216,13 +235,16 @@ class EvalBoolOrOp(object):
     def __init__(self, toks):
         self.value = toks[0]
 
-    def eval(self):
-        left = self.value[0].eval()
-        right = self.value[2].eval()
+    def eval(self, variables):
+        left = self.value[0].eval(variables)
+        right = self.value[2].eval(variables)
         return left or right
 
+
 _parser = None
-_vars = {}
+# Maximum number of compiled expressions kept around.
+_CACHE_SIZE = 256
+_cache = collections.OrderedDict()
 
 
 def _def_parser():
@@ -272,6 +294,32 @@ def _def_parser():
     return expr
 
 
+def compile_expression(expression):
+    """Parses an expression into a tree which can be evaluated repeatedly.
+
+    The trees of the most recently used expressions are cached, so that
+    the filter and goodness functions reported by the backends are only
+    parsed once.
+    """
+    try:
+        tree = _cache.pop(expression)
+    except KeyError:
+        global _parser
+        if _parser is None:
+            _parser = _def_parser()
+
+        try:
+            tree = _parser.parseString(expression, parseAll=True)[0]
+        except pyparsing.ParseException as e:
+            raise exception.EvaluatorParseException(
+                _("ParseException: %s") % six.text_type(e))
+
+        while len(_cache) >= _CACHE_SIZE:
+            _cache.popitem(last=False)
+    _cache[expression] = tree
+    return tree
+
+
 def evaluate(expression, **kwargs):
     """Evaluates an expression.
 
@@ -281,17 +329,4 @@ def evaluate(expression, **kwargs):
     Supports both integer and floating point values, and automatic
     promotion where necessary.
     """
-    global _parser
-    if _parser is None:
-        _parser = _def_parser()
-
-    global _vars
-    _vars = kwargs
-
-    try:
-        result = _parser.parseString(expression, parseAll=True)[0]
-    except pyparsing.ParseException as e:
-        raise exception.EvaluatorParseException(
-            _("ParseException: %s") % six.text_type(e))
-
-    return result.eval()
+    return compile_expression(expression).eval(kwargs)
@@ -20,8 +20,11 @@ You can customize this scheduler by specifying your own volume Filters and
 Weighing Functions.
 """
 
+import collections
+
 from oslo_config import cfg
 from oslo_log import log as logging
+from oslo_serialization import jsonutils
 
 from cinder import exception
 from cinder.i18n import _, _LE, _LW
@@ -30,8 +33,13 @@ from cinder.scheduler import scheduler_options
 from cinder.volume import utils
 
 CONF = cfg.CONF
+CONF.import_opt('scheduler_default_filters', 'cinder.scheduler.host_manager')
 LOG = logging.getLogger(__name__)
 
+# Filters whose outcome depends on the capacity that the volumes placed
+# earlier in a batch consumed from the hosts.
+BATCH_RECHECK_FILTERS = ('CapacityFilter', 'DriverFilter')
+
 
 class FilterScheduler(driver.Scheduler):
     """Scheduler that can be used for filtering and weighing."""
@@ -87,6 +95,87 @@ class FilterScheduler(driver.Scheduler):
         if not weighed_host:
             raise exception.NoValidHost(reason=_("No weighed hosts available"))
 
+        self._create_volume_on_host(context, request_spec, filter_properties,
+                                    weighed_host)
+
+    def schedule_create_volumes(self, context, request_spec_list,
+                                filter_properties_list=None):
+        """Place a batch of volumes with a single refresh of the hosts.
+
+        Requests of the same shape, i.e. only differing by the ids and
+        names of their volumes, are filtered together. The volumes are then
+        weighed and placed one by one, consuming from the chosen host so
+        that the next volumes see its remaining capacity.
+
+        :returns: a list of (request_spec, exception) tuples for the volumes
+                  which could not be scheduled
+        """
+        elevated = context.elevated()
+        all_hosts = list(self.host_manager.get_all_host_states(elevated))
+        recheck_filters = [name for name in CONF.scheduler_default_filters
+                           if name in BATCH_RECHECK_FILTERS]
+
+        if filter_properties_list is None:
+            filter_properties_list = [None] * len(request_spec_list)
+        shapes = collections.OrderedDict()
+        for request_spec, filter_properties in zip(request_spec_list,
+                                                   filter_properties_list):
+            filter_properties = filter_properties or {}
+            shape = self._request_shape(request_spec, filter_properties)
+            shapes.setdefault(shape, []).append((request_spec,
+                                                 filter_properties))
+
+        failures = []
+        for requests in shapes.values():
+            hosts = None
+            for request_spec, filter_properties in requests:
+                try:
+                    self._prepare_filter_properties(context, request_spec,
+                                                    filter_properties)
+                    if hosts is None:
+                        hosts = self.host_manager.get_filtered_hosts(
+                            all_hosts, filter_properties)
+                        candidates = hosts
+                    elif recheck_filters:
+                        candidates = self.host_manager.get_filtered_hosts(
+                            hosts, filter_properties,
+                            filter_class_names=recheck_filters)
+                    else:
+                        candidates = hosts
+                    if not candidates:
+                        raise exception.NoValidHost(
+                            reason=_("No weighed hosts available"))
+                    weighed_hosts = self.host_manager.get_weighed_hosts(
+                        candidates, filter_properties)
+                    weighed_host = self._choose_top_host(weighed_hosts,
+                                                         request_spec)
+                    self._create_volume_on_host(context, request_spec,
+                                                filter_properties,
+                                                weighed_host)
+                except Exception as e:
+                    if not isinstance(e, exception.NoValidHost):
+                        LOG.exception(_LE('Failed to schedule volume '
+                                          '%s.'), request_spec.get('volume_id'))
+                    failures.append((request_spec, e))
+        return failures
+
+    @staticmethod
+    def _request_shape(request_spec, filter_properties):
+        """Return a key grouping the requests that filter the same way."""
+        spec = dict((key, value) for key, value in request_spec.items()
+                    if key not in ('volume_id', 'volume_properties',
+                                   'resource_properties'))
+        volume_properties = dict(
+            (key, value) for key, value in
+            request_spec.get('volume_properties', {}).items()
+            if key not in ('id', 'display_name', 'display_description'))
+        properties = dict((key, value) for key, value in
+                          filter_properties.items() if key != 'context')
+        return jsonutils.dumps([spec, volume_properties, properties],
+                               sort_keys=True)
+
+    def _create_volume_on_host(self, context, request_spec, filter_properties,
+                               weighed_host):
         host = weighed_host.obj.host
         volume_id = request_spec['volume_id']
 
@@ -248,14 +337,9 @@ class FilterScheduler(driver.Scheduler):
                 {'max_attempts': max_attempts,
                  'volume_id': volume_id})
 
-    def _get_weighted_candidates(self, context, request_spec,
-                                 filter_properties=None):
-        """Return a list of hosts that meet required specs.
-
-        Returned list is ordered by their fitness.
-        """
-        elevated = context.elevated()
-
+    def _prepare_filter_properties(self, context, request_spec,
+                                   filter_properties):
+        """Populate the filter properties of a volume request."""
         volume_properties = request_spec['volume_properties']
         # Since Cinder is using mixed filters from Oslo and it's own, which
         # takes 'resource_XX' and 'volume_XX' as input respectively, copying
@@ -267,8 +351,6 @@ class FilterScheduler(driver.Scheduler):
 
         config_options = self._get_configuration_options()
 
-        if filter_properties is None:
-            filter_properties = {}
         self._populate_retry(filter_properties, resource_properties)
 
         filter_properties.update({'context': context,
@@ -292,6 +374,19 @@ class FilterScheduler(driver.Scheduler):
             resource_type['extra_specs'].update(
                 multiattach='<is> True')
 
+    def _get_weighted_candidates(self, context, request_spec,
+                                 filter_properties=None):
+        """Return a list of hosts that meet required specs.
+
+        Returned list is ordered by their fitness.
+        """
+        elevated = context.elevated()
+
+        if filter_properties is None:
+            filter_properties = {}
+        self._prepare_filter_properties(context, request_spec,
+                                        filter_properties)
+
         # Find our local list of acceptable hosts by filtering and
         # weighing our options. we virtually consume resources on
         # it so subsequent selections can adjust accordingly.
@@ -24,18 +24,17 @@ LOG = logging.getLogger(__name__)
 
 
 class AffinityFilter(filters.BaseHostFilter):
+    # Name of the scheduler hint holding the volume uuids, set by subclasses
+    hint_name = None
+
     def __init__(self):
         self.volume_api = volume.API()
 
-
-class DifferentBackendFilter(AffinityFilter):
-    """Schedule volume on a different back-end from a set of volumes."""
-
-    def host_passes(self, host_state, filter_properties):
-        context = filter_properties['context']
+    def _get_affinity_uuids(self, filter_properties):
+        """Returns the list of hinted volume uuids, or None if invalid."""
         scheduler_hints = filter_properties.get('scheduler_hints') or {}
 
-        affinity_uuids = scheduler_hints.get('different_host', [])
+        affinity_uuids = scheduler_hints.get(self.hint_name, [])
 
         # scheduler hint verification: affinity_uuids can be a list of uuids
         # or single uuid.  The checks here is to make sure every single string
@@ -44,59 +43,62 @@ class DifferentBackendFilter(AffinityFilter):
         # like a uuid, it is better to fail the request than serving it wrong.
         if isinstance(affinity_uuids, list):
             for uuid in affinity_uuids:
-                if uuidutils.is_uuid_like(uuid):
-                    continue
-                else:
-                    return False
+                if not uuidutils.is_uuid_like(uuid):
+                    return None
         elif uuidutils.is_uuid_like(affinity_uuids):
             affinity_uuids = [affinity_uuids]
         else:
             # Not a list, not a string looks like uuid, don't pass it
             # to DB for query to avoid potential risk.
-            return False
+            return None
+        return affinity_uuids
+
+    def _get_affinity_hosts(self, context, affinity_uuids):
+        """Returns the set of hosts of the hinted volumes."""
+        volumes = self.volume_api.get_all(
+            context, filters={'id': affinity_uuids,
+                              'deleted': False})
+        return set(vol['host'] for vol in volumes)
+
+    def _affinity_passes(self, host, affinity_hosts):
+        """Checks a host against the hosts of the hinted volumes."""
+        raise NotImplementedError()
+
+    def filter_all(self, filter_obj_list, filter_properties):
+        """Filters all the hosts with a single volume query.
+
+        The hosts of the hinted volumes are looked up once per request,
+        instead of querying the volumes of every candidate host.
+        """
+        affinity_uuids = self._get_affinity_uuids(filter_properties)
+        if affinity_uuids is None:
+            return []
+        if not affinity_uuids:
+            # With no affinity hint
+            return list(filter_obj_list)
+
+        affinity_hosts = self._get_affinity_hosts(
+            filter_properties['context'], affinity_uuids)
+        return [host_state for host_state in filter_obj_list
+                if self._affinity_passes(host_state.host, affinity_hosts)]
 
-        if affinity_uuids:
-            return not self.volume_api.get_all(
-                context, filters={'host': host_state.host,
-                                  'id': affinity_uuids,
-                                  'deleted': False})
+    def host_passes(self, host_state, filter_properties):
+        return bool(self.filter_all([host_state], filter_properties))
 
-        # With no different_host key
-        return True
 
+class DifferentBackendFilter(AffinityFilter):
+    """Schedule volume on a different back-end from a set of volumes."""
 
-class SameBackendFilter(AffinityFilter):
-    """Schedule volume on the same back-end as another volume."""
+    hint_name = 'different_host'
 
-    def host_passes(self, host_state, filter_properties):
-        context = filter_properties['context']
-        scheduler_hints = filter_properties.get('scheduler_hints') or {}
+    def _affinity_passes(self, host, affinity_hosts):
+        return host not in affinity_hosts
 
-        affinity_uuids = scheduler_hints.get('same_host', [])
 
-        # scheduler hint verification: affinity_uuids can be a list of uuids
-        # or single uuid.  The checks here is to make sure every single string
-        # in the list looks like a uuid, otherwise, this filter will fail to
-        # pass.  Note that the filter does *NOT* ignore string doesn't look
-        # like a uuid, it is better to fail the request than serving it wrong.
-        if isinstance(affinity_uuids, list):
-            for uuid in affinity_uuids:
-                if uuidutils.is_uuid_like(uuid):
-                    continue
-                else:
-                    return False
-        elif uuidutils.is_uuid_like(affinity_uuids):
-            affinity_uuids = [affinity_uuids]
-        else:
-            # Not a list, not a string looks like uuid, don't pass it
-            # to DB for query to avoid potential risk.
-            return False
+class SameBackendFilter(AffinityFilter):
+    """Schedule volume on the same back-end as another volume."""
 
-        if affinity_uuids:
-            return self.volume_api.get_all(
-                context, filters={'host': host_state.host,
-                                  'id': affinity_uuids,
-                                  'deleted': False})
+    hint_name = 'same_host'
 
-        # With no same_host key
-        return True
+    def _affinity_passes(self, host, affinity_hosts):
+        return host in affinity_hosts
@@ -17,12 +17,12 @@
 #    under the License.
 
 
-import math
-
 from oslo_log import log as logging
+import six
 
 from cinder.i18n import _LE, _LW
 from cinder.openstack.common.scheduler import filters
+from cinder.scheduler import host_manager
 
 
 LOG = logging.getLogger(__name__)
@@ -31,87 +31,55 @@ LOG = logging.getLogger(__name__)
 class CapacityFilter(filters.BaseHostFilter):
     """CapacityFilter filters based on volume host's capacity utilization."""
 
+    def filter_all(self, filter_obj_list, filter_properties):
+        """Filters all the hosts in a single pass over their capacities."""
+        host_passes = six.get_unbound_function(type(self).host_passes)
+        if host_passes is not six.get_unbound_function(
+                CapacityFilter.host_passes):
+            # Subclasses checking hosts one at a time
+            return super(CapacityFilter, self).filter_all(filter_obj_list,
+                                                          filter_properties)
+        return self._filter_hosts(list(filter_obj_list), filter_properties)
+
     def host_passes(self, host_state, filter_properties):
         """Return True if host has sufficient capacity."""
+        return bool(self._filter_hosts([host_state], filter_properties))
 
-        # If the volume already exists on this host, don't fail it for
-        # insufficient capacity (e.g., if we are retyping)
-        if host_state.host == filter_properties.get('vol_exists_on'):
-            return True
-
+    def _filter_hosts(self, host_states, filter_properties):
         volume_size = filter_properties.get('size')
-
-        if host_state.free_capacity_gb is None:
-            # Fail Safe
-            LOG.error(_LE("Free capacity not set: "
-                          "volume node info collection broken."))
-            return False
-
-        free_space = host_state.free_capacity_gb
-        total_space = host_state.total_capacity_gb
-        reserved = float(host_state.reserved_percentage) / 100
-        if free_space in ['infinite', 'unknown']:
-            # NOTE(zhiteng) for those back-ends cannot report actual
-            # available capacity, we assume it is able to serve the
-            # request.  Even if it was not, the retry mechanism is
-            # able to handle the failure by rescheduling
-            return True
-        elif total_space in ['infinite', 'unknown']:
-            # If total_space is 'infinite' or 'unknown' and reserved
-            # is 0, we assume the back-ends can serve the request.
-            # If total_space is 'infinite' or 'unknown' and reserved
-            # is not 0, we cannot calculate the reserved space.
-            # float(total_space) will throw an exception. total*reserved
-            # also won't work. So the back-ends cannot serve the request.
-            if reserved == 0:
-                return True
-            return False
-        total = float(total_space)
-        if total <= 0:
-            LOG.warning(_LW("Insufficient free space for volume creation. "
-                            "Total capacity is %(total).2f on host %(host)s."),
-                        {"total": total,
-                         "host": host_state.host})
-            return False
-        # Calculate how much free space is left after taking into account
-        # the reserved space.
-        free = free_space - math.floor(total * reserved)
-
-        msg_args = {"host": host_state.host,
-                    "requested": volume_size,
-                    "available": free}
-
-        # Only evaluate using max_over_subscription_ratio if
-        # thin_provisioning_support is True. Check if the ratio of
-        # provisioned capacity over total capacity has exceeded over
-        # subscription ratio.
-        if (host_state.thin_provisioning_support and
-                host_state.max_over_subscription_ratio > 1):
-            provisioned_ratio = ((host_state.provisioned_capacity_gb +
-                                  volume_size) / total)
-            if provisioned_ratio > host_state.max_over_subscription_ratio:
-                LOG.warning(_LW(
-                    "Insufficient free space for thin provisioning. "
-                    "The ratio of provisioned capacity over total capacity "
-                    "%(provisioned_ratio).2f has exceeded the maximum over "
-                    "subscription ratio %(oversub_ratio).2f on host "
-                    "%(host)s."),
-                    {"provisioned_ratio": provisioned_ratio,
-                     "oversub_ratio": host_state.max_over_subscription_ratio,
-                     "host": host_state.host})
-                return False
+        capacities, rows = host_manager.PoolCapacities.for_hosts(
+            host_states)
+        has_space = capacities.has_space(
+            volume_size, filter_properties.get('vol_exists_on'), rows)
+        debug = LOG.isEnabledFor(logging.DEBUG)
+
+        passed = []
+        failed = []
+        for host_state, row, host_has_space in six.moves.zip(
+                host_states, rows, has_space):
+            if host_has_space:
+                passed.append(host_state)
+                if debug:
+                    LOG.debug("Space information for volume creation "
+                              "on host %(host)s (requested / avail): "
+                              "%(requested)s/%(available)s",
+                              {"host": host_state.host,
+                               "requested": volume_size,
+                               "available": capacities.available(row)})
+            elif host_state.free_capacity_gb is None:
+                # Fail Safe
+                LOG.error(_LE("Free capacity not set: "
+                              "volume node info collection broken."))
             else:
-                free_virtual = free * host_state.max_over_subscription_ratio
-                return free_virtual >= volume_size
+                failed.append(host_state.host)
 
-        if free < volume_size:
+        if failed:
             LOG.warning(_LW("Insufficient free space for volume creation "
-                            "on host %(host)s (requested / avail): "
-                            "%(requested)s/%(available)s"), msg_args)
-            return False
-
-        LOG.debug("Space information for volume creation "
-                  "on host %(host)s (requested / avail): "
-                  "%(requested)s/%(available)s", msg_args)
-
-        return True
+                            "of %(requested)s GB on host(s) %(hosts)s."),
+                        {"requested": volume_size,
+                         "hosts": ', '.join(failed)})
+        LOG.debug("%(passed)d of %(total)d host(s) have space for volume "
+                  "creation of %(requested)s GB.",
+                  {"passed": len(passed), "total": len(host_states),
+                   "requested": volume_size})
+        return passed
@@ -17,11 +17,15 @@
 Manage hosts in the current zone.
 """
 
+import array
+import math
+import time
 import UserDict
 
 from oslo_config import cfg
 from oslo_log import log as logging
 from oslo_utils import timeutils
+import six
 
 from cinder import context as cinder_context
 from cinder import db
@@ -46,7 +50,17 @@ host_manager_opts = [
                 default=[
                     'CapacityWeigher'
                 ],
-                help='Which weigher class names to use for weighing hosts.')
+                help='Which weigher class names to use for weighing hosts.'),
+    cfg.IntOpt('scheduler_host_state_resync_interval',
+               default=0,
+               help='Interval, in seconds, between two reloads of the volume '
+                    'services from the database. In between, the host states '
+                    'are only updated from the capabilities reported by the '
+                    'volume services, and a reload happens as soon as an '
+                    'unknown host reports. Volume services which are '
+                    'disabled or go down keep being scheduled to until the '
+                    'next reload. 0, the default, reloads them on every '
+                    'request.'),
 ]
 
 CONF = cfg.CONF
@@ -125,6 +139,8 @@ class HostState(object):
 
         # PoolState for all pools
         self.pools = {}
+        # Capacity columns of the host manager this state is kept in
+        self.capacities = None
 
         self.updated = None
 
@@ -289,6 +305,8 @@ class HostState(object):
         else:
             self.free_capacity_gb -= volume_gb
         self.updated = timeutils.utcnow()
+        if self.capacities is not None:
+            self.capacities.update(self)
 
     def __repr__(self):
         # FIXME(zhiteng) backend level free_capacity_gb isn't as
@@ -342,6 +360,209 @@ class PoolState(HostState):
         pass
 
 
+class PoolCapacities(object):
+    """Capacity columns of host or pool states.
+
+    The capacities reported by the pools are converted once into
+    contiguous arrays, so that the capacity filter and weigher can check
+    all the candidate pools in a single pass.  The host manager keeps the
+    columns of all its pools, and updates the row of a pool whenever its
+    state is refreshed or consumed from.  'infinite' and 'unknown'
+    capacities are stored as infinity, an unset capacity as NaN.
+    """
+
+    UNBOUNDED = ('infinite', 'unknown')
+
+    def __init__(self, host_states=()):
+        self.hosts = []
+        self.rows = {}  # { <host>: <row> }
+        self.total = array.array('d')
+        self.free = array.array('d')
+        self.provisioned = array.array('d')
+        self.reserved = array.array('d')
+        self.ratio = array.array('d')
+        self.thin = array.array('b')
+        for host_state in host_states:
+            self.update(host_state)
+
+    @classmethod
+    def for_hosts(cls, host_states):
+        """Returns the capacities of the host states and their rows.
+
+        The columns kept by the host manager are used when all the states
+        are registered in them, otherwise the states are converted now.
+        """
+        capacities = host_states[0].capacities if host_states else None
+        if capacities is not None:
+            rows = [capacities.rows.get(host_state.host)
+                    if host_state.capacities is capacities else None
+                    for host_state in host_states]
+            if None not in rows:
+                return capacities, rows
+        capacities = cls(host_states)
+        return capacities, [capacities.rows[host_state.host]
+                            for host_state in host_states]
+
+    def update(self, host_state):
+        """Stores the current capacities of a host or pool state."""
+        values = (self._to_float(host_state.total_capacity_gb),
+                  self._to_float(host_state.free_capacity_gb),
+                  self._to_float(host_state.provisioned_capacity_gb),
+                  float(host_state.reserved_percentage) / 100,
+                  float(host_state.max_over_subscription_ratio),
+                  bool(host_state.thin_provisioning_support))
+        row = self.rows.get(host_state.host)
+        if row is None:
+            self.rows[host_state.host] = len(self.hosts)
+            self.hosts.append(host_state.host)
+            for column, value in six.moves.zip(self._arrays(), values):
+                column.append(value)
+        else:
+            for column, value in six.moves.zip(self._arrays(), values):
+                column[row] = value
+
+    def remove(self, host):
+        """Drops the row of a host or pool, the last row takes its place."""
+        row = self.rows.pop(host, None)
+        if row is None:
+            return
+        last = len(self.hosts) - 1
+        for column in [self.hosts] + self._arrays():
+            column[row] = column[last]
+            column.pop()
+        if row != last:
+            self.rows[self.hosts[row]] = row
+
+    def __len__(self):
+        return len(self.hosts)
+
+    @classmethod
+    def _to_float(cls, value):
+        if value is None:
+            return float('nan')
+        if value in cls.UNBOUNDED:
+            return float('inf')
+        return float(value)
+
+    def _arrays(self):
+        return [self.total, self.free, self.provisioned, self.reserved,
+                self.ratio, self.thin]
+
+    def _columns(self, rows=None):
+        columns = [self.hosts] + self._arrays()
+        if rows is None:
+            return six.moves.zip(*columns)
+        return ([column[row] for column in columns] for row in rows)
+
+    def has_space(self, size, vol_exists_on=None, rows=None):
+        """Returns whether each pool can hold a volume of the given size.
+
+        All the pools are checked unless the rows to check are given.
+        """
+        floor = math.floor
+        inf = float('inf')
+        result = []
+        append = result.append
+        for (host, total, free, provisioned,
+             reserved, ratio, thin) in self._columns(rows):
+            if host == vol_exists_on:
+                # The volume already exists on this pool (e.g., if we are
+                # retyping), don't fail it for insufficient capacity.
+                append(True)
+            elif free != free:
+                # Fail Safe, free capacity is not set
+                append(False)
+            elif free == inf:
+                # NOTE(zhiteng) for those back-ends cannot report actual
+                # available capacity, we assume it is able to serve the
+                # request.  Even if it was not, the retry mechanism is
+                # able to handle the failure by rescheduling
+                append(True)
+            elif total == inf:
+                # The reserved space cannot be calculated without a total
+                # capacity, so only back-ends without reservation pass.
+                append(reserved == 0)
+            elif total <= 0:
+                append(False)
+            else:
+                # Free space left after taking into account the reserved
+                # space.
+                free -= floor(total * reserved)
+                # Only evaluate using max_over_subscription_ratio if
+                # thin_provisioning_support is True.
+                if thin and ratio > 1:
+                    append((provisioned + size) / total <= ratio and
+                           free * ratio >= size)
+                else:
+                    append(free >= size)
+        return result
+
+    def available(self, row):
+        """Returns the free space left on a pool out of its reserve."""
+        total = self.total[row]
+        if total == float('inf'):
+            return self.free[row]
+        return self.free[row] - math.floor(total * self.reserved[row])
+
+    def free_capacities(self, unbounded_free=-1, rows=None):
+        """Returns the (virtual) free capacity left on each pool.
+
+        The free capacity of pools with an 'infinite' or 'unknown'
+        capacity is reported as unbounded_free.  All the pools are
+        weighed unless the rows to weigh are given.
+        """
+        floor = math.floor
+        inf = float('inf')
+        result = []
+        append = result.append
+        for (host, total, free, provisioned,
+             reserved, ratio, thin) in self._columns(rows):
+            if free == inf or total == inf:
+                append(unbounded_free)
+            elif thin:
+                # Virtual free capacity for thin provisioning.
+                append(total * ratio - provisioned -
+                       floor(total * reserved))
+            else:
+                append(free - floor(total * reserved))
+        return result
+
+
+class DecisionStats(object):
+    """Cumulative cost of the filters and weighers run by the scheduler.
+
+    For every filter, the number of calls, the time spent and the number
+    of hosts checked and eliminated are counted; for every weigher, the
+    number of calls, the time spent and the number of hosts weighed.
+    """
+
+    def __init__(self):
+        self.filters = {}
+        self.weighers = {}
+
+    def record_filter(self, name, seconds, hosts_in, hosts_out):
+        counters = self.filters.setdefault(
+            name, {'calls': 0, 'seconds': 0.0, 'hosts': 0,
+                   'hosts_eliminated': 0})
+        counters['calls'] += 1
+        counters['seconds'] += seconds
+        counters['hosts'] += hosts_in
+        counters['hosts_eliminated'] += hosts_in - hosts_out
+
+    def record_weigher(self, name, seconds, hosts):
+        counters = self.weighers.setdefault(
+            name, {'calls': 0, 'seconds': 0.0, 'hosts': 0})
+        counters['calls'] += 1
+        counters['seconds'] += seconds
+        counters['hosts'] += hosts
+
+    def to_dict(self):
+        return {'filters': dict((name, dict(counters))
+                                for name, counters in self.filters.items()),
+                'weighers': dict((name, dict(counters))
+                                 for name, counters in self.weighers.items())}
+
+
 class HostManager(object):
     """Base HostManager class."""
 
@@ -358,6 +579,14 @@ class HostManager(object):
         self.weight_classes = self.weight_handler.get_all_classes()
 
         self._no_capabilities_hosts = set()  # Hosts having no capabilities
+        self._volume_services = {}  # { <host>: <volume service> }
+        # Hosts which reported capabilities since the last map update
+        self._updated_hosts = set()
+        self._last_resync = None
+        self.decision_stats = DecisionStats()
+        # Capacity columns of all the pools, and the pools of each host
+        self.pool_capacities = PoolCapacities()
+        self._capacity_pools = {}  # { <host>: set(<pool host>) }
         self._update_host_state_map(cinder_context.get_admin_context())
 
     def _choose_host_filters(self, filter_cls_names):
@@ -419,17 +648,45 @@ class HostManager(object):
                            filter_class_names=None):
         """Filter hosts and return only ones passing all filters."""
         filter_classes = self._choose_host_filters(filter_class_names)
-        return self.filter_handler.get_filtered_objects(filter_classes,
-                                                        hosts,
-                                                        filter_properties)
+        hosts = list(hosts)
+        # The filters are run one at a time to account for the cost of
+        # each of them.
+        for filter_class in filter_classes:
+            start = time.time()
+            filtered = self.filter_handler.get_filtered_objects(
+                [filter_class], hosts, filter_properties)
+            self.decision_stats.record_filter(
+                filter_class.__name__, time.time() - start,
+                len(hosts), len(filtered or []))
+            if not filtered:
+                return filtered
+            hosts = filtered
+        return hosts
 
     def get_weighed_hosts(self, hosts, weight_properties,
                           weigher_class_names=None):
         """Weigh the hosts."""
         weigher_classes = self._choose_host_weighers(weigher_class_names)
-        return self.weight_handler.get_weighed_objects(weigher_classes,
-                                                       hosts,
-                                                       weight_properties)
+        hosts = list(hosts)
+        if not hosts:
+            return []
+
+        # The weighers are run one at a time to account for the cost of
+        # each of them, their weights are then summed up per host.
+        weights = dict((id(host), 0.0) for host in hosts)
+        for weigher_class in weigher_classes:
+            start = time.time()
+            weighed_hosts = self.weight_handler.get_weighed_objects(
+                [weigher_class], hosts, weight_properties)
+            self.decision_stats.record_weigher(
+                weigher_class.__name__, time.time() - start, len(hosts))
+            for weighed_host in weighed_hosts:
+                weights[id(weighed_host.obj)] += weighed_host.weight
+
+        weighed_hosts = [self.weight_handler.object_class(host,
+                                                          weights[id(host)])
+                         for host in hosts]
+        return sorted(weighed_hosts, key=lambda x: x.weight, reverse=True)
 
     def update_service_capabilities(self, service_name, host, capabilities):
         """Update the per-service capabilities based on this notification."""
@@ -450,17 +707,74 @@ class HostManager(object):
                    'cap': capabilities})
 
         self._no_capabilities_hosts.discard(host)
+        self._updated_hosts.add(host)
 
     def has_all_capabilities(self):
         return len(self._no_capabilities_hosts) == 0
 
+    def _resync_needed(self):
+        interval = CONF.scheduler_host_state_resync_interval
+        if (interval <= 0 or self._last_resync is None or
+                time.time() - self._last_resync >= interval):
+            return True
+        # A host we know nothing about is reporting.
+        return not self._updated_hosts.issubset(self._volume_services)
+
+    def _update_host_state(self, host, service, capabilities):
+        host_state = self.host_state_map.get(host)
+        if not host_state:
+            host_state = self.host_state_cls(host,
+                                             capabilities=capabilities,
+                                             service=
+                                             dict(service))
+            self.host_state_map[host] = host_state
+        # update capabilities and attributes in host_state
+        host_state.update_from_volume_capability(capabilities,
+                                                 service=
+                                                 dict(service))
+        self._update_pool_capacities(host, host_state)
+
+    def _update_pool_capacities(self, host, host_state):
+        """Refresh the capacity columns of the pools of a host."""
+        pools = set()
+        for pool in host_state.pools.values():
+            pool.capacities = self.pool_capacities
+            self.pool_capacities.update(pool)
+            pools.add(pool.host)
+        for pool in self._capacity_pools.get(host, set()) - pools:
+            self.pool_capacities.remove(pool)
+        self._capacity_pools[host] = pools
+
+    def _remove_pool_capacities(self, host):
+        for pool in self._capacity_pools.pop(host, ()):
+            self.pool_capacities.remove(pool)
+
     def _update_host_state_map(self, context):
+        """Bring the host states up to date.
+
+        The volume services are reloaded from the database periodically,
+        otherwise only the hosts which reported capabilities since the last
+        update are refreshed.
+        """
+        if self._resync_needed():
+            self._resync_host_state_map(context)
+            return
+
+        for host in self._updated_hosts:
+            self._update_host_state(host, self._volume_services[host],
+                                    self.service_states[host])
+        self._updated_hosts = set()
+
+    def _resync_host_state_map(self, context):
 
         # Get resource usage across the available volume nodes:
         topic = CONF.volume_topic
         volume_services = db.service_get_all_by_topic(context,
                                                       topic,
                                                       disabled=False)
+        self._last_resync = time.time()
+        self._updated_hosts = set()
+        self._volume_services = {}
         active_hosts = set()
         no_capabilities_hosts = set()
         for service in volume_services:
@@ -473,17 +787,8 @@ class HostManager(object):
                 no_capabilities_hosts.add(host)
                 continue
 
-            host_state = self.host_state_map.get(host)
-            if not host_state:
-                host_state = self.host_state_cls(host,
-                                                 capabilities=capabilities,
-                                                 service=
-                                                 dict(service))
-                self.host_state_map[host] = host_state
-            # update capabilities and attributes in host_state
-            host_state.update_from_volume_capability(capabilities,
-                                                     service=
-                                                     dict(service))
+            self._volume_services[host] = dict(service)
+            self._update_host_state(host, service, capabilities)
             active_hosts.add(host)
 
         self._no_capabilities_hosts = no_capabilities_hosts
@@ -494,6 +799,7 @@ class HostManager(object):
             LOG.info(_LI("Removing non-active host: %(host)s from "
                          "scheduler cache."), {'host': host})
             del self.host_state_map[host]
+            self._remove_pool_capacities(host)
 
     def get_all_host_states(self, context):
         """Returns a dict of all the hosts the HostManager knows about.
@@ -23,6 +23,7 @@ import eventlet
 from oslo_config import cfg
 from oslo_log import log as logging
 import oslo_messaging as messaging
+from oslo_service import periodic_task
 from oslo_utils import excutils
 from oslo_utils import importutils
 import six
@@ -44,8 +45,15 @@ scheduler_driver_opt = cfg.StrOpt('scheduler_driver',
                                           'FilterScheduler',
                                   help='Default scheduler driver to use')
 
+scheduler_decision_stats_opt = cfg.BoolOpt(
+    'scheduler_decision_stats_notifications',
+    default=False,
+    help='Periodically emit a notification with the cumulative time spent '
+         'in each scheduler filter and weigher.')
+
 CONF = cfg.CONF
 CONF.register_opt(scheduler_driver_opt)
+CONF.register_opt(scheduler_decision_stats_opt)
 
 QUOTAS = quota.QUOTAS
 
@@ -55,7 +63,7 @@ LOG = logging.getLogger(__name__)
 class SchedulerManager(manager.Manager):
     """Chooses a host to create volumes."""
 
-    RPC_API_VERSION = '1.8'
+    RPC_API_VERSION = '1.10'
 
     target = messaging.Target(version=RPC_API_VERSION)
 
@@ -135,6 +143,23 @@ class SchedulerManager(manager.Manager):
         with flow_utils.DynamicLogListener(flow_engine, logger=LOG):
             flow_engine.run()
 
+    def create_volumes(self, context, topic, request_spec_list,
+                       filter_properties_list=None):
+        """Schedule the creation of a batch of volumes.
+
+        Volumes which cannot be scheduled are set to error, the others are
+        cast to the volume service of their host.
+        """
+        self._wait_for_scheduler()
+        failures = self.driver.schedule_create_volumes(context,
+                                                       request_spec_list,
+                                                       filter_properties_list)
+        for request_spec, ex in failures:
+            self._set_volume_state_and_notify('create_volume',
+                                              {'volume_state':
+                                               {'status': 'error'}},
+                                              context, ex, request_spec)
+
     def request_service_capabilities(self, context):
         volume_rpcapi.VolumeAPI().publish_service_capabilities(context)
 
@@ -260,6 +285,17 @@ class SchedulerManager(manager.Manager):
         """
         return self.driver.get_pools(context, filters)
 
+    def get_decision_stats(self, context):
+        """Get the cumulative cost of the scheduler filters and weighers."""
+        return self.driver.get_decision_stats(context)
+
+    @periodic_task.periodic_task
+    def _emit_decision_stats(self, context):
+        if CONF.scheduler_decision_stats_notifications:
+            rpc.get_notifier('scheduler').info(
+                context, 'scheduler.decision_stats',
+                self.driver.get_decision_stats(context))
+
     def _set_volume_state_and_notify(self, method, updates, context, ex,
                                      request_spec, msg=None):
         # TODO(harlowja): move into a task that just does this later.
@@ -42,6 +42,8 @@ class SchedulerAPI(object):
         1.6 - Add create_consistencygroup method
         1.7 - Add get_active_pools method
         1.8 - Add sending object over RPC in create_consistencygroup method
+        1.9 - Add create_volumes method
+        1.10 - Add get_decision_stats method
     """
 
     RPC_API_VERSION = '1.0'
@@ -51,7 +53,7 @@ class SchedulerAPI(object):
         target = messaging.Target(topic=CONF.scheduler_topic,
                                   version=self.RPC_API_VERSION)
         serializer = objects_base.CinderObjectSerializer()
-        self.client = rpc.get_client(target, version_cap='1.8',
+        self.client = rpc.get_client(target, version_cap='1.10',
                                      serializer=serializer)
 
     def create_consistencygroup(self, ctxt, topic, group,
@@ -84,6 +86,29 @@ class SchedulerAPI(object):
                           request_spec=request_spec_p,
                           filter_properties=filter_properties)
 
+    def create_volumes(self, ctxt, topic, request_spec_list,
+                       filter_properties_list=None):
+        if not self.client.can_send_version('1.9'):
+            # The scheduler can't place batches yet, cast each volume.
+            if filter_properties_list is None:
+                filter_properties_list = [None] * len(request_spec_list)
+            for request_spec, filter_properties in zip(
+                    request_spec_list, filter_properties_list):
+                self.create_volume(ctxt, topic, request_spec['volume_id'],
+                                   snapshot_id=request_spec['snapshot_id'],
+                                   image_id=request_spec['image_id'],
+                                   request_spec=request_spec,
+                                   filter_properties=filter_properties)
+            return
+
+        cctxt = self.client.prepare(version='1.9')
+        request_spec_p_list = [jsonutils.to_primitive(request_spec)
+                               for request_spec in request_spec_list]
+        return cctxt.cast(ctxt, 'create_volumes',
+                          topic=topic,
+                          request_spec_list=request_spec_p_list,
+                          filter_properties_list=filter_properties_list)
+
     def migrate_volume_to_host(self, ctxt, topic, volume_id, host,
                                force_host_copy=False, request_spec=None,
                                filter_properties=None):
@@ -124,6 +149,10 @@ class SchedulerAPI(object):
         return cctxt.call(ctxt, 'get_pools',
                           filters=filters)
 
+    def get_decision_stats(self, ctxt):
+        cctxt = self.client.prepare(version='1.10')
+        return cctxt.call(ctxt, 'get_decision_stats')
+
     def update_service_capabilities(self, ctxt,
                                     service_name, host,
                                     capabilities):
@@ -43,8 +43,10 @@ and the weighing has the opposite effect of the default.
 import math
 
 from oslo_config import cfg
+import six
 
 from cinder.openstack.common.scheduler import weights
+from cinder.scheduler import host_manager
 
 
 capacity_weight_opts = [
@@ -74,17 +76,31 @@ class CapacityWeigher(weights.BaseHostWeigher):
         """Override the weigh objects.
 
 
-        This override calls the parent to do the weigh objects and then
-        replaces any infinite weights with a value that is a multiple of the
-        delta between the min and max values.
+        This override weighs all the objects in a single pass over their
+        capacities, falling back to the parent for subclasses weighing one
+        object at a time, and then replaces any infinite weights with a
+        value that is a multiple of the delta between the min and max
+        values.
 
         NOTE(jecarey): the infinite weight value is only used when the
         smallest value is being favored (negative multiplier).  When the
         largest weight value is being used a weight of -1 is used instead.
         See _weigh_object method.
         """
-        tmp_weights = super(weights.BaseHostWeigher, self).weigh_objects(
-            weighed_obj_list, weight_properties)
+        weigh_object = six.get_unbound_function(type(self)._weigh_object)
+        if weigh_object is not six.get_unbound_function(
+                CapacityWeigher._weigh_object):
+            # Subclasses weighing hosts one at a time
+            tmp_weights = super(weights.BaseHostWeigher, self).weigh_objects(
+                weighed_obj_list, weight_properties)
+        else:
+            tmp_weights = self._free_capacities(
+                [obj.obj for obj in weighed_obj_list])
+            if tmp_weights:
+                if self.minval is None:
+                    self.minval = min(tmp_weights)
+                if self.maxval is None:
+                    self.maxval = max(tmp_weights)
 
         if math.isinf(self.maxval):
             # NOTE(jecarey): if all weights were infinite then parent
@@ -99,32 +115,23 @@ class CapacityWeigher(weights.BaseHostWeigher):
 
         return tmp_weights
 
+    def _free_capacities(self, host_states):
+        """Returns the free capacity of all the hosts in a single pass."""
+        # (zhiteng) 'infinite' and 'unknown' are treated the same
+        # here, for sorting purpose.
+
+        # As a partial fix for bug #1350638, 'infinite' and 'unknown' are
+        # given the lowest weight to discourage driver from report such
+        # capacity anymore.
+        unbounded_free = (-1 if CONF.capacity_weight_multiplier > 0
+                          else float('inf'))
+        capacities, rows = host_manager.PoolCapacities.for_hosts(
+            host_states)
+        return capacities.free_capacities(unbounded_free, rows)
+
     def _weigh_object(self, host_state, weight_properties):
         """Higher weights win.  We want spreading to be the default."""
-        reserved = float(host_state.reserved_percentage) / 100
-        free_space = host_state.free_capacity_gb
-        total_space = host_state.total_capacity_gb
-        if (free_space == 'infinite' or free_space == 'unknown' or
-                total_space == 'infinite' or total_space == 'unknown'):
-            # (zhiteng) 'infinite' and 'unknown' are treated the same
-            # here, for sorting purpose.
-
-            # As a partial fix for bug #1350638, 'infinite' and 'unknown' are
-            # given the lowest weight to discourage driver from report such
-            # capacity anymore.
-            free = -1 if CONF.capacity_weight_multiplier > 0 else float('inf')
-        else:
-            total = float(total_space)
-            if host_state.thin_provisioning_support:
-                # Calculate virtual free capacity for thin provisioning.
-                free = (total * host_state.max_over_subscription_ratio
-                        - host_state.provisioned_capacity_gb -
-                        math.floor(total * reserved))
-            else:
-                # Calculate how much free space is left after taking into
-                # account the reserved space.
-                free = free_space - math.floor(total * reserved)
-        return free
+        return self._free_capacities([host_state])[0]
 
 
 class AllocatedCapacityWeigher(weights.BaseHostWeigher):
@@ -140,9 +140,10 @@ class BackupsAPITestCase(test.TestCase):
                          res_dict['itemNotFound']['message'])
 
     def test_list_backups_json(self):
-        backup_id1 = self._create_backup()
-        backup_id2 = self._create_backup()
+        # The backups are listed from the newest to the oldest
         backup_id3 = self._create_backup()
+        backup_id2 = self._create_backup()
+        backup_id1 = self._create_backup()
 
         req = webob.Request.blank('/v2/fake/backups')
         req.method = 'GET'
@@ -166,9 +167,10 @@ class BackupsAPITestCase(test.TestCase):
         db.backup_destroy(context.get_admin_context(), backup_id1)
 
     def test_list_backups_xml(self):
-        backup_id1 = self._create_backup()
-        backup_id2 = self._create_backup()
+        # The backups are listed from the newest to the oldest
         backup_id3 = self._create_backup()
+        backup_id2 = self._create_backup()
+        backup_id1 = self._create_backup()
 
         req = webob.Request.blank('/v2/fake/backups')
         req.method = 'GET'
@@ -195,9 +197,10 @@ class BackupsAPITestCase(test.TestCase):
         db.backup_destroy(context.get_admin_context(), backup_id1)
 
     def test_list_backups_detail_json(self):
-        backup_id1 = self._create_backup()
-        backup_id2 = self._create_backup()
+        # The backups are listed from the newest to the oldest
         backup_id3 = self._create_backup()
+        backup_id2 = self._create_backup()
+        backup_id1 = self._create_backup()
 
         req = webob.Request.blank('/v2/fake/backups/detail')
         req.method = 'GET'
@@ -296,9 +299,10 @@ class BackupsAPITestCase(test.TestCase):
         db.backup_destroy(context.get_admin_context(), backup_id1)
 
     def test_list_backups_detail_xml(self):
-        backup_id1 = self._create_backup()
-        backup_id2 = self._create_backup()
+        # The backups are listed from the newest to the oldest
         backup_id3 = self._create_backup()
+        backup_id2 = self._create_backup()
+        backup_id1 = self._create_backup()
 
         req = webob.Request.blank('/v2/fake/backups/detail')
         req.method = 'GET'
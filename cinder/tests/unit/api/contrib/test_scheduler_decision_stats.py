@@ -0,0 +1,59 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import mock
+
+from cinder.api.contrib import scheduler_decision_stats
+from cinder import context
+from cinder import exception
+from cinder import test
+from cinder.tests.unit.api import fakes
+
+
+FAKE_DECISION_STATS = {
+    'filters': {
+        'CapacityFilter': {'calls': 2, 'seconds': 0.5, 'hosts': 10,
+                           'hosts_eliminated': 4},
+    },
+    'weighers': {
+        'CapacityWeigher': {'calls': 2, 'seconds': 0.25, 'hosts': 6},
+    },
+}
+
+
+@mock.patch('cinder.scheduler.rpcapi.SchedulerAPI.get_decision_stats',
+            return_value=FAKE_DECISION_STATS)
+class SchedulerDecisionStatsAPITest(test.TestCase):
+    def setUp(self):
+        super(SchedulerDecisionStatsAPITest, self).setUp()
+        self.flags(host='fake')
+        self.controller = (
+            scheduler_decision_stats.SchedulerDecisionStatsController())
+
+    def test_index(self, _mock_get_decision_stats):
+        req = fakes.HTTPRequest.blank('/v2/fake/scheduler-decision-stats')
+        ctxt = context.RequestContext('admin', 'fake', True)
+        req.environ['cinder.context'] = ctxt
+
+        res = self.controller.index(req)
+
+        self.assertEqual({'decision_stats': FAKE_DECISION_STATS}, res)
+        _mock_get_decision_stats.assert_called_once_with(ctxt)
+
+    def test_index_not_admin(self, _mock_get_decision_stats):
+        req = fakes.HTTPRequest.blank('/v2/fake/scheduler-decision-stats')
+        req.environ['cinder.context'] = context.RequestContext('fake',
+                                                               'fake')
+
+        self.assertRaises(exception.PolicyNotAuthorized,
+                          self.controller.index, req)
+        self.assertFalse(_mock_get_decision_stats.called)
@@ -16,6 +16,7 @@ import json
 import uuid
 from xml.dom import minidom
 
+import mock
 from oslo_serialization import jsonutils
 from oslo_utils import timeutils
 import webob
@@ -63,7 +64,7 @@ def fake_get_volume_image_metadata(*args, **kwargs):
     return fake_image_metadata
 
 
-def fake_get_volumes_image_metadata(*args, **kwargs):
+def fake_get_list_volumes_image_metadata(*args, **kwargs):
     return {'fake': fake_image_metadata}
 
 
@@ -93,8 +94,8 @@ class VolumeImageMetadataTest(test.TestCase):
         self.stubs.Set(volume.API, 'get_all', fake_volume_get_all)
         self.stubs.Set(volume.API, 'get_volume_image_metadata',
                        fake_get_volume_image_metadata)
-        self.stubs.Set(volume.API, 'get_volumes_image_metadata',
-                       fake_get_volumes_image_metadata)
+        self.stubs.Set(volume.API, 'get_list_volumes_image_metadata',
+                       fake_get_list_volumes_image_metadata)
         self.stubs.Set(db, 'volume_get', fake_volume_get)
         self.UUID = uuid.uuid4()
         self.controller = (volume_image_metadata.
@@ -127,6 +128,13 @@ class VolumeImageMetadataTest(test.TestCase):
         self.assertEqual(self._get_image_metadata_list(res.body)[0],
                          fake_image_metadata)
 
+    @mock.patch.object(volume.API, 'get_list_volumes_image_metadata',
+                       return_value={'fake': fake_image_metadata})
+    def test_list_detail_volumes_queries_listed_volumes(self, _mock_get):
+        res = self._make_request('/v2/fake/volumes/detail')
+        self.assertEqual(200, res.status_int)
+        _mock_get.assert_called_once_with(mock.ANY, ['fake'])
+
     def test_create_image_metadata(self):
         self.stubs.Set(volume.API, 'get_volume_image_metadata',
                        return_empty_image_metadata)
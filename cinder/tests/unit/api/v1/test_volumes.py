@@ -640,7 +640,7 @@ class VolumeApiTest(test.TestCase):
                                                limit, sort_keys=None,
                                                sort_dirs=None, filters=None,
                                                viewable_admin_meta=False,
-                                               offset=None):
+                                               offset=None, columns=None):
                 return [
                     stubs.stub_volume(1, display_name='vol1'),
                     stubs.stub_volume(2, display_name='vol2'),
@@ -345,12 +345,16 @@ class SnapshotApiTest(test.TestCase):
                                                   snapshot_metadata_get):
         def list_snapshots_with_limit_and_offset(is_admin):
             def stub_snapshot_get_all_by_project(context, project_id,
-                                                 search_opts):
-                return [
-                    stubs.stub_snapshot(1, display_name='backup1'),
-                    stubs.stub_snapshot(2, display_name='backup2'),
-                    stubs.stub_snapshot(3, display_name='backup3'),
-                ]
+                                                 search_opts, marker, limit,
+                                                 sort_keys, sort_dirs,
+                                                 offset):
+                # The page is fetched from the database
+                self.assertIsNone(marker)
+                self.assertEqual(1, limit)
+                self.assertEqual(1, offset)
+                self.assertEqual(['created_at'], sort_keys)
+                self.assertEqual(['desc'], sort_dirs)
+                return [stubs.stub_snapshot(2, display_name='backup2')]
 
             self.stubs.Set(db, 'snapshot_get_all_by_project',
                            stub_snapshot_get_all_by_project)
@@ -369,6 +373,18 @@ class SnapshotApiTest(test.TestCase):
         # non-admin case
         list_snapshots_with_limit_and_offset(is_admin=False)
 
+    @mock.patch('cinder.volume.api.API.get_all_snapshots')
+    def test_list_snapshots_with_marker_and_sort(self, get_all_snapshots):
+        get_all_snapshots.return_value = objects.SnapshotList(objects=[])
+        req = fakes.HTTPRequest.blank('/v2/fake/snapshots?marker=1&limit=2'
+                                      '&sort=name:asc')
+        res = self.controller.index(req)
+
+        self.assertEqual({'snapshots': []}, res)
+        get_all_snapshots.assert_called_once_with(
+            req.environ['cinder.context'], search_opts={}, marker='1',
+            limit=2, sort_keys=['display_name'], sort_dirs=['asc'], offset=0)
+
     @mock.patch('cinder.db.snapshot_metadata_get', return_value=dict())
     def test_admin_list_snapshots_all_tenants(self, snapshot_metadata_get):
         req = fakes.HTTPRequest.blank('/v2/fake/snapshots?all_tenants=1',
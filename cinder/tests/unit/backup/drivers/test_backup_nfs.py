@@ -17,17 +17,22 @@ Tests for Backup NFS driver.
 
 """
 import bz2
+import errno
 import filecmp
 import hashlib
+import json
 import os
 import shutil
 import tempfile
 import zlib
 
+import eventlet
 import mock
 from os_brick.remotefs import remotefs as remotefs_brick
 from oslo_config import cfg
 
+from cinder.backup import chunkeddriver
+from cinder.backup import driver
 from cinder.backup.drivers import nfs
 from cinder import context
 from cinder import db
@@ -507,6 +512,509 @@ class BackupNFSSwiftBasedTestCase(test.TestCase):
             self.assertTrue(filecmp.cmp(self.volume_file.name,
                             restored_file.name))
 
+    def test_restore_pipelined_backup(self):
+        self._create_backup_db_entry()
+        self.flags(backup_compression_algorithm='zlib')
+        self.flags(backup_file_size=(1024 * 3))
+        self.flags(backup_sha_block_size_bytes=1024)
+        self.flags(backup_max_inflight_chunks=4)
+        service = nfs.NFSBackupDriver(self.ctxt)
+        self.volume_file.seek(0)
+        backup = objects.Backup.get_by_id(self.ctxt, 123)
+        service.backup(backup, self.volume_file)
+
+        metadata = service._read_metadata(backup)
+        offsets = [list(obj.values())[0]['offset']
+                   for obj in metadata['objects']]
+        self.assertEqual(list(range(0, 32 * 1024, 1024 * 3)), offsets)
+
+        with tempfile.NamedTemporaryFile() as restored_file:
+            backup = objects.Backup.get_by_id(self.ctxt, 123)
+            service.restore(backup, '1234-5678-1234-8888', restored_file)
+            self.assertTrue(filecmp.cmp(self.volume_file.name,
+                            restored_file.name))
+
+    def test_backup_pipelined_upload_fail(self):
+        self._create_backup_db_entry()
+        self.flags(backup_file_size=(1024 * 3))
+        self.flags(backup_sha_block_size_bytes=1024)
+        self.flags(backup_max_inflight_chunks=4)
+        service = nfs.NFSBackupDriver(self.ctxt)
+        self.volume_file.seek(0)
+        backup = objects.Backup.get_by_id(self.ctxt, 123)
+        self.mock_object(service, '_write_metadata')
+        self.mock_object(service, 'get_object_writer',
+                         mock.Mock(side_effect=IOError))
+
+        self.assertRaises(IOError, service.backup, backup, self.volume_file)
+        self.assertFalse(service._write_metadata.called)
+
+    def test_restore_parallel_read_fail(self):
+        self._create_backup_db_entry()
+        self.flags(backup_file_size=(1024 * 3))
+        self.flags(backup_sha_block_size_bytes=1024)
+        self.flags(backup_max_inflight_chunks=4)
+        service = nfs.NFSBackupDriver(self.ctxt)
+        self.volume_file.seek(0)
+        backup = objects.Backup.get_by_id(self.ctxt, 123)
+        service.backup(backup, self.volume_file)
+        self.mock_object(service, '_read_object',
+                         mock.Mock(side_effect=IOError))
+
+        with tempfile.NamedTemporaryFile() as restored_file:
+            backup = objects.Backup.get_by_id(self.ctxt, 123)
+            self.assertRaises(IOError, service.restore, backup,
+                              '1234-5678-1234-8888', restored_file)
+
+    def test_backup_skips_zero_blocks(self):
+        self._create_backup_db_entry()
+        self.flags(backup_file_size=(1024 * 8))
+        self.flags(backup_sha_block_size_bytes=1024)
+        # Zero out blocks 6 to 19, which spans two chunks.
+        self.volume_file.seek(6 * 1024)
+        self.volume_file.write(b'\0' * 14 * 1024)
+        service = nfs.NFSBackupDriver(self.ctxt)
+        self.volume_file.seek(0)
+        backup = objects.Backup.get_by_id(self.ctxt, 123)
+        service.backup(backup, self.volume_file)
+
+        metadata = service._read_metadata(backup)
+        self.assertEqual([[6 * 1024, 14 * 1024]], metadata['zero_extents'])
+        extents = sorted((obj['offset'], obj['length']) for obj in
+                         [list(o.values())[0] for o in metadata['objects']])
+        self.assertEqual([(0, 6 * 1024), (20 * 1024, 4 * 1024),
+                          (24 * 1024, 8 * 1024)], extents)
+        sha256file = service._read_sha256file(backup)
+        self.assertEqual(32, len(sha256file['sha256s']))
+
+        with tempfile.NamedTemporaryFile() as restored_file:
+            restored_file.write(os.urandom(32 * 1024))
+            backup = objects.Backup.get_by_id(self.ctxt, 123)
+            service.restore(backup, '1234-5678-1234-8888', restored_file)
+            restored_file.flush()
+            self.assertTrue(filecmp.cmp(self.volume_file.name,
+                            restored_file.name))
+
+    def _restore_zero_blocks_write_only(self):
+        self._create_backup_db_entry()
+        self.flags(backup_file_size=(1024 * 8))
+        self.flags(backup_sha_block_size_bytes=1024)
+        service = nfs.NFSBackupDriver(self.ctxt)
+        # Zero out blocks 6 to 19 and the last 4 blocks.
+        self.volume_file.seek(6 * 1024)
+        self.volume_file.write(b'\0' * 14 * 1024)
+        self.volume_file.seek(28 * 1024)
+        self.volume_file.write(b'\0' * 4 * 1024)
+        self.volume_file.flush()
+        self.volume_file.seek(0)
+        backup = objects.Backup.get_by_id(self.ctxt, 123)
+        service.backup(backup, self.volume_file)
+
+        # The volume drivers open the volume to restore write-only, either
+        # a file they truncate or a device holding data.
+        restored_path = os.path.join(self.temp_dir, 'restored')
+        with open(restored_path, 'wb') as restored_file:
+            service.restore(backup, '1234-5678-1234-8888', restored_file)
+        self.assertTrue(filecmp.cmp(self.volume_file.name, restored_path))
+
+        with open(restored_path, 'wb') as restored_file:
+            restored_file.write(os.urandom(32 * 1024))
+        with os.fdopen(os.open(restored_path, os.O_WRONLY),
+                       'wb') as restored_file:
+            service.restore(backup, '1234-5678-1234-8888', restored_file)
+        self.assertTrue(filecmp.cmp(self.volume_file.name, restored_path))
+        return restored_path
+
+    def test_restore_zero_blocks_write_only(self):
+        self.mock_object(chunkeddriver, '_punch_hole',
+                         mock.Mock(wraps=chunkeddriver._punch_hole))
+        restored_path = self._restore_zero_blocks_write_only()
+        self.assertTrue(chunkeddriver._punch_hole.called)
+        # The zero blocks were deallocated.
+        self.assertLess(os.stat(restored_path).st_blocks * 512, 32 * 1024)
+
+    def test_restore_zero_blocks_write_only_no_hole_punching(self):
+        self.mock_object(chunkeddriver, '_punch_hole',
+                         mock.Mock(side_effect=OSError(errno.EOPNOTSUPP,
+                                                       'not supported')))
+        self._restore_zero_blocks_write_only()
+        self.assertTrue(chunkeddriver._punch_hole.called)
+
+    def test_backup_stats(self):
+        self._create_backup_db_entry()
+        self.flags(backup_file_size=(1024 * 8))
+        self.flags(backup_sha_block_size_bytes=1024)
+        self.flags(backup_compression_algorithm='none')
+        self.volume_file.seek(6 * 1024)
+        self.volume_file.write(b'\0' * 14 * 1024)
+        service = nfs.NFSBackupDriver(self.ctxt)
+        self.volume_file.seek(0)
+        backup = objects.Backup.get_by_id(self.ctxt, 123)
+        with mock.patch('cinder.volume.utils.notify_about_backup_usage') as \
+                notify:
+            service.backup(backup, self.volume_file)
+
+        stats = notify.call_args[1]['extra_usage_info']['backup_stats']
+        self.assertEqual(32 * 1024, stats['bytes_read'])
+        self.assertEqual(14 * 1024, stats['bytes_skipped'])
+        self.assertEqual(18 * 1024, stats['bytes_stored'])
+        self.assertEqual(18 * 1024, stats['bytes_uploaded'])
+        self.assertEqual(set(driver.BackupStats.STAGES),
+                         set(stats['stage_seconds']))
+        metadata = service._read_metadata(backup)
+        self.assertEqual(32 * 1024, metadata['backup_stats']['bytes_read'])
+        self.assertEqual(14 * 1024,
+                         metadata['backup_stats']['bytes_skipped'])
+        # A summary is kept on the backup record too.
+        backup = objects.Backup.get_by_id(self.ctxt, 123)
+        self.assertEqual(metadata['backup_stats'], json.loads(backup.stats))
+
+    def test_backup_resume_from_checkpoint(self):
+        self._create_backup_db_entry()
+        self.flags(backup_file_size=(1024 * 8))
+        self.flags(backup_sha_block_size_bytes=1024)
+        self.flags(backup_checkpoint_interval=1)
+        service = nfs.NFSBackupDriver(self.ctxt)
+        self.volume_file.seek(0)
+        backup = objects.Backup.get_by_id(self.ctxt, 123)
+        read = self.volume_file.read
+        reads = []
+
+        def fail_third_read(size):
+            reads.append(self.volume_file.tell())
+            if len(reads) == 3:
+                raise IOError()
+            return read(size)
+
+        with mock.patch.object(self.volume_file, 'read',
+                               side_effect=fail_third_read):
+            self.assertRaises(IOError, service.backup, backup,
+                              self.volume_file)
+        backup = objects.Backup.get_by_id(self.ctxt, 123)
+        self.assertTrue(service.has_checkpoint(backup))
+
+        reads[:] = []
+        self.volume_file.seek(0)
+        with mock.patch.object(self.volume_file, 'read',
+                               side_effect=read) as mock_read:
+            service.backup(backup, self.volume_file)
+        # Only the chunks after the checkpoint are read again.
+        self.assertEqual(3, mock_read.call_count)
+        backup = objects.Backup.get_by_id(self.ctxt, 123)
+        self.assertFalse(service.has_checkpoint(backup))
+        self.assertEqual(4, backup.object_count - 1)
+        sha256file = service._read_sha256file(backup)
+        self.assertEqual(32, len(sha256file['sha256s']))
+        self.assertEqual([], [name for name in
+                              service._generate_object_names(backup)
+                              if '_checkpoint' in name])
+
+        with tempfile.NamedTemporaryFile() as restored_file:
+            service.restore(backup, '1234-5678-1234-8888', restored_file)
+            self.assertTrue(filecmp.cmp(self.volume_file.name,
+                            restored_file.name))
+
+    def test_backup_resume_deletes_objects_past_checkpoint(self):
+        self._create_backup_db_entry()
+        self.flags(backup_file_size=(1024 * 8))
+        self.flags(backup_sha_block_size_bytes=1024)
+        self.flags(backup_checkpoint_interval=2)
+        service = nfs.NFSBackupDriver(self.ctxt)
+        self.volume_file.seek(0)
+        backup = objects.Backup.get_by_id(self.ctxt, 123)
+        read = self.volume_file.read
+        reads = []
+
+        def fail_fourth_read(size):
+            reads.append(self.volume_file.tell())
+            if len(reads) == 4:
+                raise IOError()
+            return read(size)
+
+        # The third chunk is stored after the checkpoint of the first two.
+        with mock.patch.object(self.volume_file, 'read',
+                               side_effect=fail_fourth_read):
+            self.assertRaises(IOError, service.backup, backup,
+                              self.volume_file)
+        backup = objects.Backup.get_by_id(self.ctxt, 123)
+        object_names = service._generate_object_names(backup)
+        self.assertIn('%s-00003' % backup.service_metadata, object_names)
+
+        # Once resumed, the last two chunks are all zeros and not stored.
+        self.volume_file.seek(16 * 1024)
+        self.volume_file.write(b'\0' * 16 * 1024)
+        self.volume_file.flush()
+        self.volume_file.seek(0)
+        service.backup(backup, self.volume_file)
+        backup = objects.Backup.get_by_id(self.ctxt, 123)
+        object_names = service._generate_object_names(backup)
+        self.assertNotIn('%s-00003' % backup.service_metadata, object_names)
+
+        with tempfile.NamedTemporaryFile() as restored_file:
+            service.restore(backup, '1234-5678-1234-8888', restored_file)
+            self.assertTrue(filecmp.cmp(self.volume_file.name,
+                            restored_file.name))
+
+    def test_backup_ignores_checkpoint_of_other_configuration(self):
+        self._create_backup_db_entry()
+        self.flags(backup_file_size=(1024 * 8))
+        self.flags(backup_sha_block_size_bytes=1024)
+        self.flags(backup_checkpoint_interval=1)
+        service = nfs.NFSBackupDriver(self.ctxt)
+        self.volume_file.seek(0)
+        backup = objects.Backup.get_by_id(self.ctxt, 123)
+        service.backup(backup, self.volume_file)
+        service._write_checkpoint(backup, backup.container,
+                                  {'id': 1, 'list': []},
+                                  {'sha256s': tempfile.TemporaryFile(),
+                                   'checkpoints': 0, 'checkpoint_pos': 0},
+                                  0)
+        self.assertTrue(service.has_checkpoint(backup))
+
+        self.flags(backup_sha_block_size_bytes=2048)
+        service = nfs.NFSBackupDriver(self.ctxt)
+        self.assertFalse(service.has_checkpoint(backup))
+
+    def test_restore_delta_zeroed_blocks(self):
+        self.mock_object(nfs.NFSBackupDriver, '_generate_object_name_prefix',
+                         lambda self, backup: 'backup_%s' % backup['id'])
+        self._create_backup_db_entry(backup_id=123)
+        self.flags(backup_file_size=(1024 * 8))
+        self.flags(backup_sha_block_size_bytes=1024)
+        service = nfs.NFSBackupDriver(self.ctxt)
+        self.volume_file.seek(0)
+        backup = objects.Backup.get_by_id(self.ctxt, 123)
+        service.backup(backup, self.volume_file)
+
+        self.volume_file.seek(10 * 1024)
+        self.volume_file.write(b'\0' * 3 * 1024)
+        self._create_backup_db_entry(backup_id=124, parent_id=123)
+        self.volume_file.seek(0)
+        deltabackup = objects.Backup.get_by_id(self.ctxt, 124)
+        service.backup(deltabackup, self.volume_file)
+
+        metadata = service._read_metadata(deltabackup)
+        self.assertEqual([[10 * 1024, 3 * 1024]], metadata['zero_extents'])
+        self.assertEqual([], metadata['objects'])
+
+        with tempfile.NamedTemporaryFile() as restored_file:
+            deltabackup = objects.Backup.get_by_id(self.ctxt, 124)
+            service.restore(deltabackup, '1234-5678-1234-8888',
+                            restored_file)
+            self.assertTrue(filecmp.cmp(self.volume_file.name,
+                            restored_file.name))
+
+    def _dedup_entries(self, service):
+        return sorted(service.get_container_entries('volumebackups_dedup',
+                                                    ''))
+
+    def test_backup_dedup(self):
+        self.mock_object(nfs.NFSBackupDriver, '_generate_object_name_prefix',
+                         lambda self, backup: 'backup_%s' % backup['id'])
+        self.flags(backup_dedup=True, backup_dedup_delete_delay=0)
+        self.flags(backup_file_size=(1024 * 8))
+        self.flags(backup_sha_block_size_bytes=1024)
+        service = nfs.NFSBackupDriver(self.ctxt)
+        self._create_backup_db_entry(backup_id=123)
+        self._create_backup_db_entry(backup_id=124)
+
+        self.volume_file.seek(0)
+        backup = objects.Backup.get_by_id(self.ctxt, 123)
+        service.backup(backup, self.volume_file)
+        entries = self._dedup_entries(service)
+        # Four chunks and one reference to each of them.
+        self.assertEqual(8, len(entries))
+
+        # Only the chunk which changed is stored again.
+        self.volume_file.seek(0)
+        self.volume_file.write(os.urandom(1024))
+        self.volume_file.seek(0)
+        backup2 = objects.Backup.get_by_id(self.ctxt, 124)
+        mock_write = self.mock_object(service, '_write_dedup_chunk',
+                                      mock.Mock(
+                                          wraps=service._write_dedup_chunk))
+        service.backup(backup2, self.volume_file)
+        self.assertEqual(1, mock_write.call_count)
+        self.assertEqual(13, len(self._dedup_entries(service)))
+
+        with tempfile.NamedTemporaryFile() as restored_file:
+            backup2 = objects.Backup.get_by_id(self.ctxt, 124)
+            service.restore(backup2, '1234-5678-1234-8888', restored_file)
+            self.assertTrue(filecmp.cmp(self.volume_file.name,
+                            restored_file.name))
+
+        # Deleting the first backup keeps the chunks still in use.
+        backup = objects.Backup.get_by_id(self.ctxt, 123)
+        service.delete(backup)
+        self.assertEqual(8, len(self._dedup_entries(service)))
+        with tempfile.NamedTemporaryFile() as restored_file:
+            service.restore(backup2, '1234-5678-1234-8888', restored_file)
+            self.assertTrue(filecmp.cmp(self.volume_file.name,
+                            restored_file.name))
+
+        service.delete(backup2)
+        self.assertEqual([], self._dedup_entries(service))
+
+    def test_backup_dedup_cancel(self):
+        self.mock_object(nfs.NFSBackupDriver, '_generate_object_name_prefix',
+                         lambda self, backup: 'backup_%s' % backup['id'])
+        self.flags(backup_dedup=True, backup_dedup_delete_delay=0)
+        self.flags(backup_file_size=(1024 * 8))
+        self.flags(backup_sha_block_size_bytes=1024)
+        service = nfs.NFSBackupDriver(self.ctxt)
+        self._create_backup_db_entry(backup_id=123)
+        backup = objects.Backup.get_by_id(self.ctxt, 123)
+        read = self.volume_file.read
+        reads = []
+
+        def cancel_after_second_read(size):
+            reads.append(size)
+            if len(reads) == 2:
+                db.backup_update(self.ctxt, 123, {'status': 'deleting'})
+            return read(size)
+
+        self.volume_file.seek(0)
+        with mock.patch.object(self.volume_file, 'read',
+                               side_effect=cancel_after_second_read):
+            service.backup(backup, self.volume_file)
+
+        # The chunks referenced before the cancellation were released.
+        self.assertEqual(2, len(reads))
+        self.assertEqual([], self._dedup_entries(service))
+
+    def test_delete_failed_dedup_backup(self):
+        self.mock_object(nfs.NFSBackupDriver, '_generate_object_name_prefix',
+                         lambda self, backup: 'backup_%s' % backup['id'])
+        self.flags(backup_dedup=True, backup_dedup_delete_delay=0)
+        self.flags(backup_file_size=(1024 * 8))
+        self.flags(backup_sha_block_size_bytes=1024)
+        service = nfs.NFSBackupDriver(self.ctxt)
+        self._create_backup_db_entry(backup_id=123)
+        self._create_backup_db_entry(backup_id=124)
+        self.volume_file.seek(0)
+        backup2 = objects.Backup.get_by_id(self.ctxt, 124)
+        service.backup(backup2, self.volume_file)
+        entries = self._dedup_entries(service)
+
+        backup = objects.Backup.get_by_id(self.ctxt, 123)
+        self.volume_file.seek(0)
+        self.mock_object(service, '_finalize_backup',
+                         mock.Mock(side_effect=IOError))
+        self.assertRaises(IOError, service.backup, backup, self.volume_file)
+        self.assertNotEqual(entries, self._dedup_entries(service))
+
+        # The failed backup has no metadata, its references are found in
+        # the chunk store and the chunks of the other backup are kept.
+        backup = objects.Backup.get_by_id(self.ctxt, 123)
+        service.delete(backup)
+        self.assertEqual(entries, self._dedup_entries(service))
+
+    def _backup_during_dedup_delete(self, interleave):
+        """Backup 124 while backup 123 of the same data is deleted.
+
+        interleave(service, run_backup) is called with the driver deleting
+        backup 123 and must call run_backup at the point of the delete to
+        test.
+        """
+        self.mock_object(nfs.NFSBackupDriver, '_generate_object_name_prefix',
+                         lambda self, backup: 'backup_%s' % backup['id'])
+        self.flags(backup_dedup=True, backup_dedup_delete_delay=0)
+        self.flags(backup_file_size=(1024 * 8))
+        self.flags(backup_sha_block_size_bytes=1024)
+        self._create_backup_db_entry(backup_id=123)
+        self._create_backup_db_entry(backup_id=124)
+        self.volume_file.seek(0)
+        backup = objects.Backup.get_by_id(self.ctxt, 123)
+        nfs.NFSBackupDriver(self.ctxt).backup(backup, self.volume_file)
+
+        def run_backup():
+            self.volume_file.seek(0)
+            backup2 = objects.Backup.get_by_id(self.ctxt, 124)
+            nfs.NFSBackupDriver(self.ctxt).backup(backup2, self.volume_file)
+
+        service = nfs.NFSBackupDriver(self.ctxt)
+        interleave(service, run_backup)
+        service.delete(backup)
+
+        with tempfile.NamedTemporaryFile() as restored_file:
+            backup2 = objects.Backup.get_by_id(self.ctxt, 124)
+            service.restore(backup2, '1234-5678-1234-8888', restored_file)
+            self.assertTrue(filecmp.cmp(self.volume_file.name,
+                            restored_file.name))
+
+        service.delete(backup2)
+        self.assertEqual([], self._dedup_entries(service))
+
+    def test_backup_dedup_before_delete_marks(self):
+        # The backup references the chunks after the delete found them
+        # unreferenced, and reuses them as they are not marked yet.
+        def interleave(service, run_backup):
+            get_dedup_entries = service._get_dedup_entries
+
+            def _get_dedup_entries(key):
+                entries = get_dedup_entries(key)
+                if not run_backup.done:
+                    run_backup.done = True
+                    run_backup()
+                return entries
+            run_backup.done = False
+            self.mock_object(service, '_get_dedup_entries',
+                             _get_dedup_entries)
+
+        self._backup_during_dedup_delete(interleave)
+
+    def test_backup_dedup_after_delete_marks(self):
+        # The backup references the chunks while the delete waits for its
+        # marks to settle, and stores copies of the marked chunks.
+        def interleave(service, run_backup):
+            self.flags(backup_dedup_delete_delay=1)
+
+            def _sleep(seconds):
+                if seconds == 1:
+                    self.flags(backup_dedup_delete_delay=0)
+                    run_backup()
+            self.mock_object(chunkeddriver.eventlet, 'sleep', _sleep)
+
+        self._backup_during_dedup_delete(interleave)
+
+    def test_backup_delta_json_parent_sha256file(self):
+        self.mock_object(nfs.NFSBackupDriver, '_generate_object_name_prefix',
+                         lambda self, backup: 'backup_%s' % backup['id'])
+        self.flags(backup_file_size=(1024 * 8))
+        self.flags(backup_sha_block_size_bytes=1024)
+        service = nfs.NFSBackupDriver(self.ctxt)
+        self._create_backup_db_entry(backup_id=123)
+        self.volume_file.seek(0)
+        backup = objects.Backup.get_by_id(self.ctxt, 123)
+        service.backup(backup, self.volume_file)
+
+        # Rewrite the sha256 file of the parent the way older releases did.
+        sha256file = service._read_sha256file(backup)
+        self.assertEqual(32, len(sha256file['sha256s']))
+        with service.get_object_writer(
+                backup['container'],
+                service._sha256_filename(backup)) as writer:
+            writer.write(json.dumps(sha256file, sort_keys=True, indent=2))
+
+        self.volume_file.seek(5 * 1024)
+        self.volume_file.write(os.urandom(1024))
+        self._create_backup_db_entry(backup_id=124, parent_id=123)
+        self.volume_file.seek(0)
+        deltabackup = objects.Backup.get_by_id(self.ctxt, 124)
+        service.backup(deltabackup, self.volume_file)
+
+        metadata = service._read_metadata(deltabackup)
+        self.assertEqual([{'backup_124-00001': {'compression': 'none',
+                                                'length': 1024,
+                                                'md5': 'fake-md5-sum',
+                                                'offset': 5 * 1024}}],
+                         metadata['objects'])
+        content1 = service._read_sha256file(backup)
+        content2 = service._read_sha256file(deltabackup)
+        self.assertEqual(1, len([i for i in range(32) if
+                                 content1['sha256s'][i] !=
+                                 content2['sha256s'][i]]))
+
     def test_restore_delta(self):
 
         def _fake_generate_object_name_prefix(self, backup):
@@ -568,6 +1076,19 @@ class BackupNFSSwiftBasedTestCase(test.TestCase):
         self.assertEqual(compressor, bz2)
         self.assertRaises(ValueError, service._get_compressor, 'fake')
 
+    def test_get_compressor_optional_modules(self):
+        service = nfs.NFSBackupDriver(self.ctxt)
+        fake_lz4 = mock.Mock()
+        fake_zstd = mock.Mock()
+        with mock.patch.dict('sys.modules', {'lz4': fake_lz4,
+                                             'lz4.frame': fake_lz4.frame,
+                                             'zstd': fake_zstd}):
+            self.assertEqual(fake_lz4.frame, service._get_compressor('lz4'))
+            self.assertEqual(fake_zstd, service._get_compressor('zstd'))
+        with mock.patch.dict('sys.modules', {'lz4': None, 'zstd': None}):
+            self.assertRaises(ValueError, service._get_compressor, 'lz4')
+            self.assertRaises(ValueError, service._get_compressor, 'zstd')
+
     def test_prepare_output_data_effective_compression(self):
         service = nfs.NFSBackupDriver(self.ctxt)
         # Set up buffer of 128 zeroed bytes
@@ -600,3 +1121,78 @@ class BackupNFSSwiftBasedTestCase(test.TestCase):
 
         self.assertEqual('none', result[0])
         self.assertEqual(already_compressed_data, result[1])
+
+    def test_prepare_output_data_incompressible_sample(self):
+        self.flags(backup_compression_sample_size=64)
+        service = nfs.NFSBackupDriver(self.ctxt)
+        fake_data = buffer(os.urandom(64) + bytearray(128))
+        mock_compress = self.mock_object(
+            service.compressor, 'compress',
+            mock.Mock(side_effect=service.compressor.compress))
+
+        result = service._prepare_output_data(fake_data)
+
+        self.assertEqual('none', result[0])
+        self.assertEqual(fake_data, result[1])
+        mock_compress.assert_called_once_with(fake_data[:64])
+
+    def test_prepare_output_data_compressible_sample(self):
+        self.flags(backup_compression_sample_size=64)
+        service = nfs.NFSBackupDriver(self.ctxt)
+        fake_data = buffer(bytearray(128) + os.urandom(64))
+
+        result = service._prepare_output_data(fake_data)
+
+        self.assertEqual('zlib', result[0])
+        self.assertTrue(len(result[1]) < len(fake_data))
+
+
+class ChunkPoolTestCase(test.TestCase):
+    """Test cases for the pool transferring backup chunks."""
+
+    def test_imap_unordered_failure_kills_outstanding(self):
+        pool = chunkeddriver.ChunkPool(4)
+        started = []
+        finished = []
+
+        def _fetch(item):
+            started.append(item)
+            if item == 0:
+                raise IOError()
+            eventlet.sleep(0.1)
+            finished.append(item)
+            return item
+
+        self.assertRaises(IOError, list, pool.imap_unordered(_fetch,
+                                                             range(10)))
+        eventlet.sleep(0.2)
+        self.assertEqual([0, 1, 2, 3], started)
+        self.assertEqual([], finished)
+
+    def test_imap_unordered_close_kills_outstanding(self):
+        pool = chunkeddriver.ChunkPool(2)
+        finished = []
+
+        def _fetch(item):
+            eventlet.sleep(0.1 * item)
+            finished.append(item)
+            return item
+
+        results = pool.imap_unordered(_fetch, range(10))
+        self.assertEqual(0, next(results))
+        results.close()
+        eventlet.sleep(0.3)
+        self.assertEqual([0], finished)
+
+    def test_spawn_reaps_failed_tasks(self):
+        pool = chunkeddriver.ChunkPool(3)
+
+        def _fail():
+            raise IOError()
+
+        pool.spawn(eventlet.sleep, 1)
+        pool.spawn(_fail)
+        eventlet.sleep(0)
+        # The failure surfaces before the task ahead of it completes.
+        self.assertRaises(IOError, pool.spawn, eventlet.sleep, 0)
+        pool.killall()
@@ -63,7 +63,7 @@ class FakeSwiftConnection(object):
     def head_object(self, container, name):
         return {'etag': 'fake-md5-sum'}
 
-    def get_object(self, container, name):
+    def get_object(self, container, name, resp_chunk_size=None):
         if container == 'socket_error_on_get':
             raise socket.error(111, 'ECONNREFUSED')
         if 'metadata' in name:
@@ -93,8 +93,10 @@ class FakeSwiftConnection(object):
             return (fake_object_header, fake_object_body)
 
         fake_header = None
-        fake_object_body = os.urandom(1024 * 1024)
-        return (fake_header, zlib.compress(fake_object_body))
+        fake_object_body = zlib.compress(os.urandom(1024 * 1024))
+        if resp_chunk_size:
+            fake_object_body = iter([fake_object_body])
+        return (fake_header, fake_object_body)
 
     def put_object(self, container, name, reader, content_length=None,
                    etag=None, chunk_size=None, content_type=None,
@@ -68,12 +68,16 @@ class FakeSwiftConnection2(object):
     def head_object(self, container, name):
         return {'etag': 'fake-md5-sum'}
 
-    def get_object(self, container, name):
+    def get_object(self, container, name, resp_chunk_size=None):
         if container == 'socket_error_on_get':
             raise socket.error(111, 'ECONNREFUSED')
         object_path = tempfile.gettempdir() + '/' + container + '/' + name
         with fileutils.file_open(object_path, 'rb') as object_file:
-            return (None, object_file.read())
+            body = object_file.read()
+        if resp_chunk_size:
+            body = iter([body[i:i + resp_chunk_size]
+                         for i in range(0, len(body), resp_chunk_size)])
+        return (None, body)
 
     def put_object(self, container, name, reader, content_length=None,
                    etag=None, chunk_size=None, content_type=None,
@@ -28,6 +28,7 @@ CONF.import_opt('xiv_ds8k_proxy',
 CONF.import_opt('backup_driver', 'cinder.backup.manager')
 CONF.import_opt('fixed_key', 'cinder.keymgr.conf_key_mgr', group='keymgr')
 CONF.import_opt('scheduler_driver', 'cinder.scheduler.manager')
+CONF.import_opt('quota_resources_cache_time', 'cinder.quota')
 
 def_vol_type = 'fake_vol_type'
 
@@ -53,3 +54,5 @@ def set_defaults(conf):
         os.path.join(os.path.dirname(__file__), '..', '..', '..')))
     conf.set_default('policy_dirs', [], group='oslo_policy')
     conf.set_default('auth_strategy', 'noauth')
+    # The tests create and destroy volume types directly in the database
+    conf.set_default('quota_resources_cache_time', 0)
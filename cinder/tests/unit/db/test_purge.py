@@ -18,6 +18,7 @@
 import datetime
 import uuid
 
+import mock
 from oslo_utils import timeutils
 
 from cinder import context
@@ -89,6 +90,19 @@ class PurgeDeletedTest(test.TestCase):
         self.assertEqual(2, rows)
         self.assertEqual(2, meta_rows)
 
+    @mock.patch('time.sleep')
+    def test_purge_deleted_rows_batched(self, mock_sleep):
+        # Purge 2 by 2 so that the second batch is full, and a third
+        # empty batch is needed to tell that the table is purged
+        purged = db.purge_deleted_rows(self.context, age_in_days=10,
+                                       batch_size=2, batch_interval=0.5)
+        rows = self.session.query(self.volumes).count()
+        meta_rows = self.session.query(self.vm).count()
+        self.assertEqual(2, rows)
+        self.assertEqual(2, meta_rows)
+        self.assertEqual(8, purged)
+        self.assertEqual(4, mock_sleep.call_args_list.count(mock.call(0.5)))
+
     def test_purge_deleted_rows_bad_args(self):
         # Test with no age argument
         self.assertRaises(TypeError, db.purge_deleted_rows, self.context)
@@ -100,3 +114,7 @@ class PurgeDeletedTest(test.TestCase):
         self.assertRaises(exception.InvalidParameterValue,
                           db.purge_deleted_rows, self.context,
                           age_in_days=-1)
+        # Test with a non positive batch size
+        self.assertRaises(exception.InvalidParameterValue,
+                          db.purge_deleted_rows, self.context,
+                          age_in_days=10, batch_size=0)
@@ -0,0 +1,202 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import datetime
+
+import mock
+from oslo_utils import timeutils
+
+from cinder import context
+from cinder.image import cache as image_cache
+from cinder import test
+
+
+class ImageVolumeCacheTestCase(test.TestCase):
+
+    def setUp(self):
+        super(ImageVolumeCacheTestCase, self).setUp()
+        self.mock_db = mock.Mock()
+        self.mock_volume_api = mock.Mock()
+        self.context = context.get_admin_context()
+        self.updated_at = datetime.datetime(2015, 10, 13, 12, 30)
+
+    def _build_cache(self, max_gb=0, max_count=0):
+        return image_cache.ImageVolumeCache(self.mock_db,
+                                            self.mock_volume_api,
+                                            max_gb,
+                                            max_count)
+
+    def _build_entry(self, size=10, volume_id='volume-id'):
+        return {
+            'id': 1,
+            'host': 'test@foo#bar',
+            'image_id': 'c7a8b8d4-e519-46c7-a0df-ddf1b9b9fff2',
+            'image_updated_at': self.updated_at,
+            'volume_id': volume_id,
+            'size': size,
+            'last_used': timeutils.utcnow(),
+        }
+
+    def _assert_notified(self, action, entry):
+        self.assertEqual(1, len(self.notifier.notifications))
+        msg = self.notifier.notifications[0]
+        self.assertEqual('image_volume_cache.%s' % action, msg['event_type'])
+        self.assertEqual('INFO', msg['priority'])
+        self.assertEqual('image_volume_cache.%s' % entry['host'],
+                         msg['publisher_id'])
+        self.assertEqual({'image_id': entry['image_id'],
+                          'host': entry['host']}, msg['payload'])
+
+    def test_get_entry_hit(self):
+        cache = self._build_cache()
+        entry = self._build_entry()
+        self.mock_db.image_volume_cache_get_and_update_last_used.\
+            return_value = entry
+        volume_ref = {'host': entry['host'], 'size': 20}
+        image_meta = {'updated_at': self.updated_at}
+
+        found_entry = cache.get_entry(self.context, volume_ref,
+                                      entry['image_id'], image_meta)
+
+        self.assertEqual(entry, found_entry)
+        self.mock_db.image_volume_cache_get_and_update_last_used.\
+            assert_called_once_with(self.context, entry['image_id'],
+                                    entry['host'], 20)
+        self.assertFalse(self.mock_volume_api.delete.called)
+        self._assert_notified('hit', entry)
+
+    def test_get_entry_hit_timezone_aware_image(self):
+        cache = self._build_cache()
+        entry = self._build_entry()
+        self.mock_db.image_volume_cache_get_and_update_last_used.\
+            return_value = entry
+        volume_ref = {'host': entry['host'], 'size': 10}
+        image_meta = {'updated_at': '2015-10-13T12:30:00.000000+00:00'}
+
+        found_entry = cache.get_entry(self.context, volume_ref,
+                                      entry['image_id'], image_meta)
+
+        self.assertEqual(entry, found_entry)
+
+    def test_get_entry_miss(self):
+        cache = self._build_cache()
+        entry = self._build_entry()
+        self.mock_db.image_volume_cache_get_and_update_last_used.\
+            return_value = None
+        volume_ref = {'host': entry['host'], 'size': 10}
+        image_meta = {'updated_at': self.updated_at}
+
+        found_entry = cache.get_entry(self.context, volume_ref,
+                                      entry['image_id'], image_meta)
+
+        self.assertIsNone(found_entry)
+        self._assert_notified('miss', entry)
+
+    def test_get_entry_outdated(self):
+        cache = self._build_cache()
+        entry = self._build_entry()
+        self.mock_db.image_volume_cache_get_and_update_last_used.\
+            return_value = entry
+        volume_ref = {'host': entry['host'], 'size': 10}
+        image_meta = {
+            'updated_at': self.updated_at + datetime.timedelta(hours=1)
+        }
+
+        found_entry = cache.get_entry(self.context, volume_ref,
+                                      entry['image_id'], image_meta)
+
+        self.assertIsNone(found_entry)
+        self.mock_db.image_volume_cache_delete.assert_called_once_with(
+            self.context, entry['volume_id'])
+        self.mock_volume_api.delete.assert_called_once_with(
+            self.context, self.mock_db.volume_get.return_value)
+        events = [msg['event_type'] for msg in self.notifier.notifications]
+        self.assertEqual(['image_volume_cache.evict',
+                          'image_volume_cache.miss'], events)
+
+    def test_create_cache_entry(self):
+        cache = self._build_cache()
+        entry = self._build_entry()
+        self.mock_db.image_volume_cache_create.return_value = entry
+        volume_ref = {'id': entry['volume_id'], 'host': entry['host'],
+                      'size': entry['size']}
+        image_meta = {'updated_at': '2015-10-13T12:30:00.000000'}
+
+        created_entry = cache.create_cache_entry(self.context, volume_ref,
+                                                 entry['image_id'],
+                                                 image_meta)
+
+        self.assertEqual(entry, created_entry)
+        self.mock_db.image_volume_cache_create.assert_called_once_with(
+            self.context, entry['host'], entry['image_id'],
+            self.updated_at, entry['volume_id'], entry['size'])
+
+    def test_ensure_space_unlimited(self):
+        cache = self._build_cache()
+
+        self.assertTrue(cache.ensure_space(self.context, 500, 'host'))
+        self.assertFalse(
+            self.mock_db.image_volume_cache_get_all_for_host.called)
+
+    def test_ensure_space_no_entries(self):
+        cache = self._build_cache(max_gb=100, max_count=10)
+        self.mock_db.image_volume_cache_get_all_for_host.return_value = []
+
+        self.assertTrue(cache.ensure_space(self.context, 50, 'host'))
+        self.assertFalse(self.mock_volume_api.delete.called)
+
+    def test_ensure_space_need_gb(self):
+        cache = self._build_cache(max_gb=30)
+        entries = [self._build_entry(size=12, volume_id='vol-1'),
+                   self._build_entry(size=5, volume_id='vol-2'),
+                   self._build_entry(size=10, volume_id='vol-3')]
+        self.mock_db.image_volume_cache_get_all_for_host.return_value = (
+            entries)
+
+        self.assertTrue(cache.ensure_space(self.context, 15, 'host'))
+
+        self.assertEqual(
+            [mock.call(self.context, 'vol-3'),
+             mock.call(self.context, 'vol-2')],
+            self.mock_db.image_volume_cache_delete.call_args_list)
+        self.assertEqual(2, self.mock_volume_api.delete.call_count)
+
+    def test_ensure_space_need_count(self):
+        cache = self._build_cache(max_count=2)
+        entries = [self._build_entry(size=12, volume_id='vol-1'),
+                   self._build_entry(size=5, volume_id='vol-2')]
+        self.mock_db.image_volume_cache_get_all_for_host.return_value = (
+            entries)
+
+        self.assertTrue(cache.ensure_space(self.context, 15, 'host'))
+
+        self.mock_db.image_volume_cache_delete.assert_called_once_with(
+            self.context, 'vol-2')
+
+    def test_ensure_space_cant_free_enough_gb(self):
+        cache = self._build_cache(max_gb=30)
+        self.mock_db.image_volume_cache_get_all_for_host.return_value = [
+            self._build_entry(size=25)]
+
+        self.assertFalse(cache.ensure_space(self.context, 50, 'host'))
+        self.assertFalse(self.mock_volume_api.delete.called)
+
+    def test_evict_delete_failure(self):
+        cache = self._build_cache(max_count=1)
+        entry = self._build_entry()
+        self.mock_db.image_volume_cache_get_all_for_host.return_value = [
+            entry]
+        self.mock_volume_api.delete.side_effect = Exception
+
+        self.assertTrue(cache.ensure_space(self.context, 1, 'host'))
+        self.mock_db.image_volume_cache_delete.assert_called_once_with(
+            self.context, entry['volume_id'])
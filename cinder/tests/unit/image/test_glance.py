@@ -15,10 +15,15 @@
 
 
 import datetime
+import hashlib
+import re
 
+import eventlet
+from eventlet import wsgi
 import glanceclient.exc
 import mock
 from oslo_config import cfg
+from oslo_utils import units
 
 from cinder import context
 from cinder import exception
@@ -666,6 +671,106 @@ class TestGlanceImageService(test.TestCase):
         self.assertEqual(expected, actual)
 
 
+class FakeGlanceServer(object):
+    """Local HTTP stand-in for the image data API of Glance."""
+
+    def __init__(self, image_data, support_ranges=True):
+        self.image_data = image_data
+        self.support_ranges = support_ranges
+        self.requests = []
+        self.sock = eventlet.listen(('127.0.0.1', 0))
+        self.netloc = '127.0.0.1:%d' % self.sock.getsockname()[1]
+
+    def start(self):
+        return eventlet.spawn(wsgi.server, self.sock, self, log=NullWriter(),
+                              log_output=False)
+
+    def __call__(self, environ, start_response):
+        data = self.image_data
+        image_range = environ.get('HTTP_RANGE')
+        self.requests.append(image_range)
+        match = re.match(r'bytes=(\d+)-(\d+)$', image_range or '')
+        if match and self.support_ranges:
+            start, end = int(match.group(1)), int(match.group(2))
+            status = '206 Partial Content'
+            headers = [('Content-Range',
+                        'bytes %d-%d/%d' % (start, end, len(data)))]
+            data = data[start:end + 1]
+        else:
+            status = '200 OK'
+            headers = []
+        headers += [('Content-Type', 'application/octet-stream'),
+                    ('Content-Length', str(len(data)))]
+        start_response(status, headers)
+        return [data]
+
+
+class TestGlanceImageServiceRangeDownload(test.TestCase):
+
+    def setUp(self):
+        super(TestGlanceImageServiceRangeDownload, self).setUp()
+        self.context = context.RequestContext('fake', 'fake', auth_token=True)
+        self.flags(glance_download_workers=3, glance_download_range_size=1)
+        # 3.5 ranges of data
+        self.image_data = b''.join(chr(i % 251) for i in
+                                   range(7 * units.Mi // 2))
+
+    def _download(self, support_ranges=True, checksum=None):
+        server = FakeGlanceServer(self.image_data, support_ranges)
+        self.addCleanup(server.start().kill)
+        self.requests = server.requests
+
+        client = glance.GlanceClientWrapper(self.context, server.netloc,
+                                            version=1)
+        service = glance.GlanceImageService(client=client)
+        image_meta = {
+            'size': len(self.image_data),
+            'checksum': checksum or hashlib.md5(self.image_data).hexdigest(),
+        }
+        written = []
+        writer = mock.Mock(write=written.append)
+        with mock.patch.object(service, 'show', return_value=image_meta):
+            service.download(self.context, 'fake-image-id', writer)
+        return b''.join(written)
+
+    def test_download_ranges(self):
+        self.assertEqual(self.image_data, self._download())
+        self.assertEqual(['bytes=0-1048575', 'bytes=1048576-2097151',
+                          'bytes=2097152-3145727', 'bytes=3145728-3670015'],
+                         sorted(self.requests))
+
+    def test_download_ranges_not_supported(self):
+        self.assertEqual(self.image_data,
+                         self._download(support_ranges=False))
+        self.assertEqual(['bytes=0-1048575'], self.requests)
+
+    def test_download_ranges_checksum_mismatch(self):
+        self.assertRaises(exception.ImageUnacceptable, self._download,
+                          checksum='bad-checksum')
+
+    @mock.patch.object(glance.GlanceImageService, '_download_ranges')
+    def test_download_small_image_single_stream(self, mock_download_ranges):
+        self.flags(glance_download_range_size=4)
+
+        self.assertEqual(self.image_data, self._download())
+        self.assertFalse(mock_download_ranges.called)
+        self.assertEqual([None], self.requests)
+
+    def test_download_single_stream_checksum_mismatch(self):
+        self.flags(glance_download_workers=1)
+
+        self.assertRaises(exception.ImageUnacceptable, self._download,
+                          checksum='bad-checksum')
+        self.assertEqual([None], self.requests)
+
+    def test_download_small_image_checksum_mismatch(self):
+        self.flags(glance_download_range_size=4)
+
+        self.assertRaises(exception.ImageUnacceptable, self._download,
+                          checksum='bad-checksum')
+        self.assertEqual([None], self.requests)
+
+
 class TestGlanceClientVersion(test.TestCase):
     """Tests the version of the glance client generated."""
 
@@ -77,6 +77,13 @@ class TestBackup(test_objects.BaseObjectsTestCase):
         admin_context = backup_destroy.call_args[0][0]
         self.assertTrue(admin_context.is_admin)
 
+    def test_obj_make_compatible_stats(self):
+        backup = objects.Backup(context=self.context, stats='{}')
+        primitive = backup.obj_to_primitive('1.0')
+        self.assertNotIn('stats', primitive['versioned_object.data'])
+        primitive = backup.obj_to_primitive('1.1')
+        self.assertEqual('{}', primitive['versioned_object.data']['stats'])
+
     def test_obj_field_temp_volume_snapshot_id(self):
         backup = objects.Backup(context=self.context,
                                 temp_volume_id='2',
@@ -85,6 +85,8 @@ class FakeHostManager(host_manager.HostManager):
                       'reserved_percentage': 5,
                       'timestamp': None},
         }
+        # As if all of the hosts had just reported their capabilities.
+        self._updated_hosts = set(self.service_states)
 
 
 class FakeHostState(host_manager.HostState):
@@ -162,6 +162,66 @@ class FilterSchedulerTestCase(test_scheduler.SchedulerTestCase):
         self.assertIsNotNone(weighed_host.obj)
         self.assertTrue(_mock_service_get_all_by_topic.called)
 
+    @mock.patch('cinder.db.volume_update')
+    @mock.patch('cinder.db.service_get_all_by_topic')
+    def test_schedule_create_volumes(self, _mock_service_get_all_by_topic,
+                                     _mock_volume_update):
+        sched = fakes.FakeFilterScheduler()
+        sched.host_manager = fakes.FakeHostManager()
+        sched.volume_rpcapi = mock.Mock()
+        fake_context = context.RequestContext('user', 'project',
+                                              is_admin=True)
+        fakes.mock_host_manager_db_calls(_mock_service_get_all_by_topic)
+
+        def _request_spec(volume_id, size):
+            return {'volume_id': volume_id,
+                    'volume_type': {'name': 'LVM_iSCSI'},
+                    'volume_properties': {'project_id': 1,
+                                          'size': size,
+                                          'display_name': volume_id}}
+
+        request_specs = [_request_spec('fake-id%d' % i, 400)
+                         for i in range(3)]
+        request_specs.append(_request_spec('fake-id3', 10))
+        _mock_service_get_all_by_topic.reset_mock()
+
+        with mock.patch.object(sched.host_manager, 'get_filtered_hosts',
+                               wraps=sched.host_manager.get_filtered_hosts
+                               ) as mock_filter:
+            failures = sched.schedule_create_volumes(fake_context,
+                                                     request_specs)
+
+        # The host states are refreshed once for the whole batch.
+        self.assertEqual(1, _mock_service_get_all_by_topic.call_count)
+        # The full filter pass runs once per request shape, the following
+        # requests of a shape only recheck the capacity.
+        full_passes = [c for c in mock_filter.call_args_list
+                       if 'filter_class_names' not in c[1]]
+        self.assertEqual(2, len(full_passes))
+        rechecks = [c[1]['filter_class_names'] for c in
+                    mock_filter.call_args_list
+                    if 'filter_class_names' in c[1]]
+        self.assertEqual([['CapacityFilter']] * 2, rechecks)
+        self.assertEqual([], failures)
+        self.assertEqual(4, sched.volume_rpcapi.create_volume.call_count)
+
+    def test_schedule_create_volumes_no_hosts(self):
+        sched = fakes.FakeFilterScheduler()
+        sched.volume_rpcapi = mock.Mock()
+        fake_context = context.RequestContext('user', 'project')
+        request_specs = [{'volume_properties': {'project_id': 1,
+                                                'size': 1},
+                          'volume_type': {'name': 'LVM_iSCSI'},
+                          'volume_id': 'fake-id%d' % i} for i in range(2)]
+
+        failures = sched.schedule_create_volumes(fake_context, request_specs)
+
+        self.assertEqual(['fake-id0', 'fake-id1'],
+                         [spec['volume_id'] for spec, _ex in failures])
+        for _spec, ex in failures:
+            self.assertIsInstance(ex, exception.NoValidHost)
+        self.assertFalse(sched.volume_rpcapi.create_volume.called)
+
     def test_max_attempts(self):
         self.flags(scheduler_max_attempts=4)
 
@@ -65,6 +65,26 @@ class CapacityFilterTestCase(HostFiltersTestCase):
                                     'service': service})
         self.assertTrue(filt_cls.host_passes(host, filter_properties))
 
+    @mock.patch('cinder.scheduler.filters.capacity_filter.LOG')
+    @mock.patch('cinder.utils.service_is_up')
+    def test_filter_passes_logs_space(self, _mock_serv_is_up, _mock_log):
+        _mock_serv_is_up.return_value = True
+        _mock_log.isEnabledFor.return_value = True
+        filt_cls = self.class_map['CapacityFilter']()
+        filter_properties = {'size': 100}
+        service = {'disabled': False}
+        host = fakes.FakeHostState('host1',
+                                   {'total_capacity_gb': 500,
+                                    'free_capacity_gb': 200,
+                                    'reserved_percentage': 20,
+                                    'updated_at': None,
+                                    'service': service})
+        self.assertTrue(filt_cls.host_passes(host, filter_properties))
+        self.assertIn(mock.call(mock.ANY, {'host': 'host1',
+                                           'requested': 100,
+                                           'available': 100.0}),
+                      _mock_log.debug.call_args_list)
+
     @mock.patch('cinder.utils.service_is_up')
     def test_filter_current_host_passes(self, _mock_serv_is_up):
         _mock_serv_is_up.return_value = True
@@ -92,6 +112,50 @@ class CapacityFilterTestCase(HostFiltersTestCase):
                                     'service': service})
         self.assertFalse(filt_cls.host_passes(host, filter_properties))
 
+    def test_filter_all(self):
+        filt_cls = self.class_map['CapacityFilter']()
+        filter_properties = {'size': 100, 'vol_exists_on': 'host5'}
+        capabilities = [
+            {'total_capacity_gb': 500, 'free_capacity_gb': 200},
+            {'total_capacity_gb': 200, 'free_capacity_gb': 120,
+             'reserved_percentage': 20},
+            {'free_capacity_gb': None},
+            {'total_capacity_gb': 'infinite', 'free_capacity_gb': 'unknown'},
+            {'total_capacity_gb': 100, 'free_capacity_gb': 10},
+            {'total_capacity_gb': 500, 'free_capacity_gb': 60,
+             'provisioned_capacity_gb': 400,
+             'max_over_subscription_ratio': 2.0,
+             'thin_provisioning_support': True},
+            {'total_capacity_gb': 500, 'free_capacity_gb': 40,
+             'provisioned_capacity_gb': 950,
+             'max_over_subscription_ratio': 2.0,
+             'thin_provisioning_support': True},
+        ]
+        hosts = [fakes.FakeHostState('host%d' % i, capability)
+                 for i, capability in enumerate(capabilities, 1)]
+
+        result = filt_cls.filter_all(hosts, filter_properties)
+
+        self.assertEqual(['host1', 'host4', 'host5', 'host6'],
+                         [host.host for host in result])
+
+    def test_filter_all_subclass_host_passes(self):
+        class OddHostsCapacityFilter(self.class_map['CapacityFilter']):
+            def host_passes(self, host_state, filter_properties):
+                return (int(host_state.host[-1]) % 2 and
+                        super(OddHostsCapacityFilter, self).host_passes(
+                            host_state, filter_properties))
+
+        filt_cls = OddHostsCapacityFilter()
+        hosts = [fakes.FakeHostState('host%d' % i,
+                                     {'total_capacity_gb': 500,
+                                      'free_capacity_gb': 200})
+                 for i in range(1, 4)]
+
+        result = filt_cls.filter_all(hosts, {'size': 100})
+
+        self.assertEqual(['host1', 'host3'], [host.host for host in result])
+
     @mock.patch('cinder.utils.service_is_up')
     def test_filter_fails_free_capacity_None(self, _mock_serv_is_up):
         _mock_serv_is_up.return_value = True
@@ -700,6 +764,30 @@ class AffinityFilterTestCase(HostFiltersTestCase):
 
         self.assertFalse(filt_cls.host_passes(host, filter_properties))
 
+    def _test_filter_all_queries_once(self, filter_name, hint, expected):
+        filt_cls = self.class_map[filter_name]()
+        hosts = [fakes.FakeHostState('host%s' % i, {}) for i in range(1, 4)]
+        vol_ids = [utils.create_volume(self.context, host=host).id
+                   for host in ('host1', 'host3')]
+
+        filter_properties = {'context': self.context.elevated(),
+                             'scheduler_hints': {hint: vol_ids}}
+
+        with mock.patch.object(filt_cls.volume_api, 'get_all',
+                               wraps=filt_cls.volume_api.get_all) as get_all:
+            result = filt_cls.filter_all(hosts, filter_properties)
+
+        self.assertEqual(expected, [host.host for host in result])
+        self.assertEqual(1, get_all.call_count)
+
+    def test_different_filter_all_queries_once(self):
+        self._test_filter_all_queries_once('DifferentBackendFilter',
+                                           'different_host', ['host2'])
+
+    def test_same_filter_all_queries_once(self):
+        self._test_filter_all_queries_once('SameBackendFilter',
+                                           'same_host', ['host1', 'host3'])
+
 
 class DriverFilterTestCase(HostFiltersTestCase):
     def test_passing_function(self):
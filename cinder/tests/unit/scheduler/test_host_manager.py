@@ -84,6 +84,51 @@ class HostManagerTestCase(test.TestCase):
         self.assertEqual(expected, mock_func.call_args_list)
         self.assertEqual(set(self.fake_hosts), set(result))
 
+    @mock.patch('cinder.scheduler.host_manager.HostManager.'
+                '_choose_host_filters')
+    def test_get_filtered_hosts_records_decision_stats(
+            self, _mock_choose_host_filters):
+        filter_class = FakeFilterClass1
+        filter_class._filter_one = mock.Mock(side_effect=[True, False,
+                                                          True, False])
+        _mock_choose_host_filters.return_value = [filter_class]
+
+        result = self.host_manager.get_filtered_hosts(self.fake_hosts, {})
+        self.assertEqual(2, len(result))
+        self.host_manager.get_filtered_hosts([], {})
+
+        stats = self.host_manager.decision_stats.to_dict()
+        self.assertEqual({}, stats['weighers'])
+        counters = stats['filters']['FakeFilterClass1']
+        self.assertEqual(2, counters['calls'])
+        self.assertEqual(4, counters['hosts'])
+        self.assertEqual(2, counters['hosts_eliminated'])
+        self.assertGreaterEqual(counters['seconds'], 0)
+
+    def test_get_weighed_hosts_records_decision_stats(self):
+        hosts = []
+        for x, capacity in enumerate([100, 300, 200]):
+            host = host_manager.HostState('host%s' % x)
+            host.allocated_capacity_gb = capacity
+            host.free_capacity_gb = capacity
+            host.total_capacity_gb = 400
+            hosts.append(host)
+
+        weighed_hosts = self.host_manager.get_weighed_hosts(
+            hosts, {}, ['CapacityWeigher', 'AllocatedCapacityWeigher'])
+
+        expected = self.host_manager.weight_handler.get_weighed_objects(
+            self.host_manager._choose_host_weighers(
+                ['CapacityWeigher', 'AllocatedCapacityWeigher']), hosts, {})
+        self.assertEqual([(w.obj, w.weight) for w in expected],
+                         [(w.obj, w.weight) for w in weighed_hosts])
+        stats = self.host_manager.decision_stats.to_dict()
+        self.assertEqual(['AllocatedCapacityWeigher', 'CapacityWeigher'],
+                         sorted(stats['weighers']))
+        for counters in stats['weighers'].values():
+            self.assertEqual(1, counters['calls'])
+            self.assertEqual(3, counters['hosts'])
+
     @mock.patch('oslo_utils.timeutils.utcnow')
     def test_update_service_capabilities(self, _mock_utcnow):
         service_states = self.host_manager.service_states
@@ -161,6 +206,7 @@ class HostManagerTestCase(test.TestCase):
         latest copy of service_capabilities, which is timestamped with the
         current date/time.
         """
+        self.flags(scheduler_host_state_resync_interval=0)
         context = 'fake_context'
         _mock_utcnow.side_effect = [400, 401, 402]
 
@@ -200,10 +246,100 @@ class HostManagerTestCase(test.TestCase):
             self.assertEqual(1, len(res))
             self.assertEqual(402, res[0]['capabilities']['timestamp'])
 
+    @mock.patch('cinder.db.service_get_all_by_topic')
+    @mock.patch('cinder.utils.service_is_up')
+    def test_get_all_host_states_drops_disabled_service(
+            self, _mock_service_is_up, _mock_service_get_all_by_topic):
+        context = 'fake_context'
+        _mock_service_is_up.return_value = True
+        services = [
+            dict(id=1, host='host1', topic='volume', disabled=False,
+                 availability_zone='zone1', updated_at=timeutils.utcnow()),
+            dict(id=2, host='host2', topic='volume', disabled=False,
+                 availability_zone='zone1', updated_at=timeutils.utcnow()),
+        ]
+        _mock_service_get_all_by_topic.return_value = services
+        for host in ('host1', 'host2'):
+            self.host_manager.update_service_capabilities(
+                'volume', host, dict(volume_backend_name='AAA',
+                                     total_capacity_gb=512,
+                                     free_capacity_gb=200,
+                                     reserved_percentage=0))
+        hosts = self.host_manager.get_all_host_states(context)
+        self.assertEqual(2, len(hosts))
+
+        # By default, disabling a service takes effect on the next request.
+        _mock_service_get_all_by_topic.return_value = services[:1]
+        hosts = self.host_manager.get_all_host_states(context)
+        self.assertEqual(['host1#AAA'], [h.host for h in hosts])
+
+    @mock.patch('time.time')
+    @mock.patch('cinder.db.service_get_all_by_topic')
+    @mock.patch('cinder.utils.service_is_up')
+    def test_get_all_host_states_incremental(self, _mock_service_is_up,
+                                             _mock_service_get_all_by_topic,
+                                             _mock_time):
+        self.flags(scheduler_host_state_resync_interval=60)
+        context = 'fake_context'
+        _mock_time.return_value = 1000
+        _mock_service_is_up.return_value = True
+        services = [
+            dict(id=1, host='host1', topic='volume', disabled=False,
+                 availability_zone='zone1', updated_at=timeutils.utcnow()),
+            dict(id=2, host='host2', topic='volume', disabled=False,
+                 availability_zone='zone1', updated_at=timeutils.utcnow()),
+        ]
+        _mock_service_get_all_by_topic.return_value = services[:1]
+
+        def capabilities(free_capacity_gb):
+            return dict(volume_backend_name='AAA', total_capacity_gb=512,
+                        free_capacity_gb=free_capacity_gb,
+                        reserved_percentage=0)
+
+        # A host reporting for the first time triggers a reload.
+        self.host_manager.update_service_capabilities('volume', 'host1',
+                                                      capabilities(200))
+        hosts = self.host_manager.get_all_host_states(context)
+        self.assertEqual([200], [h.free_capacity_gb for h in hosts])
+        self.assertEqual(1, _mock_service_get_all_by_topic.call_count)
+
+        # Reports of known hosts are applied without reloading.
+        self.host_manager.update_service_capabilities('volume', 'host1',
+                                                      capabilities(100))
+        hosts = self.host_manager.get_all_host_states(context)
+        self.assertEqual([100], [h.free_capacity_gb for h in hosts])
+        self.assertEqual(1, _mock_service_get_all_by_topic.call_count)
+        capacities = self.host_manager.pool_capacities
+        self.assertEqual(['host1#AAA'], capacities.hosts)
+        self.assertEqual([100.0], list(capacities.free))
+
+        _mock_service_get_all_by_topic.return_value = services
+        self.host_manager.update_service_capabilities('volume', 'host2',
+                                                      capabilities(300))
+        hosts = self.host_manager.get_all_host_states(context)
+        self.assertEqual([100, 300],
+                         sorted(h.free_capacity_gb for h in hosts))
+        self.assertEqual(2, _mock_service_get_all_by_topic.call_count)
+
+        # Services are reloaded once the resync interval elapsed.
+        _mock_service_is_up.side_effect = [True, False]
+        _mock_time.return_value += CONF.scheduler_host_state_resync_interval
+        hosts = self.host_manager.get_all_host_states(context)
+        self.assertEqual(3, _mock_service_get_all_by_topic.call_count)
+        self.assertEqual(['host1#AAA'], [h.host for h in hosts])
+        # The capacity columns follow the host states.
+        self.assertEqual(['host1#AAA'], capacities.hosts)
+        self.assertEqual({'host1#AAA': 0}, capacities.rows)
+        hosts[0].consume_from_volume({'size': 10})
+        self.assertEqual([90.0], list(capacities.free))
+        self.assertEqual((capacities, [0]),
+                         host_manager.PoolCapacities.for_hosts(hosts))
+
     @mock.patch('cinder.db.service_get_all_by_topic')
     @mock.patch('cinder.utils.service_is_up')
     def test_get_all_host_states(self, _mock_service_is_up,
                                  _mock_service_get_all_by_topic):
+        self.flags(scheduler_host_state_resync_interval=0)
         context = 'fake_context'
         topic = CONF.volume_topic
 
@@ -290,6 +426,7 @@ class HostManagerTestCase(test.TestCase):
     @mock.patch('cinder.utils.service_is_up')
     def test_get_pools(self, _mock_service_is_up,
                        _mock_service_get_all_by_topic):
+        self.flags(scheduler_host_state_resync_interval=0)
         context = 'fake_context'
 
         services = [
@@ -587,3 +724,48 @@ class PoolStateTestCase(test.TestCase):
                          fake_pool.provisioned_capacity_gb)
 
         self.assertDictMatch(fake_pool.capabilities, volume_capability)
+
+
+class PoolCapacitiesTestCase(test.TestCase):
+    """Test case for PoolCapacities class."""
+
+    def _pool(self, pool_name, free_capacity_gb):
+        pool = host_manager.PoolState('host1', None, pool_name)
+        pool.update_from_volume_capability(
+            {'total_capacity_gb': 1024, 'free_capacity_gb': free_capacity_gb,
+             'reserved_percentage': 0, 'timestamp': None})
+        return pool
+
+    def test_update_and_remove(self):
+        pools = [self._pool('pool%d' % i, i) for i in range(3)]
+        capacities = host_manager.PoolCapacities(pools)
+        self.assertEqual([0.0, 1.0, 2.0], list(capacities.free))
+
+        pools[1].free_capacity_gb = 'infinite'
+        capacities.update(pools[1])
+        self.assertEqual([0.0, float('inf'), 2.0], list(capacities.free))
+
+        # The last row is moved into the removed one.
+        capacities.remove('host1#pool0')
+        self.assertEqual(['host1#pool2', 'host1#pool1'], capacities.hosts)
+        self.assertEqual({'host1#pool2': 0, 'host1#pool1': 1},
+                         capacities.rows)
+        self.assertEqual([2.0, float('inf')], list(capacities.free))
+        self.assertEqual([True, True], capacities.has_space(2))
+        self.assertEqual([True], capacities.has_space(2, rows=[1]))
+        self.assertEqual([-1], capacities.free_capacities(rows=[1]))
+
+    def test_for_hosts_unregistered(self):
+        pools = [self._pool('pool0', 10), self._pool('pool1', 20)]
+        shared = host_manager.PoolCapacities(pools[:1])
+        pools[0].capacities = shared
+
+        # pool1 is not in the shared columns, the states are converted.
+        capacities, rows = host_manager.PoolCapacities.for_hosts(pools)
+        self.assertIsNot(shared, capacities)
+        self.assertEqual([0, 1], rows)
+        self.assertEqual([10.0, 20.0], list(capacities.free))
+
+        capacities, rows = host_manager.PoolCapacities.for_hosts(pools[:1])
+        self.assertIs(shared, capacities)
+        self.assertEqual([0], rows)
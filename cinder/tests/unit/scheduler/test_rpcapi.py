@@ -98,6 +98,34 @@ class SchedulerRpcAPITestCase(test.TestCase):
                                  filter_properties='filter_properties',
                                  version='1.2')
 
+    @mock.patch('oslo_messaging.RPCClient.can_send_version',
+                return_value=True)
+    def test_create_volumes(self, mock_can_send_version):
+        self._test_scheduler_api('create_volumes',
+                                 rpc_method='cast',
+                                 topic='topic',
+                                 request_spec_list=['fake_request_spec'],
+                                 filter_properties_list=['filter_properties'],
+                                 version='1.9')
+
+    @mock.patch('oslo_messaging.RPCClient.can_send_version',
+                return_value=False)
+    @mock.patch.object(scheduler_rpcapi.SchedulerAPI, 'create_volume')
+    def test_create_volumes_old_scheduler(self, mock_create_volume,
+                                          mock_can_send_version):
+        ctxt = context.RequestContext('fake_user', 'fake_project')
+        rpcapi = scheduler_rpcapi.SchedulerAPI()
+        request_spec = {'volume_id': 'fake-id', 'snapshot_id': None,
+                        'image_id': None}
+
+        rpcapi.create_volumes(ctxt, 'topic', [request_spec],
+                              [{'scheduler_hints': 1}])
+
+        mock_create_volume.assert_called_once_with(
+            ctxt, 'topic', 'fake-id', snapshot_id=None, image_id=None,
+            request_spec=request_spec,
+            filter_properties={'scheduler_hints': 1})
+
     def test_migrate_volume_to_host(self):
         self._test_scheduler_api('migrate_volume_to_host',
                                  rpc_method='cast',
@@ -132,3 +160,8 @@ class SchedulerRpcAPITestCase(test.TestCase):
                                  rpc_method='call',
                                  filters=None,
                                  version='1.7')
+
+    def test_get_decision_stats(self):
+        self._test_scheduler_api('get_decision_stats',
+                                 rpc_method='call',
+                                 version='1.10')
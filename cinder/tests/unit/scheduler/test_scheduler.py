@@ -112,6 +112,36 @@ class SchedulerManagerTestCase(test.TestCase):
         _mock_sched_create.assert_called_once_with(self.context, request_spec,
                                                    {})
 
+    @mock.patch('cinder.rpc.get_notifier')
+    @mock.patch('cinder.scheduler.driver.Scheduler.get_decision_stats')
+    def test_emit_decision_stats(self, _mock_get_stats, _mock_get_notifier):
+        _mock_get_stats.return_value = {'filters': {}, 'weighers': {}}
+
+        self.manager._emit_decision_stats(self.context)
+        self.assertFalse(_mock_get_notifier.called)
+
+        self.flags(scheduler_decision_stats_notifications=True)
+        self.manager._emit_decision_stats(self.context)
+        _mock_get_notifier.assert_called_once_with('scheduler')
+        _mock_get_notifier.return_value.info.assert_called_once_with(
+            self.context, 'scheduler.decision_stats',
+            {'filters': {}, 'weighers': {}})
+
+    @mock.patch('cinder.scheduler.driver.Scheduler.schedule_create_volume')
+    @mock.patch('cinder.db.volume_update')
+    def test_create_volumes_puts_failed_volumes_in_error_state(
+            self, _mock_volume_update, _mock_sched_create):
+        _mock_sched_create.side_effect = [exception.NoValidHost(reason=""),
+                                          None]
+        topic = 'fake_topic'
+        request_specs = [{'volume_id': 1}, {'volume_id': 2}]
+
+        self.manager.create_volumes(self.context, topic, request_specs,
+                                    filter_properties_list=[{}, {}])
+        _mock_volume_update.assert_called_once_with(self.context, 1,
+                                                    {'status': 'error'})
+        self.assertEqual(2, _mock_sched_create.call_count)
+
     @mock.patch('cinder.scheduler.driver.Scheduler.schedule_create_volume')
     @mock.patch('eventlet.sleep')
     def test_create_volume_no_delay(self, _mock_sleep, _mock_sched_create):
@@ -46,6 +46,11 @@ def fake_volume_data_get_for_host(context, host, count_only=False):
         return 6
 
 
+def fake_volume_count_get_for_hosts(context, hosts):
+    return {host: fake_volume_data_get_for_host(context, host, True)
+            for host in hosts}
+
+
 class VolumeNumberWeigherTestCase(test.TestCase):
     def setUp(self):
         super(VolumeNumberWeigherTestCase, self).setUp()
@@ -82,9 +87,13 @@ class VolumeNumberWeigherTestCase(test.TestCase):
         # host4: 4 volumes
         # host5: 5 volumes   Norm=-1.0
         # so, host1 should win:
-        with mock.patch.object(api, 'volume_data_get_for_host',
-                               fake_volume_data_get_for_host):
+        with mock.patch.object(api, 'volume_count_get_for_hosts',
+                               side_effect=fake_volume_count_get_for_hosts
+                               ) as count_get:
             weighed_host = self._get_weighed_host(hostinfo_list)
+            # The volumes of all the hosts are counted at once
+            count_get.assert_called_once_with(
+                self.context, [host.host for host in hostinfo_list])
             self.assertEqual(0.0, weighed_host.weight)
             self.assertEqual('host1',
                              utils.extract_host(weighed_host.obj.host))
@@ -99,9 +108,13 @@ class VolumeNumberWeigherTestCase(test.TestCase):
         # host4: 4 volumes
         # host5: 5 volumes     Norm=1
         # so, host5 should win:
-        with mock.patch.object(api, 'volume_data_get_for_host',
-                               fake_volume_data_get_for_host):
+        with mock.patch.object(api, 'volume_count_get_for_hosts',
+                               side_effect=fake_volume_count_get_for_hosts
+                               ) as count_get:
             weighed_host = self._get_weighed_host(hostinfo_list)
+            # The volumes of all the hosts are counted at once
+            count_get.assert_called_once_with(
+                self.context, [host.host for host in hostinfo_list])
             self.assertEqual(1.0, weighed_host.weight)
             self.assertEqual('host5',
                              utils.extract_host(weighed_host.obj.host))
@@ -228,6 +228,41 @@ class BackupTestCase(BaseBackupTest):
         self.assertTrue(mock_delete_volume.called)
         self.assertTrue(mock_delete_snapshot.called)
 
+    @mock.patch('cinder.backup.rpcapi.BackupAPI.create_backup')
+    def test_init_host_resumes_checkpointed_backup(self, mock_create_backup):
+        vol1_id = self._create_volume_db_entry()
+        vol2_id = self._create_volume_db_entry(previous_status='in-use')
+        vol3_id = self._create_volume_db_entry()
+        backup1 = self._create_backup_db_entry(status='creating',
+                                               volume_id=vol1_id)
+        backup2 = self._create_backup_db_entry(status='creating',
+                                               volume_id=vol2_id)
+        backup3 = self._create_backup_db_entry(status='creating',
+                                               volume_id=vol3_id)
+        backup_driver = self.backup_mgr.service.get_backup_driver(self.ctxt)
+
+        def has_checkpoint(backup):
+            return backup.id != backup3.id
+
+        self.mock_object(self.backup_mgr.service, 'get_backup_driver',
+                         mock.Mock(return_value=backup_driver))
+        self.mock_object(backup_driver, 'has_checkpoint',
+                         mock.Mock(side_effect=has_checkpoint))
+
+        self.backup_mgr.init_host()
+
+        self.assertEqual(1, mock_create_backup.call_count)
+        self.assertEqual(backup1.id, mock_create_backup.call_args[0][1].id)
+        backup1 = db.backup_get(self.ctxt, backup1.id)
+        self.assertEqual('creating', backup1['status'])
+        vol1 = db.volume_get(self.ctxt, vol1_id)
+        self.assertEqual('backing-up', vol1['status'])
+        self.assertEqual('available', vol1['previous_status'])
+        backup2 = db.backup_get(self.ctxt, backup2.id)
+        self.assertEqual('error', backup2['status'])
+        backup3 = db.backup_get(self.ctxt, backup3.id)
+        self.assertEqual('error', backup3['status'])
+
     @mock.patch.object(db, 'volume_get')
     @ddt.data(KeyError, exception.VolumeNotFound)
     def test_cleanup_temp_volumes_snapshots_volume_not_found(
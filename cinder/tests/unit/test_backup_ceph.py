@@ -378,6 +378,22 @@ class BackupCephTestCase(test.TestCase):
 
         self.assertTrue(self.service.rbd.Image.return_value.write.called)
 
+    @common_mocks
+    @mock.patch('cinder.volume.utils.notify_about_backup_usage')
+    def test_backup_volume_from_file_stats(self, mock_notify):
+        with mock.patch.object(self.service, '_backup_metadata'):
+            with mock.patch.object(self.service, '_discard_bytes'):
+                self.service.backup(self.backup, self.volume_file)
+
+        self.assertEqual(1, mock_notify.call_count)
+        extra_usage_info = mock_notify.call_args[1]['extra_usage_info']
+        self.assertEqual(100, extra_usage_info['backup_percent'])
+        stats = extra_usage_info['backup_stats']
+        self.assertEqual(self.data_length, stats['bytes_read'])
+        self.assertEqual(self.data_length, stats['bytes_uploaded'])
+        self.assertEqual(0, stats['bytes_skipped'])
+        self.assertEqual(stats, jsonutils.loads(self.backup.stats))
+
     @common_mocks
     def test_get_backup_base_name(self):
         name = self.service._get_backup_base_name(self.volume_id,
@@ -43,8 +43,11 @@ from cinder.tests.unit.backup import fake_swift_client2
 CONF = cfg.CONF
 
 
-def fake_md5(arg):
+def fake_md5(arg=None):
     class result(object):
+        def update(self, data):
+            pass
+
         def hexdigest(self):
             return 'fake-md5-sum'
 
@@ -400,6 +403,23 @@ class BackupSwiftTestCase(test.TestCase):
                           service.backup,
                           backup, self.volume_file)
 
+    def test_object_writer_streams_spooled_data(self):
+        self.flags(backup_swift_object_size=1024)
+        service = swift_dr.SwiftBackupDriver(self.ctxt)
+        contents = []
+
+        def fake_put_object(container, name, reader, content_length=None):
+            # Objects larger than a chunk are streamed from disk.
+            self.assertTrue(reader._rolled)
+            contents.append((reader.read(), content_length))
+            return 'fake-md5-sum'
+
+        self.mock_object(service.conn, 'put_object', fake_put_object)
+        with service.get_object_writer('container', 'object') as writer:
+            for _i in range(4):
+                writer.write(b'\1' * 1024)
+        self.assertEqual([(b'\1' * 4096, 4096)], contents)
+
     def test_backup_backup_metadata_fail(self):
         """Test of when an exception occurs in backup().
 
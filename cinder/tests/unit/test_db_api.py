@@ -295,6 +295,20 @@ class DBAPIVolumeTestCase(BaseTest):
                              db.volume_data_get_for_host(
                                  self.ctxt, 'h%d@lvmdriver-1' % i))
 
+    def test_volume_count_get_for_hosts(self):
+        for i in range(THREE):
+            db.volume_create(self.ctxt, {'host': 'h@lvm#pool%d' % (i % 2)})
+        db.volume_create(self.ctxt, {'host': 'h2@lvm'})
+        volume = db.volume_create(self.ctxt, {'host': 'h2@lvm'})
+        db.volume_destroy(self.ctxt, volume['id'])
+
+        self.assertEqual({'h@lvm': 3, 'h@lvm#pool0': 2, 'h@lvm#pool1': 1,
+                          'h2@lvm': 1, 'h3@lvm': 0},
+                         db.volume_count_get_for_hosts(
+                             self.ctxt, ['h@lvm', 'h@lvm#pool0',
+                                         'h@lvm#pool1', 'h2@lvm', 'h3@lvm']))
+        self.assertEqual({}, db.volume_count_get_for_hosts(self.ctxt, []))
+
     def test_volume_data_get_for_project(self):
         for i in range(THREE):
             for j in range(THREE):
@@ -371,6 +385,66 @@ class DBAPIVolumeTestCase(BaseTest):
         self._assertEqualListsOfObjects(volumes[2:], db.volume_get_all(
                                         self.ctxt, 2, 2, ['id'], ['asc']))
 
+    def test_volume_get_all_marker_seek(self):
+        for i in range(4):
+            db.volume_create(self.ctxt,
+                             {'id': str(i),
+                              'created_at': datetime.datetime(2015, 1, 1,
+                                                               i % 2)})
+
+        # The default sort keys are created_at and id, descending
+        get_ids = lambda marker, limit: [
+            volume.id for volume in db.volume_get_all(self.ctxt, marker,
+                                                      limit)]
+        self.assertEqual(['3', '1', '2', '0'], get_ids(None, None))
+        self.assertEqual(['2', '0'], get_ids('1', None))
+        self.assertEqual(['0'], get_ids('2', 1))
+
+    def test_volume_get_all_marker_not_found(self):
+        db.volume_create(self.ctxt, {'id': 1})
+        self.assertRaises(exception.VolumeNotFound, db.volume_get_all,
+                          self.ctxt, 'nonexistent', 1)
+
+    def test_volume_get_all_columns(self):
+        volumes = [db.volume_create(self.ctxt,
+                                    {'id': str(i), 'display_name': 'v%d' % i,
+                                     'project_id': 'p%d' % (i % 2)})
+                   for i in range(4)]
+        db.volume_destroy(self.ctxt, volumes[2].id)
+
+        self.assertEqual(
+            [{'id': '3', 'display_name': 'v3'},
+             {'id': '1', 'display_name': 'v1'}],
+            db.volume_get_all(self.ctxt, None, 2, ['id'], ['desc'],
+                              columns=('id', 'display_name')))
+        self.assertEqual(
+            [{'id': '0'}],
+            db.volume_get_all_by_project(self.ctxt, 'p0', None, None,
+                                         ['id'], None, columns=('id',)))
+
+    def test_volume_get_all_loads_relationships(self):
+        for i in range(2):
+            volume = db.volume_create(self.ctxt,
+                                      {'id': str(i),
+                                       'metadata': {'k1': 'v1', 'k2': 'v2'},
+                                       'admin_metadata': {'readonly': 'True'}})
+            db.volume_attach(self.ctxt, {'volume_id': volume.id,
+                                         'attached_host': 'host%d' % i})
+
+        volumes = db.volume_get_all(self.ctxt, None, None, ['id'], ['asc'])
+
+        self.assertEqual(['0', '1'], [volume.id for volume in volumes])
+        for i, volume in enumerate(volumes):
+            self.assertEqual({'k1': 'v1', 'k2': 'v2'},
+                             dict((meta.key, meta.value)
+                                  for meta in volume.volume_metadata))
+            self.assertEqual(['readonly'],
+                             [meta.key
+                              for meta in volume.volume_admin_metadata])
+            self.assertEqual(['host%d' % i],
+                             [attachment.attached_host
+                              for attachment in volume.volume_attachment])
+
     def test_volume_get_all_by_host(self):
         volumes = []
         for i in range(3):
@@ -1187,6 +1261,30 @@ class DBAPISnapshotTestCase(BaseTest):
 
         self.assertEqual(should_be, db.snapshot_metadata_get(self.ctxt, 1))
 
+    def test_snapshot_get_all_paginated(self):
+        db.volume_create(self.ctxt, {'id': 1, 'project_id': 'project1'})
+        snapshots = [db.snapshot_create(self.ctxt,
+                                        {'id': i, 'volume_id': 1,
+                                         'project_id': 'project1',
+                                         'display_name': 'snap%d' % i})
+                     for i in range(1, 4)]
+
+        self._assertEqualListsOfObjects(
+            snapshots[1:],
+            db.snapshot_get_all(self.ctxt, marker='1', sort_keys=['id'],
+                                sort_dirs=['asc']),
+            ignored_keys=['metadata', 'volume'])
+        self._assertEqualListsOfObjects(
+            [snapshots[1]],
+            db.snapshot_get_all_by_project(self.ctxt, 'project1',
+                                           marker='3', limit=1,
+                                           sort_keys=['display_name'],
+                                           sort_dirs=['desc']),
+            ignored_keys=['metadata', 'volume'])
+        self.assertRaises(exception.SnapshotNotFound,
+                          db.snapshot_get_all, self.ctxt,
+                          marker='nonexistent')
+
 
 class DBAPICgsnapshotTestCase(BaseTest):
     """Tests for cinder.db.api.cgsnapshot_*."""
@@ -1664,6 +1762,14 @@ class DBAPIQuotaTestCase(BaseTest):
         self.assertEqual(expected, db.quota_usage_get_all_by_project(
                          self.ctxt, 'p1'))
 
+    def test_get_quota_usages_of_resources(self):
+        _quota_reserve(self.ctxt, 'p1')
+        session = sqlalchemy_api.get_session()
+        with session.begin():
+            usages = sqlalchemy_api._get_quota_usages(
+                self.ctxt, session, 'p1', resources=['volumes', 'fake'])
+        self.assertEqual(['volumes'], list(usages))
+
 
 class DBAPIIscsiTargetTestCase(BaseTest):
 
@@ -1723,7 +1829,8 @@ class DBAPIBackupTestCase(BaseTest):
             'size': 1000,
             'object_count': 100,
             'temp_volume_id': 'temp_volume_id',
-            'temp_snapshot_id': 'temp_snapshot_id', }
+            'temp_snapshot_id': 'temp_snapshot_id',
+            'stats': 'stats', }
         if one:
             return base_values
 
@@ -1765,6 +1872,20 @@ class DBAPIBackupTestCase(BaseTest):
         filtered_backups = db.backup_get_all(self.ctxt, filters=filters)
         self._assertEqualListsOfObjects([self.created[1]], filtered_backups)
 
+    def tests_backup_get_all_paginated(self):
+        backups = db.backup_get_all(self.ctxt, marker=self.created[0]['id'],
+                                    limit=1, sort_keys=['display_name'],
+                                    sort_dirs=['asc'])
+        self._assertEqualListsOfObjects([self.created[1]], backups)
+
+        backups = db.backup_get_all_by_project(
+            self.ctxt, self.created[2]['project_id'], limit=1)
+        self._assertEqualListsOfObjects([self.created[2]], backups)
+
+    def tests_backup_get_all_marker_not_found(self):
+        self.assertRaises(exception.BackupNotFound, db.backup_get_all,
+                          self.ctxt, marker='nonexistent')
+
     def test_backup_get_all_by_host(self):
         byhost = db.backup_get_all_by_host(self.ctxt,
                                            self.created[1]['host'])
@@ -1978,3 +2099,89 @@ class DBAPIDriverInitiatorDataTestCase(BaseTest):
         update = {'remove_values': ['key_that_doesnt_exist']}
         db.driver_initiator_data_update(self.ctxt, self.initiator,
                                         self.namespace, update)
+
+
+class DBAPIImageVolumeCacheEntryTestCase(BaseTest):
+
+    def _validate_entry(self, entry, host, image_id, image_updated_at,
+                        volume_id, size):
+        self.assertIsNotNone(entry)
+        self.assertIsNotNone(entry['id'])
+        self.assertEqual(host, entry['host'])
+        self.assertEqual(image_id, entry['image_id'])
+        self.assertEqual(image_updated_at, entry['image_updated_at'])
+        self.assertEqual(volume_id, entry['volume_id'])
+        self.assertEqual(size, entry['size'])
+        self.assertIsNotNone(entry['last_used'])
+
+    def test_create_delete_query_cache_entry(self):
+        host = 'abc@123#poolz'
+        image_id = 'c06764d7-54b0-4471-acce-62e79452a38b'
+        image_updated_at = datetime.datetime.utcnow()
+        volume_id = 'e0e4f819-24bb-49e6-af1e-67fb77fc07d1'
+        size = 6
+
+        entry = db.image_volume_cache_create(self.ctxt, host, image_id,
+                                             image_updated_at, volume_id, size)
+        self._validate_entry(entry, host, image_id, image_updated_at,
+                             volume_id, size)
+
+        entry = db.image_volume_cache_get_and_update_last_used(self.ctxt,
+                                                               image_id,
+                                                               host)
+        self._validate_entry(entry, host, image_id, image_updated_at,
+                             volume_id, size)
+
+        entry = db.image_volume_cache_get_by_volume_id(self.ctxt, volume_id)
+        self._validate_entry(entry, host, image_id, image_updated_at,
+                             volume_id, size)
+
+        db.image_volume_cache_delete(self.ctxt, entry['volume_id'])
+
+        entry = db.image_volume_cache_get_and_update_last_used(self.ctxt,
+                                                               image_id,
+                                                               host)
+        self.assertIsNone(entry)
+
+    def test_cache_entry_get_and_update_last_used(self):
+        image_id = 'd0e6c2d7-8a2f-4c4e-9b3b-5f9c0e7e3a11'
+        entry = db.image_volume_cache_create(self.ctxt, 'host1', image_id,
+                                             datetime.datetime.utcnow(),
+                                             'volume-id', 10)
+        last_used = entry['last_used']
+
+        entry = db.image_volume_cache_get_and_update_last_used(self.ctxt,
+                                                               image_id,
+                                                               'host1')
+
+        self.assertGreaterEqual(entry['last_used'], last_used)
+        self.assertIsNone(db.image_volume_cache_get_and_update_last_used(
+            self.ctxt, image_id, 'host2'))
+        self.assertIsNone(db.image_volume_cache_get_and_update_last_used(
+            self.ctxt, image_id, 'host1', max_size=5))
+        self.assertIsNotNone(db.image_volume_cache_get_and_update_last_used(
+            self.ctxt, image_id, 'host1', max_size=10))
+
+    def test_cache_entry_get_all_for_host(self):
+        host = 'abc@123#poolz'
+        image_updated_at = datetime.datetime.utcnow()
+        for i in range(3):
+            db.image_volume_cache_create(self.ctxt, host, 'image-%d' % i,
+                                         image_updated_at, 'volume-%d' % i,
+                                         i + 1)
+        db.image_volume_cache_create(self.ctxt, 'otherhost', 'image-3',
+                                     image_updated_at, 'volume-3', 4)
+        # Use the first entry so that it becomes the most recently used.
+        db.image_volume_cache_get_and_update_last_used(self.ctxt, 'image-0',
+                                                       host)
+
+        entries = db.image_volume_cache_get_all_for_host(self.ctxt, host)
+
+        self.assertEqual(3, len(entries))
+        self.assertEqual('volume-0', entries[0]['volume_id'])
+        self.assertEqual(set(['volume-0', 'volume-1', 'volume-2']),
+                         set(e['volume_id'] for e in entries))
+
+    def test_cache_entry_get_by_volume_id_none(self):
+        self.assertIsNone(
+            db.image_volume_cache_get_by_volume_id(self.ctxt, 'volume-id'))
@@ -13,6 +13,10 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import collections
+
+import mock
+
 from cinder import exception
 from cinder.scheduler.evaluator import evaluator
 from cinder import test
@@ -137,3 +141,22 @@ class EvaluatorTestCase(test.TestCase):
         self.assertRaises(exception.EvaluatorParseException,
                           evaluator.evaluate,
                           "7 / 0")
+
+    def test_compiled_expression_is_cached(self):
+        expression = "stats.capacity * 2 + 1"
+        tree = evaluator.compile_expression(expression)
+        self.assertIs(tree, evaluator.compile_expression(expression))
+        self.assertEqual(21, evaluator.evaluate(expression,
+                                                stats={'capacity': 10}))
+        self.assertEqual(41, evaluator.evaluate(expression,
+                                                stats={'capacity': 20}))
+
+    @mock.patch.object(evaluator, '_CACHE_SIZE', 2)
+    def test_compiled_expression_cache_size(self):
+        self.mock_object(evaluator, '_cache',
+                         collections.OrderedDict([("1 + 1", mock.sentinel)]))
+        evaluator.compile_expression("2 + 2")
+        evaluator.compile_expression("1 + 1")
+        evaluator.compile_expression("3 + 3")
+        self.assertEqual(["1 + 1", "3 + 3"], list(evaluator._cache))
+        self.assertIs(mock.sentinel, evaluator.compile_expression("1 + 1"))
@@ -16,6 +16,8 @@
 """Unit tests for image utils."""
 
 import math
+import os
+import tempfile
 
 import mock
 from oslo_concurrency import processutils
@@ -539,7 +541,8 @@ class TestFetchToRaw(test.TestCase):
         self.assertIsNone(output)
         mock_fetch_to.assert_called_once_with(ctxt, image_service, image_id,
                                               dest, 'raw', blocksize, None,
-                                              None, None, run_as_root=True)
+                                              None, None, run_as_root=True,
+                                              sparse=False)
 
     @mock.patch('cinder.image.image_utils.fetch_to_volume_format')
     def test_kwargs(self, mock_fetch_to):
@@ -556,12 +559,14 @@ class TestFetchToRaw(test.TestCase):
         output = image_utils.fetch_to_raw(ctxt, image_service, image_id,
                                           dest, blocksize, user_id=user_id,
                                           project_id=project_id, size=size,
-                                          run_as_root=run_as_root)
+                                          run_as_root=run_as_root,
+                                          sparse=True)
         self.assertIsNone(output)
         mock_fetch_to.assert_called_once_with(ctxt, image_service, image_id,
                                               dest, 'raw', blocksize, user_id,
                                               project_id, size,
-                                              run_as_root=run_as_root)
+                                              run_as_root=run_as_root,
+                                              sparse=True)
 
 
 class TestFetchToVolumeFormat(test.TestCase):
@@ -1046,6 +1051,123 @@ class TestFetchToVolumeFormat(test.TestCase):
                                              run_as_root=run_as_root)
 
 
+class TestFetchRawToVolume(test.TestCase):
+    def setUp(self):
+        super(TestFetchRawToVolume, self).setUp()
+        self.ctxt = mock.sentinel.context
+        self.image_id = mock.sentinel.image_id
+        fd, self.dest = tempfile.mkstemp()
+        os.close(fd)
+        self.addCleanup(os.remove, self.dest)
+        self.image_service = mock.Mock()
+        self.image_service.show.return_value = {'disk_format': 'raw',
+                                                'container_format': 'bare',
+                                                'size': 10 * units.Ki}
+
+    def _set_image_data(self, *chunks):
+        def download(context, image_id, data):
+            for chunk in chunks:
+                data.write(chunk)
+        self.image_service.download.side_effect = download
+
+    def _read_dest(self):
+        with open(self.dest, 'rb') as dest_file:
+            return dest_file.read()
+
+    @mock.patch('cinder.image.image_utils.convert_image')
+    @mock.patch('cinder.image.image_utils.temporary_file')
+    def test_fetch_to_raw_streams_raw_image(self, mock_temp, mock_convert):
+        chunks = [b'a' * 1000, b'b' * 3000, b'c' * 6240]
+        self._set_image_data(*chunks)
+
+        image_utils.fetch_to_raw(self.ctxt, self.image_service,
+                                 self.image_id, self.dest, '1K', size=1)
+
+        self.assertEqual(b''.join(chunks), self._read_dest())
+        self.assertFalse(mock_temp.called)
+        self.assertFalse(mock_convert.called)
+
+    def test_fetch_to_raw_sparse_skips_zero_blocks(self):
+        data = b'a' * 1024 + b'\0' * 2048 + b'b' * 1024 + b'\0' * 1500
+        self._set_image_data(data)
+
+        with mock.patch.object(image_utils.RawImageWriter,
+                               '_write_at',
+                               side_effect=image_utils.RawImageWriter.
+                               _write_at,
+                               autospec=True) as mock_write:
+            image_utils.fetch_to_raw(self.ctxt, self.image_service,
+                                     self.image_id, self.dest, '1K',
+                                     sparse=True)
+
+        self.assertEqual(data, self._read_dest())
+        self.assertEqual([b'a' * 1024, b'b' * 1024],
+                         [c[0][1] for c in mock_write.call_args_list])
+
+    def test_fetch_to_raw_rejects_disguised_image(self):
+        self._set_image_data(b'QFI\xfb' + b'\0' * 2044)
+
+        self.assertRaises(exception.ImageUnacceptable,
+                          image_utils.fetch_to_raw, self.ctxt,
+                          self.image_service, self.image_id, self.dest, '1K')
+        self.assertEqual(b'', self._read_dest())
+
+    def test_fetch_to_raw_image_too_big(self):
+        self.image_service.show.return_value['size'] = 2 * units.Gi
+
+        self.assertRaises(exception.ImageUnacceptable,
+                          image_utils.fetch_to_raw, self.ctxt,
+                          self.image_service, self.image_id, self.dest, '1K',
+                          size=1)
+        self.assertFalse(self.image_service.download.called)
+
+    def test_raw_image_writer_too_big(self):
+        with open(self.dest, 'r+b') as dest_file:
+            writer = image_utils.RawImageWriter(self.image_id, dest_file,
+                                                1024, max_size=4096)
+            writer.write(b'a' * 4000)
+
+            self.assertRaises(exception.ImageUnacceptable, writer.write,
+                              b'b' * 100)
+
+    @mock.patch('cinder.image.image_utils.fetch')
+    @mock.patch('cinder.image.image_utils.convert_image')
+    @mock.patch('cinder.image.image_utils.qemu_img_info')
+    @mock.patch('cinder.image.image_utils.fetch_raw_to_volume')
+    def test_fetch_to_raw_throttled(self, mock_stream, mock_info,
+                                    mock_convert, mock_fetch):
+        mock_info.return_value.virtual_size = units.Ki
+        mock_info.return_value.file_format = 'raw'
+        mock_info.return_value.backing_file = None
+        throttle = throttling.Throttle(prefix=['cgexec'])
+        self.addCleanup(throttling.Throttle.set_default,
+                        throttling.Throttle.get_default())
+        throttling.Throttle.set_default(throttle)
+
+        image_utils.fetch_to_raw(self.ctxt, self.image_service,
+                                 self.image_id, self.dest, '1K', size=1)
+
+        self.assertFalse(mock_stream.called)
+        self.assertTrue(mock_fetch.called)
+        mock_convert.assert_called_once_with(mock.ANY, self.dest, 'raw',
+                                             run_as_root=True)
+
+    def test_get_blocksize_bytes(self):
+        self.assertEqual(512, image_utils._get_blocksize_bytes('512'))
+        self.assertEqual(4096, image_utils._get_blocksize_bytes('4k'))
+        self.assertEqual(4096, image_utils._get_blocksize_bytes('4KB'))
+        self.assertEqual(units.Mi, image_utils._get_blocksize_bytes('1M'))
+        self.assertEqual(units.Mi, image_utils._get_blocksize_bytes('1x'))
+
+    def test_detect_image_format(self):
+        self.assertEqual('qcow2', image_utils.detect_image_format(
+            b'QFI\xfb\x00\x00\x00\x03'))
+        self.assertEqual('vdi', image_utils.detect_image_format(
+            b'<<< Oracle VM VirtualBox Disk Image >>>\n'.ljust(64, b'\0') +
+            b'\x7f\x10\xda\xbe'))
+        self.assertIsNone(image_utils.detect_image_format(b'\0' * 512))
+
+
 class TestXenserverUtils(test.TestCase):
     @mock.patch('cinder.image.image_utils.is_xenserver_format')
     def test_is_xenserver_image(self, mock_format):
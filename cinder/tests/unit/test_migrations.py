@@ -865,6 +865,132 @@ class MigrationsMixin(test_migrations.WalkVersionsMixin):
         snapshots = db_utils.get_table(engine, 'snapshots')
         self.assertNotIn('provider_auth', snapshots.c)
 
+    def _check_053(self, engine, data):
+        """Test that adding the pagination indexes works correctly."""
+        expected = {
+            'volumes': {
+                'volumes_project_created_at_idx':
+                    ['project_id', 'deleted', 'created_at', 'id'],
+                'volumes_host_created_at_idx':
+                    ['host', 'deleted', 'created_at', 'id']},
+            'snapshots': {
+                'snapshots_project_created_at_idx':
+                    ['project_id', 'deleted', 'created_at', 'id']},
+            'backups': {
+                'backups_project_created_at_idx':
+                    ['project_id', 'deleted', 'created_at', 'id']},
+        }
+        for table_name, indexes in expected.items():
+            table = db_utils.get_table(engine, table_name)
+            index_columns = dict((idx.name, idx.columns.keys())
+                                 for idx in table.indexes)
+            for index_name, columns in indexes.items():
+                self.assertEqual(columns, index_columns.get(index_name))
+
+    def _post_downgrade_053(self, engine):
+        for table_name in ('volumes', 'snapshots', 'backups'):
+            table = db_utils.get_table(engine, table_name)
+            index_names = [idx.name for idx in table.indexes]
+            self.assertNotIn('%s_project_created_at_idx' % table_name,
+                             index_names)
+
+    def _check_054(self, engine, data):
+        """Test that adding the query predicate indexes works correctly."""
+        expected = {
+            'volumes': {
+                'volumes_project_quota_idx':
+                    ['project_id', 'deleted', 'volume_type_id', 'size'],
+                'volumes_consistencygroup_id_idx':
+                    ['consistencygroup_id', 'deleted']},
+            'snapshots': {
+                'snapshots_volume_id_idx': ['volume_id', 'deleted'],
+                'snapshots_cgsnapshot_id_idx': ['cgsnapshot_id', 'deleted']},
+            'backups': {
+                'backups_host_idx': ['host', 'deleted'],
+                'backups_volume_id_idx': ['volume_id', 'deleted']},
+            'volume_attachment': {
+                'volume_attachment_volume_id_idx':
+                    ['volume_id', 'deleted', 'attach_status']},
+        }
+        for table_name, indexes in expected.items():
+            table = db_utils.get_table(engine, table_name)
+            index_columns = dict((idx.name, idx.columns.keys())
+                                 for idx in table.indexes)
+            for index_name, columns in indexes.items():
+                self.assertEqual(columns, index_columns.get(index_name))
+
+        if engine.name != 'sqlite':
+            return
+
+        # The query plans of the hot queries use the indexes
+        plans = {
+            "SELECT count(id), sum(size) FROM volumes WHERE "
+            "project_id = 'p' AND deleted = 0":
+                'INDEX volumes_project_quota_idx',
+            "SELECT * FROM volumes WHERE host = 'h' AND deleted = 0":
+                'INDEX volumes_host_created_at_idx',
+            "SELECT * FROM volumes WHERE consistencygroup_id = 'c' AND "
+            "deleted = 0":
+                'INDEX volumes_consistencygroup_id_idx',
+            "SELECT * FROM snapshots WHERE volume_id = 'v' AND deleted = 0":
+                'INDEX snapshots_volume_id_idx',
+            "SELECT * FROM backups WHERE host = 'h' AND deleted = 0":
+                'INDEX backups_host_idx',
+            "SELECT * FROM volume_attachment WHERE volume_id = 'v' AND "
+            "deleted = 0 AND attach_status != 'detached'":
+                'INDEX volume_attachment_volume_id_idx',
+        }
+        for query, index in plans.items():
+            plan = ' '.join(tuple(row)[-1] for row in
+                            engine.execute('EXPLAIN QUERY PLAN ' + query))
+            self.assertIn(index, plan)
+
+    def _post_downgrade_054(self, engine):
+        table = db_utils.get_table(engine, 'volumes')
+        index_names = [idx.name for idx in table.indexes]
+        self.assertNotIn('volumes_project_quota_idx', index_names)
+        self.assertNotIn('volumes_consistencygroup_id_idx', index_names)
+
+    def _check_055(self, engine, data):
+        """Test adding the image_volume_cache_entries table."""
+        has_table = engine.dialect.has_table(engine.connect(),
+                                             "image_volume_cache_entries")
+        self.assertTrue(has_table)
+
+        private_data = db_utils.get_table(
+            engine,
+            'image_volume_cache_entries'
+        )
+
+        self.assertIsInstance(private_data.c.id.type,
+                              sqlalchemy.types.INTEGER)
+        self.assertIsInstance(private_data.c.host.type,
+                              sqlalchemy.types.VARCHAR)
+        self.assertIsInstance(private_data.c.image_id.type,
+                              sqlalchemy.types.VARCHAR)
+        self.assertIsInstance(private_data.c.image_updated_at.type,
+                              self.TIME_TYPE)
+        self.assertIsInstance(private_data.c.volume_id.type,
+                              sqlalchemy.types.VARCHAR)
+        self.assertIsInstance(private_data.c.size.type,
+                              sqlalchemy.types.INTEGER)
+        self.assertIsInstance(private_data.c.last_used.type,
+                              self.TIME_TYPE)
+
+    def _post_downgrade_055(self, engine):
+        has_table = engine.dialect.has_table(engine.connect(),
+                                             "image_volume_cache_entries")
+        self.assertFalse(has_table)
+
+    def _check_056(self, engine, data):
+        backups = db_utils.get_table(engine, 'backups')
+        self.assertIsInstance(backups.c.stats.type,
+                              sqlalchemy.types.TEXT)
+
+    def _post_downgrade_056(self, engine):
+        backups = db_utils.get_table(engine, 'backups')
+        self.assertNotIn('stats', backups.c)
+
     def test_walk_versions(self):
         self.walk_versions(True, False)
 
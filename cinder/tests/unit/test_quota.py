@@ -876,6 +876,42 @@ class VolumeTypeQuotaEngineTestCase(test.TestCase):
         db.volume_type_destroy(ctx, vtype['id'])
         db.volume_type_destroy(ctx, vtype2['id'])
 
+    @mock.patch.object(db, 'volume_type_get_all')
+    def test_resources_cached(self, volume_type_get_all):
+        self.flags(quota_resources_cache_time=60)
+        volume_type_get_all.return_value = {
+            'type1': {'id': 'fake_id', 'name': 'type1', 'extra_specs': {}}}
+
+        engine = quota.VolumeTypeQuotaEngine()
+        self.assertIn('volumes_type1', engine.resources)
+        self.assertIn('gigabytes_type1', engine.resources)
+        self.assertEqual(1, volume_type_get_all.call_count)
+
+        engine.invalidate_resources()
+        self.assertIn('volumes_type1', engine.resources)
+        self.assertEqual(2, volume_type_get_all.call_count)
+
+    @mock.patch.object(quota.QuotaEngine, 'reserve')
+    @mock.patch.object(db, 'volume_type_get_all')
+    def test_reserve_unknown_resource_refreshes_cache(self,
+                                                      volume_type_get_all,
+                                                      reserve):
+        self.flags(quota_resources_cache_time=60)
+        volume_type_get_all.return_value = {}
+        engine = quota.VolumeTypeQuotaEngine()
+        self.assertNotIn('volumes_type1', engine.resources)
+
+        # The volume type was created by another service
+        volume_type_get_all.return_value = {
+            'type1': {'id': 'fake_id', 'name': 'type1', 'extra_specs': {}}}
+        ctx = context.RequestContext('admin', 'admin', is_admin=True)
+        engine.reserve(ctx, volumes=1, volumes_type1=1)
+
+        self.assertIn('volumes_type1', engine.resources)
+        self.assertEqual(2, volume_type_get_all.call_count)
+        reserve.assert_called_once_with(ctx, expire=None, project_id=None,
+                                        volumes=1, volumes_type1=1)
+
 
 class DbQuotaDriverTestCase(test.TestCase):
     def setUp(self):
@@ -1411,8 +1447,11 @@ class QuotaReserveSqlAlchemyTestCase(test.TestCase):
         def fake_get_session():
             return FakeSession()
 
-        def fake_get_quota_usages(context, session, project_id):
-            return self.usages.copy()
+        def fake_get_quota_usages(context, session, project_id,
+                                  resources=None):
+            return {resource: usage
+                    for resource, usage in self.usages.items()
+                    if resources is None or resource in resources}
 
         def fake_quota_usage_create(context, project_id, resource, in_use,
                                     reserved, until_refresh, session=None,
@@ -1548,6 +1587,47 @@ class QuotaReserveSqlAlchemyTestCase(test.TestCase):
                   usage_id=self.usages_created['gigabytes'],
                   delta=2 * 1024), ])
 
+    def test_quota_reserve_locks_delta_usages(self):
+        self.init_usage('test_project', 'volumes', 3, 0)
+        self.init_usage('test_project', 'gigabytes', 3, 0)
+        self.stubs.Set(sqa_api, '_get_quota_usages', mock.Mock(
+            return_value={'volumes': self.usages['volumes']}))
+        context = FakeContext('test_project', 'test_class')
+        quotas = dict(volumes=5)
+        deltas = dict(volumes=2)
+
+        sqa_api.quota_reserve(context, self.resources, quotas, deltas,
+                              self.expire, 0, 0)
+
+        sqa_api._get_quota_usages.assert_called_once_with(
+            context, mock.ANY, 'test_project', resources=deltas.keys())
+        self.assertEqual(set(), self.sync_called)
+        self.assertEqual(2, self.usages['volumes'].reserved)
+        self.assertEqual(0, self.usages['gigabytes'].reserved)
+
+    def test_quota_reserve_sync_skips_unlocked_usages(self):
+        self.init_usage('test_project', 'volumes', -1, 0)
+        self.init_usage('test_project', 'gigabytes', 3, 0)
+
+        def fake_sync(context, project_id, volume_type_id=None,
+                      volume_type_name=None, session=None):
+            return {'volumes': 2, 'gigabytes': 5}
+
+        self.stubs.Set(sqa_api, 'QUOTA_SYNC_FUNCTIONS',
+                       {'_sync_volumes': fake_sync})
+        self.stubs.Set(sqa_api, '_get_quota_usages', mock.Mock(
+            return_value={'volumes': self.usages['volumes']}))
+        context = FakeContext('test_project', 'test_class')
+        quotas = dict(volumes=5)
+        deltas = dict(volumes=2)
+
+        sqa_api.quota_reserve(context, self.resources, quotas, deltas,
+                              self.expire, 0, 0)
+
+        self.assertEqual(1, sqa_api._get_quota_usages.call_count)
+        self.assertEqual(2, self.usages['volumes'].in_use)
+        self.assertEqual(3, self.usages['gigabytes'].in_use)
+
     def test_quota_reserve_negative_in_use(self):
         self.init_usage('test_project', 'volumes', -1, 0, until_refresh=1)
         self.init_usage('test_project', 'gigabytes', -1, 0, until_refresh=1)
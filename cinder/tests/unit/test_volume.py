@@ -45,6 +45,7 @@ from cinder.compute import nova
 from cinder import context
 from cinder import db
 from cinder import exception
+from cinder.image import cache as image_cache
 from cinder.image import image_utils
 from cinder import keymgr
 from cinder import objects
@@ -1018,6 +1019,23 @@ class VolumeTestCase(BaseVolumeTestCase):
         self.assertRaises(exception.NotFound, db.volume_get,
                           self.context, volume['id'])
 
+    def test_delete_image_volume_evicts_cache_entry(self):
+        """Test deleting an image-volume removes its cache entry."""
+        volume = tests_utils.create_volume(self.context, **self.volume_params)
+        self.volume.create_volume(self.context, volume['id'])
+        db.image_volume_cache_create(self.context, volume['host'],
+                                     'fake-image-id', timeutils.utcnow(),
+                                     volume['id'], volume['size'])
+        self.volume.image_volume_cache = image_cache.ImageVolumeCache(
+            db, cinder.volume.api.API())
+
+        self.volume.delete_volume(self.context, volume['id'])
+
+        self.assertIsNone(db.image_volume_cache_get_by_volume_id(
+            self.context, volume['id']))
+        self.assertRaises(exception.NotFound, db.volume_get,
+                          self.context, volume['id'])
+
     @mock.patch.object(db, 'volume_get', side_effect=exception.VolumeNotFound(
                        volume_id='12345678-1234-5678-1234-567812345678'))
     def test_delete_volume_not_found(self, mock_get_volume):
@@ -3399,7 +3417,7 @@ class VolumeTestCase(BaseVolumeTestCase):
             pass
 
         def fake_fetch_to_raw(ctx, image_service, image_id, path, blocksize,
-                              size=None, throttle=None):
+                              size=None, throttle=None, sparse=False):
             pass
 
         def fake_clone_image(ctx, volume_ref,
@@ -5562,6 +5580,8 @@ class GetActiveByWindowTestCase(BaseVolumeTestCase):
             datetime.datetime(1, 3, 1, 1, 1, 1),
             datetime.datetime(1, 4, 1, 1, 1, 1),
             project_id='p1')
+        # The query doesn't order the volumes
+        volumes = sorted(volumes, key=lambda volume: volume.id)
         self.assertEqual(3, len(volumes))
         self.assertEqual(u'2', volumes[0].id)
         self.assertEqual(u'3', volumes[1].id)
@@ -5592,6 +5612,8 @@ class GetActiveByWindowTestCase(BaseVolumeTestCase):
             datetime.datetime(1, 3, 1, 1, 1, 1),
             datetime.datetime(1, 4, 1, 1, 1, 1),
             project_id='p1')
+        # The query doesn't order the snapshots
+        snapshots = sorted(snapshots, key=lambda snapshot: snapshot.id)
         self.assertEqual(3, len(snapshots))
         self.assertEqual(u'2', snapshots[0].id)
         self.assertEqual(u'1', snapshots[0].volume.id)
@@ -5984,7 +6006,8 @@ class LVMISCSIVolumeDriverTestCase(DriverTestCase):
                 2048,
                 '1M',
                 execute=mock_execute,
-                sparse=False)
+                sparse=False,
+                progress_callback=mock.ANY)
 
     def test_lvm_migrate_volume_proceed_with_thin(self):
         hostname = socket.gethostname()
@@ -6032,7 +6055,8 @@ class LVMISCSIVolumeDriverTestCase(DriverTestCase):
                 2048,
                 '1M',
                 execute=mock_execute,
-                sparse=True)
+                sparse=True,
+                progress_callback=mock.ANY)
 
     @staticmethod
     def _get_manage_existing_lvs(name):
@@ -17,10 +17,14 @@
 
 
 import datetime
-import mock
+import os
+import shutil
+import tempfile
 
+import mock
 from oslo_concurrency import processutils
 from oslo_config import cfg
+from oslo_utils import units
 
 from cinder import exception
 from cinder import test
@@ -423,8 +427,9 @@ class ClearVolumeTestCase(test.TestCase):
         self.assertIsNone(output)
         mock_copy.assert_called_once_with('/dev/zero', 'volume_path', 1024,
                                           '1M', sync=True,
-                                          execute=utils.execute, ionice='-c3',
-                                          throttle=None, sparse=False)
+                                          ionice='-c3', throttle=None,
+                                          sparse=False,
+                                          progress_callback=mock.ANY)
 
     @mock.patch('cinder.volume.utils.copy_volume', return_value=None)
     @mock.patch('cinder.volume.utils.CONF')
@@ -438,8 +443,9 @@ class ClearVolumeTestCase(test.TestCase):
         self.assertIsNone(output)
         mock_copy.assert_called_once_with('/dev/zero', 'volume_path', 1,
                                           '1M', sync=True,
-                                          execute=utils.execute, ionice='-c0',
-                                          throttle=None, sparse=False)
+                                          ionice='-c0', throttle=None,
+                                          sparse=False,
+                                          progress_callback=mock.ANY)
 
     @mock.patch('cinder.utils.execute')
     @mock.patch('cinder.volume.utils.CONF')
@@ -599,6 +605,115 @@ class CopyVolumeTestCase(test.TestCase):
                                           'conv=sparse', run_as_root=True)
 
 
+class NativeCopyVolumeTestCase(test.TestCase):
+    def setUp(self):
+        super(NativeCopyVolumeTestCase, self).setUp()
+        self.flags(volume_copy_engine='native')
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        self.src = os.path.join(tmpdir, 'src')
+        self.dest = os.path.join(tmpdir, 'dest')
+        open(self.dest, 'wb').close()
+
+    def _write_src(self, *chunks):
+        with open(self.src, 'wb') as f:
+            for offset, data in chunks:
+                f.seek(offset)
+                f.write(data)
+
+    def _read(self, path):
+        with open(path, 'rb') as f:
+            return f.read()
+
+    @mock.patch('cinder.volume.utils._copy_volume')
+    def test_copy_volume(self, mock_dd):
+        data = os.urandom(units.Mi) + b'\0' * units.Mi + os.urandom(1000)
+        self._write_src((0, data))
+        progress = mock.Mock()
+
+        volume_utils.copy_volume(self.src, self.dest, 3, '1M',
+                                 progress_callback=progress)
+
+        self.assertEqual(data, self._read(self.dest))
+        self.assertFalse(mock_dd.called)
+        self.assertEqual([mock.call(units.Mi, len(data)),
+                          mock.call(2 * units.Mi, len(data)),
+                          mock.call(len(data), len(data))],
+                         progress.call_args_list)
+
+    @mock.patch('cinder.volume.utils._write_block',
+                wraps=volume_utils._write_block)
+    def test_copy_volume_sparse(self, mock_write):
+        data = os.urandom(4096)
+        self._write_src((0, data), (2 * units.Mi, data),
+                        (4 * units.Mi - 4096, b'\0' * 4096))
+
+        volume_utils.copy_volume(self.src, self.dest, 4, '1M', sparse=True)
+
+        self.assertEqual(self._read(self.src), self._read(self.dest))
+        self.assertEqual([0, 2 * units.Mi],
+                         [c[0][2] for c in mock_write.call_args_list])
+
+    @mock.patch('cinder.volume.utils._read_block',
+                wraps=volume_utils._read_block)
+    def test_copy_volume_skips_holes(self, mock_read):
+        data = os.urandom(4096)
+        self._write_src((3 * units.Mi, data))
+
+        volume_utils.copy_volume(self.src, self.dest, 4, '1M')
+
+        self.assertEqual(self._read(self.src), self._read(self.dest))
+        if os.stat(self.src).st_blocks * 512 < 2 * units.Mi:
+            # The file system reports the holes of the source.
+            self.assertEqual([3 * units.Mi],
+                             [c[0][2] for c in mock_read.call_args_list])
+
+    @mock.patch('cinder.volume.utils._read_block')
+    def test_clear_volume(self, mock_read):
+        self._write_src((0, os.urandom(2 * units.Mi)))
+
+        volume_utils.clear_volume(2, self.src, volume_clear='zero',
+                                  volume_clear_size=0)
+
+        self.assertEqual(b'\0' * 2 * units.Mi, self._read(self.src))
+        self.assertFalse(mock_read.called)
+
+    @mock.patch('cinder.volume.utils._copy_volume_native')
+    @mock.patch('cinder.volume.utils._copy_volume')
+    def test_copy_volume_throttled_uses_dd(self, mock_dd, mock_native):
+        fake_throttle = throttling.Throttle(['fake_throttle'])
+        volume_utils.copy_volume(self.src, self.dest, 1, '1M',
+                                 throttle=fake_throttle)
+        volume_utils.copy_volume(self.src, self.dest, 1, '1M', ionice='-c3')
+        volume_utils.copy_volume(self.src, self.dest, 1, '1M',
+                                 execute=utils.execute)
+
+        self.assertEqual(3, mock_dd.call_count)
+        self.assertFalse(mock_native.called)
+
+    @mock.patch('cinder.volume.utils._copy_volume')
+    @mock.patch('cinder.utils.execute')
+    def test_copy_volume_rebound_execute(self, mock_exec, mock_dd):
+        data = os.urandom(4096)
+        self._write_src((0, data))
+
+        volume_utils.copy_volume(self.src, self.dest, 1, '1M')
+
+        self.assertEqual(data, self._read(self.dest))
+        self.assertFalse(mock_dd.called)
+        self.assertFalse(mock_exec.called)
+
+    @mock.patch('cinder.volume.utils.LOG')
+    def test_copy_progress_logger(self, mock_log):
+        progress = volume_utils.CopyProgressLogger('src', 'dest', steps=4)
+        for copied in range(0, 101, 10):
+            progress(copied, 100)
+
+        self.assertEqual([25, 50, 75, 100],
+                         [c[0][1]['percent']
+                          for c in mock_log.info.call_args_list])
+
+
 class VolumeUtilsTestCase(test.TestCase):
     def test_null_safe_str(self):
         self.assertEqual('', volume_utils.null_safe_str(None))
@@ -14,6 +14,8 @@
 #    under the License.
 """ Tests for create_volume TaskFlow """
 
+import datetime
+
 import mock
 
 from cinder import context
@@ -85,6 +87,123 @@ class CreateVolumeFlowTestCase(test.TestCase):
         task._cast_create_volume(self.ctxt, spec, props)
         consistencygroup_get_by_id.assert_called_once_with(self.ctxt, 5)
 
+    def _request_spec(self, volume_id):
+        return {'volume_id': volume_id,
+                'source_volid': None,
+                'snapshot_id': None,
+                'image_id': None,
+                'source_replicaid': None,
+                'consistencygroup_id': None,
+                'cgsnapshot_id': None}
+
+    def test_cast_create_volume_batched(self):
+        scheduler_rpcapi = mock.Mock()
+        batcher = mock.Mock()
+        task = create_volume.VolumeCastTask(scheduler_rpcapi, mock.Mock(),
+                                            mock.Mock(), batcher)
+        spec = self._request_spec('fake-id')
+
+        task._cast_create_volume(self.ctxt, spec, {})
+
+        batcher.add.assert_called_once_with(self.ctxt, 'cinder-volume',
+                                            spec, {})
+        self.assertFalse(scheduler_rpcapi.create_volume.called)
+
+    @mock.patch('eventlet.spawn_after')
+    def test_scheduler_cast_batcher(self, mock_spawn_after):
+        scheduler_rpcapi = mock.Mock()
+        batcher = create_volume.SchedulerCastBatcher(scheduler_rpcapi,
+                                                     mock.Mock(), 0.1)
+        other_ctxt = context.RequestContext('user', 'project')
+        specs = [self._request_spec('fake-id%d' % i) for i in range(3)]
+
+        batcher.add(self.ctxt, 'topic', specs[0], {})
+        batcher.add(self.ctxt, 'topic', specs[1], {'scheduler_hints': 1})
+        batcher.add(other_ctxt, 'topic', specs[2], {})
+
+        self.assertEqual(2, mock_spawn_after.call_count)
+        for call in mock_spawn_after.call_args_list:
+            call[0][1](*call[0][2:])
+        scheduler_rpcapi.create_volumes.assert_called_once_with(
+            self.ctxt, 'topic', specs[:2], [{}, {'scheduler_hints': 1}])
+        scheduler_rpcapi.create_volume.assert_called_once_with(
+            other_ctxt, 'topic', 'fake-id2', snapshot_id=None,
+            image_id=None, request_spec=specs[2], filter_properties={})
+
+    @mock.patch('eventlet.spawn_after')
+    def test_scheduler_cast_batcher_cast_failure(self, mock_spawn_after):
+        scheduler_rpcapi = mock.Mock()
+        scheduler_rpcapi.create_volumes.side_effect = Exception
+        db = mock.Mock()
+        batcher = create_volume.SchedulerCastBatcher(scheduler_rpcapi, db,
+                                                     0.1)
+        for i in range(2):
+            batcher.add(self.ctxt, 'topic', self._request_spec(i), {})
+
+        batcher._cast(mock_spawn_after.call_args[0][2])
+
+        self.assertEqual([mock.call(self.ctxt, 0, {'status': 'error'}),
+                          mock.call(self.ctxt, 1, {'status': 'error'})],
+                         db.volume_update.call_args_list)
+
+    @mock.patch('eventlet.spawn_after')
+    def test_scheduler_cast_batcher_full(self, mock_spawn_after):
+        scheduler_rpcapi = mock.Mock()
+        batcher = create_volume.SchedulerCastBatcher(scheduler_rpcapi,
+                                                     mock.Mock(), 60, 2)
+        specs = [self._request_spec('fake-id%d' % i) for i in range(3)]
+
+        batcher.add(self.ctxt, 'topic', specs[0], {})
+        self.assertFalse(scheduler_rpcapi.create_volumes.called)
+        batcher.add(self.ctxt, 'topic', specs[1], {})
+
+        scheduler_rpcapi.create_volumes.assert_called_once_with(
+            self.ctxt, 'topic', specs[:2], [{}, {}])
+        mock_spawn_after.return_value.cancel.assert_called_once_with()
+        batcher.add(self.ctxt, 'topic', specs[2], {})
+        self.assertEqual(2, mock_spawn_after.call_count)
+
+    @mock.patch('oslo_utils.timeutils.utcnow')
+    @mock.patch('eventlet.spawn_after')
+    def test_scheduler_cast_batcher_window_expired(self, mock_spawn_after,
+                                                   mock_utcnow):
+        now = datetime.datetime(2015, 1, 1)
+        mock_utcnow.side_effect = [now, now, now + datetime.timedelta(
+            seconds=1)]
+        scheduler_rpcapi = mock.Mock()
+        batcher = create_volume.SchedulerCastBatcher(scheduler_rpcapi,
+                                                     mock.Mock(), 1)
+        specs = [self._request_spec('fake-id%d' % i) for i in range(2)]
+
+        batcher.add(self.ctxt, 'topic', specs[0], {})
+        self.assertFalse(scheduler_rpcapi.create_volumes.called)
+        batcher.add(self.ctxt, 'topic', specs[1], {})
+
+        scheduler_rpcapi.create_volumes.assert_called_once_with(
+            self.ctxt, 'topic', specs, [{}, {}])
+        self.assertEqual({}, batcher._batches)
+
+    @mock.patch('eventlet.spawn_after')
+    def test_scheduler_cast_batcher_flush(self, mock_spawn_after):
+        scheduler_rpcapi = mock.Mock()
+        scheduler_rpcapi.create_volume.side_effect = Exception
+        db = mock.Mock()
+        batcher = create_volume.SchedulerCastBatcher(scheduler_rpcapi, db,
+                                                     60)
+        other_ctxt = context.RequestContext('user', 'project')
+        batcher.add(self.ctxt, 'topic', self._request_spec(0), {})
+        batcher.add(other_ctxt, 'topic', self._request_spec(1), {})
+
+        batcher.flush()
+
+        self.assertEqual(2, scheduler_rpcapi.create_volume.call_count)
+        self.assertEqual(2, mock_spawn_after.return_value.cancel.call_count)
+        self.assertEqual({}, batcher._batches)
+        self.assertEqual([mock.call(self.ctxt, 0, {'status': 'error'}),
+                          mock.call(other_ctxt, 1, {'status': 'error'})],
+                         sorted(db.volume_update.call_args_list,
+                                key=lambda call: call[0][1]))
+
     @mock.patch('cinder.volume.volume_types.is_encrypted')
     @mock.patch('cinder.volume.flows.api.create_volume.'
                 'ExtractVolumeRequestTask.'
@@ -223,3 +342,149 @@ class CreateVolumeFlowManagerTestCase(test.TestCase):
                           volume, snapshot_obj.id)
         fake_driver.create_volume_from_snapshot.assert_called_once_with(
             volume, snapshot_obj)
+
+
+@mock.patch('cinder.volume.flows.manager.create_volume.'
+            'CreateVolumeFromSpecTask.'
+            '_handle_bootable_volume_glance_meta')
+@mock.patch('cinder.context.get_internal_tenant_context')
+class CreateVolumeFlowManagerImageCacheTestCase(test.TestCase):
+
+    def setUp(self):
+        super(CreateVolumeFlowManagerImageCacheTestCase, self).setUp()
+        self.ctxt = context.get_admin_context()
+        self.mock_db = mock.MagicMock()
+        self.mock_driver = mock.MagicMock()
+        self.mock_cache = mock.MagicMock()
+        self.mock_image_service = mock.MagicMock()
+        self.mock_driver.clone_image.return_value = (None, False)
+        self.internal_context = context.RequestContext('internal-user',
+                                                       'internal-project',
+                                                       is_admin=True)
+        self.volume = fake_volume.fake_db_volume()
+        self.image_id = 'c905cedb-7281-47e4-8a62-f26bc5fc4c77'
+        self.image_meta = {'updated_at': '2015-10-13T00:00:00Z'}
+        self.task = create_volume_manager.CreateVolumeFromSpecTask(
+            self.mock_db, self.mock_driver,
+            image_volume_cache=self.mock_cache)
+
+    def _create_from_image(self):
+        return self.task._create_from_image(self.ctxt, self.volume,
+                                            'location', self.image_id,
+                                            self.image_meta,
+                                            self.mock_image_service)
+
+    def test_create_from_image_cache_hit(self, mock_get_internal_context,
+                                         mock_handle_bootable):
+        mock_get_internal_context.return_value = self.internal_context
+        image_volume = fake_volume.fake_db_volume(id='image-volume-id')
+        self.mock_cache.get_entry.return_value = {'volume_id': 'image-vol-id'}
+        self.mock_db.volume_get.return_value = image_volume
+
+        model_update = self._create_from_image()
+
+        self.mock_cache.get_entry.assert_called_once_with(
+            self.internal_context, self.volume, self.image_id,
+            self.image_meta)
+        self.mock_db.volume_get.assert_called_once_with(self.ctxt,
+                                                        'image-vol-id')
+        self.mock_driver.create_cloned_volume.assert_called_once_with(
+            self.volume, image_volume)
+        self.assertEqual(self.mock_driver.create_cloned_volume.return_value,
+                         model_update)
+        self.assertFalse(self.mock_driver.create_volume.called)
+        self.assertFalse(self.mock_driver.copy_image_to_volume.called)
+        self.assertFalse(self.mock_cache.create_cache_entry.called)
+        mock_handle_bootable.assert_called_once_with(
+            self.ctxt, self.volume['id'], image_id=self.image_id,
+            image_meta=self.image_meta)
+
+    @mock.patch('cinder.volume.flows.manager.create_volume.QUOTAS')
+    def test_create_from_image_cache_miss(self, mock_quotas,
+                                          mock_get_internal_context,
+                                          mock_handle_bootable):
+        mock_get_internal_context.return_value = self.internal_context
+        self.mock_cache.get_entry.return_value = None
+        self.mock_cache.ensure_space.return_value = True
+        self.mock_db.volume_update.side_effect = (
+            lambda ctxt, volume_id, updates: dict(self.volume, **updates))
+        image_volume = fake_volume.fake_db_volume(id='image-volume-id',
+                                                  status='creating')
+        self.mock_db.volume_create.return_value = image_volume
+
+        self._create_from_image()
+
+        self.mock_driver.create_volume.assert_called_once_with(self.volume)
+        self.mock_driver.copy_image_to_volume.assert_called_once_with(
+            self.ctxt, mock.ANY, self.mock_image_service, self.image_id)
+        self.mock_cache.ensure_space.assert_called_once_with(
+            self.internal_context, self.volume['size'], self.volume['host'])
+        values = self.mock_db.volume_create.call_args[0][1]
+        self.assertEqual('internal-project', values['project_id'])
+        self.assertEqual(self.volume['host'], values['host'])
+        self.assertEqual('image-%s' % self.image_id, values['display_name'])
+        self.mock_driver.create_cloned_volume.assert_called_once_with(
+            image_volume, mock.ANY)
+        mock_quotas.commit.assert_called_once_with(
+            self.internal_context, mock_quotas.reserve.return_value)
+        self.mock_cache.create_cache_entry.assert_called_once_with(
+            self.internal_context, mock.ANY, self.image_id, self.image_meta)
+
+    def test_create_from_image_cache_miss_no_space(self,
+                                                   mock_get_internal_context,
+                                                   mock_handle_bootable):
+        mock_get_internal_context.return_value = self.internal_context
+        self.mock_cache.get_entry.return_value = None
+        self.mock_cache.ensure_space.return_value = False
+
+        self._create_from_image()
+
+        self.mock_driver.create_volume.assert_called_once_with(self.volume)
+        self.assertFalse(self.mock_db.volume_create.called)
+        self.assertFalse(self.mock_driver.create_cloned_volume.called)
+        self.assertFalse(self.mock_cache.create_cache_entry.called)
+
+    @mock.patch('cinder.volume.flows.manager.create_volume.QUOTAS')
+    def test_create_from_image_cache_entry_failure(self, mock_quotas,
+                                                   mock_get_internal_context,
+                                                   mock_handle_bootable):
+        mock_get_internal_context.return_value = self.internal_context
+        self.mock_cache.get_entry.return_value = None
+        self.mock_cache.ensure_space.return_value = True
+        image_volume = fake_volume.fake_db_volume(id='image-volume-id',
+                                                  status='creating')
+        self.mock_db.volume_create.return_value = image_volume
+        self.mock_driver.create_cloned_volume.side_effect = (
+            exception.CinderException)
+
+        self._create_from_image()
+
+        self.mock_driver.copy_image_to_volume.assert_called_once_with(
+            self.ctxt, mock.ANY, self.mock_image_service, self.image_id)
+        mock_quotas.rollback.assert_called_once_with(
+            self.internal_context, mock_quotas.reserve.return_value)
+        self.mock_db.volume_update.assert_called_with(
+            self.internal_context, 'image-volume-id', {'status': 'error'})
+        self.assertFalse(self.mock_cache.create_cache_entry.called)
+
+    def test_create_from_image_no_internal_context(self,
+                                                   mock_get_internal_context,
+                                                   mock_handle_bootable):
+        mock_get_internal_context.return_value = None
+
+        self._create_from_image()
+
+        self.assertFalse(self.mock_cache.get_entry.called)
+        self.mock_driver.create_volume.assert_called_once_with(self.volume)
+        self.assertFalse(self.mock_cache.ensure_space.called)
+
+    def test_create_from_image_clone_image(self, mock_get_internal_context,
+                                           mock_handle_bootable):
+        self.mock_driver.clone_image.return_value = ({'fake': 'update'},
+                                                     True)
+
+        model_update = self._create_from_image()
+
+        self.assertEqual({'fake': 'update'}, model_update)
+        self.assertFalse(mock_get_internal_context.called)
+        self.assertFalse(self.mock_cache.get_entry.called)
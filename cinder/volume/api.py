@@ -17,6 +17,7 @@
 """Handles all requests relating to volumes."""
 
 
+import atexit
 import collections
 import datetime
 import functools
@@ -72,10 +73,26 @@ az_cache_time_opt = cfg.IntOpt('az_cache_duration',
                                     'seconds')
 
 CONF = cfg.CONF
+create_volume_batch_window_opt = cfg.FloatOpt(
+    'create_volume_batch_window',
+    default=0.0,
+    help='Seconds during which the volumes a user creates through the '
+         'scheduler are queued, to be scheduled together in one batch. '
+         'The queue only lives in the memory of the API worker and relies '
+         'on eventlet timers, so only set it for API workers served by '
+         'eventlet. 0 casts each volume to the scheduler right away.')
+create_volume_batch_size_opt = cfg.IntOpt(
+    'create_volume_batch_size',
+    default=100,
+    help='Maximum number of volumes in a batch, a full batch is cast to '
+         'the scheduler without waiting for create_volume_batch_window.')
+
 CONF.register_opt(allow_force_upload)
 CONF.register_opt(volume_host_opt)
 CONF.register_opt(volume_same_az_opt)
 CONF.register_opt(az_cache_time_opt)
+CONF.register_opt(create_volume_batch_window_opt)
+CONF.register_opt(create_volume_batch_size_opt)
 
 CONF.import_opt('glance_core_properties', 'cinder.image.glance')
 
@@ -125,6 +142,14 @@ class API(base.Base):
         self.availability_zones_last_fetched = None
         self.key_manager = keymgr.API()
         super(API, self).__init__(db_driver)
+        self.scheduler_cast_batcher = None
+        if CONF.create_volume_batch_window > 0:
+            self.scheduler_cast_batcher = create_volume.SchedulerCastBatcher(
+                self.scheduler_rpcapi, self.db,
+                CONF.create_volume_batch_window,
+                CONF.create_volume_batch_size)
+            # Cast the volumes still queued when the worker shuts down.
+            atexit.register(self.scheduler_cast_batcher.flush)
 
     def list_availability_zones(self, enable_cache=False):
         """Describe the known availability zones
@@ -286,7 +311,8 @@ class API(base.Base):
                                                  availability_zones,
                                                  create_what,
                                                  sched_rpcapi,
-                                                 volume_rpcapi)
+                                                 volume_rpcapi,
+                                                 self.scheduler_cast_batcher)
         except Exception:
             msg = _('Failed to create api volume flow.')
             LOG.exception(msg)
@@ -442,7 +468,7 @@ class API(base.Base):
 
     def get_all(self, context, marker=None, limit=None, sort_keys=None,
                 sort_dirs=None, filters=None, viewable_admin_meta=False,
-                offset=None):
+                offset=None, columns=None):
         check_policy(context, 'get_all')
 
         if filters is None:
@@ -477,7 +503,8 @@ class API(base.Base):
                                              sort_keys=sort_keys,
                                              sort_dirs=sort_dirs,
                                              filters=filters,
-                                             offset=offset)
+                                             offset=offset,
+                                             columns=columns)
         else:
             if viewable_admin_meta:
                 context = context.elevated()
@@ -487,7 +514,8 @@ class API(base.Base):
                                                         sort_keys=sort_keys,
                                                         sort_dirs=sort_dirs,
                                                         filters=filters,
-                                                        offset=offset)
+                                                        offset=offset,
+                                                        columns=columns)
 
         LOG.info(_LI("Get all volumes completed successfully."))
         return volumes
@@ -508,7 +536,9 @@ class API(base.Base):
         LOG.info(_LI("Volume retrieved successfully."), resource=vref)
         return dict(vref)
 
-    def get_all_snapshots(self, context, search_opts=None):
+    def get_all_snapshots(self, context, search_opts=None, marker=None,
+                          limit=None, sort_keys=None, sort_dirs=None,
+                          offset=None):
         check_policy(context, 'get_all_snapshots')
 
         search_opts = search_opts or {}
@@ -516,11 +546,14 @@ class API(base.Base):
         if (context.is_admin and 'all_tenants' in search_opts):
             # Need to remove all_tenants to pass the filtering below.
             del search_opts['all_tenants']
-            snapshots = objects.SnapshotList.get_all(context,
-                                                     search_opts)
+            snapshots = objects.SnapshotList.get_all(
+                context, search_opts, marker=marker, limit=limit,
+                sort_keys=sort_keys, sort_dirs=sort_dirs, offset=offset)
         else:
             snapshots = objects.SnapshotList.get_all_by_project(
-                context, context.project_id, search_opts)
+                context, context.project_id, search_opts, marker=marker,
+                limit=limit, sort_keys=sort_keys, sort_dirs=sort_dirs,
+                offset=offset)
 
         LOG.info(_LI("Get all snaphsots completed successfully."))
         return snapshots
@@ -1115,6 +1148,16 @@ class API(base.Base):
                                                      meta_entry['value']})
         return results
 
+    def get_list_volumes_image_metadata(self, context, volume_id_list):
+        check_policy(context, 'get_volumes_image_metadata')
+        db_data = self.db.volume_glance_metadata_list_get(context,
+                                                          volume_id_list)
+        results = collections.defaultdict(dict)
+        for meta_entry in db_data:
+            results[meta_entry['volume_id']].update({meta_entry['key']:
+                                                     meta_entry['value']})
+        return results
+
     @wrap_check_policy
     def get_volume_image_metadata(self, context, volume):
         db_data = self.db.volume_glance_metadata_get(context, volume['id'])
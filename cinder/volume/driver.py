@@ -130,6 +130,14 @@ volume_opts = [
                default=0,
                help='The upper limit of bandwidth of volume copy. '
                     '0 => unlimited'),
+    cfg.StrOpt('volume_copy_engine',
+               default='dd',
+               choices=['dd', 'native'],
+               help='The engine used to copy/clear volumes: dd spawns dd '
+                    'through rootwrap, native copies in the volume service '
+                    'with direct I/O, skipping the unallocated regions of '
+                    'file sources. dd is still used when the copy is '
+                    'throttled with a blkio cgroup or run with ionice.'),
     cfg.StrOpt('iscsi_write_cache',
                default='on',
                choices=['on', 'off'],
@@ -220,6 +228,18 @@ volume_opts = [
                 help='List of options that control which trace info '
                      'is written to the DEBUG log level to assist '
                      'developers. Valid values are method and api.'),
+    cfg.BoolOpt('image_volume_cache_enabled',
+                default=False,
+                help='Enable the image volume cache for this backend. The '
+                     'Cinder internal tenant must be configured.'),
+    cfg.IntOpt('image_volume_cache_max_size_gb',
+               default=0,
+               help='Max size of the image volume cache for this backend in '
+                    'GB. 0 => unlimited.'),
+    cfg.IntOpt('image_volume_cache_max_count',
+               default=0,
+               help='Max number of entries allowed in the image volume cache. '
+                    '0 => unlimited.'),
 ]
 
 # for backward compatibility
@@ -583,13 +603,17 @@ class BaseVD(object):
         copy_error = True
         try:
             size_in_mb = int(src_vol['size']) * 1024    # vol size is in GB
+            src_path = src_attach_info['device']['path']
+            dest_path = dest_attach_info['device']['path']
             volume_utils.copy_volume(
-                src_attach_info['device']['path'],
-                dest_attach_info['device']['path'],
+                src_path,
+                dest_path,
                 size_in_mb,
                 self.configuration.volume_dd_blocksize,
                 throttle=self._throttle,
-                sparse=self._sparse_copy_volume_data)
+                sparse=self._sparse_copy_volume_data,
+                progress_callback=volume_utils.CopyProgressLogger(
+                    src_path, dest_path))
             copy_error = False
         except Exception:
             with excutils.save_and_reraise_exception():
@@ -434,12 +434,15 @@ class LVMVolumeDriver(driver.VolumeDriver):
 
     def copy_image_to_volume(self, context, volume, image_service, image_id):
         """Fetch the image from image_service and write it to the volume."""
+        # A new thin volume reads back as zeros, the zero blocks of the image
+        # do not need to be written.
         image_utils.fetch_to_raw(context,
                                  image_service,
                                  image_id,
                                  self.local_path(volume),
                                  self.configuration.volume_dd_blocksize,
-                                 size=volume['size'])
+                                 size=volume['size'],
+                                 sparse=self.configuration.lvm_type == 'thin')
 
     def copy_volume_to_image(self, context, volume, image_service, image_meta):
         """Copy the volume to the specified image."""
@@ -644,12 +647,17 @@ class LVMVolumeDriver(driver.VolumeDriver):
             # copy_volume expects sizes in MiB, we store integer GiB
             # be sure to convert before passing in
             size_in_mb = int(volume['size']) * units.Ki
-            volutils.copy_volume(self.local_path(volume),
-                                 self.local_path(volume, vg=dest_vg),
-                                 size_in_mb,
-                                 self.configuration.volume_dd_blocksize,
-                                 execute=self._execute,
-                                 sparse=self.sparse_copy_volume)
+            src_path = self.local_path(volume)
+            dest_path = self.local_path(volume, vg=dest_vg)
+            volutils.copy_volume(
+                src_path,
+                dest_path,
+                size_in_mb,
+                self.configuration.volume_dd_blocksize,
+                execute=self._execute,
+                sparse=self.sparse_copy_volume,
+                progress_callback=volutils.CopyProgressLogger(src_path,
+                                                              dest_path))
             self._delete_volume(volume)
 
             return (True, None)
@@ -11,6 +11,7 @@
 #    under the License.
 
 
+import eventlet
 from oslo_config import cfg
 from oslo_log import log as logging
 from oslo_utils import timeutils
@@ -652,6 +653,74 @@ class QuotaCommitTask(flow_utils.CinderTask):
                               "volume: %s"), volume['id'])
 
 
+class SchedulerCastBatcher(object):
+    """Casts the volumes created in a burst to the scheduler in batches.
+
+    The volumes a user creates within window seconds are cast together,
+    the scheduler then refreshes its host states once and filters the
+    volumes of the same shape once for the whole batch.
+
+    A batch is cast by a timer once its window expires, and by the request
+    adding to it once it is full or past its window, so a full batch does
+    not wait on the timer.
+    """
+
+    def __init__(self, scheduler_rpcapi, db, window, size=None):
+        self.scheduler_rpcapi = scheduler_rpcapi
+        self.db = db
+        self.window = window
+        self.size = size
+        self._batches = {}
+
+    def add(self, context, topic, request_spec, filter_properties):
+        key = (topic, context.project_id, context.user_id)
+        batch = self._batches.get(key)
+        if batch is None:
+            timer = eventlet.spawn_after(self.window, self._cast, key)
+            batch = self._batches[key] = (context, [], [],
+                                          timeutils.utcnow(), timer)
+        batch[1].append(request_spec)
+        batch[2].append(filter_properties)
+        if ((self.size and len(batch[1]) >= self.size) or
+                timeutils.delta_seconds(batch[3], timeutils.utcnow()) >=
+                self.window):
+            batch[4].cancel()
+            self._cast(key)
+
+    def flush(self):
+        """Casts all the pending batches right away."""
+        for key in list(self._batches):
+            self._batches[key][4].cancel()
+            self._cast(key)
+
+    def _cast(self, key):
+        context, request_specs, filter_properties_list = (
+            self._batches.pop(key)[:3])
+        try:
+            if len(request_specs) == 1:
+                request_spec = request_specs[0]
+                self.scheduler_rpcapi.create_volume(
+                    context,
+                    key[0],
+                    request_spec['volume_id'],
+                    snapshot_id=request_spec['snapshot_id'],
+                    image_id=request_spec['image_id'],
+                    request_spec=request_spec,
+                    filter_properties=filter_properties_list[0])
+            else:
+                self.scheduler_rpcapi.create_volumes(context, key[0],
+                                                     request_specs,
+                                                     filter_properties_list)
+        except Exception:
+            volume_ids = [spec['volume_id'] for spec in request_specs]
+            LOG.exception(_LE('Failed to cast volumes %s to the '
+                              'scheduler.'), volume_ids)
+            # The api flow is over, nothing else reverts the volumes.
+            for volume_id in volume_ids:
+                self.db.volume_update(context, volume_id,
+                                      {'status': 'error'})
+
+
 class VolumeCastTask(flow_utils.CinderTask):
     """Performs a volume create cast to the scheduler or to the volume manager.
 
@@ -662,7 +731,8 @@ class VolumeCastTask(flow_utils.CinderTask):
     created volume.
     """
 
-    def __init__(self, scheduler_rpcapi, volume_rpcapi, db):
+    def __init__(self, scheduler_rpcapi, volume_rpcapi, db,
+                 scheduler_cast_batcher=None):
         requires = ['image_id', 'scheduler_hints', 'snapshot_id',
                     'source_volid', 'volume_id', 'volume_type',
                     'volume_properties', 'source_replicaid',
@@ -671,6 +741,7 @@ class VolumeCastTask(flow_utils.CinderTask):
                                              requires=requires)
         self.volume_rpcapi = volume_rpcapi
         self.scheduler_rpcapi = scheduler_rpcapi
+        self.scheduler_cast_batcher = scheduler_cast_batcher
         self.db = db
 
     def _cast_create_volume(self, context, request_spec, filter_properties):
@@ -703,7 +774,12 @@ class VolumeCastTask(flow_utils.CinderTask):
             source_volume_ref = self.db.volume_get(context, source_replicaid)
             host = source_volume_ref['host']
 
-        if not host:
+        if not host and self.scheduler_cast_batcher:
+            # Let the scheduler place this volume along with the others
+            # created by the user in the meantime.
+            self.scheduler_cast_batcher.add(context, CONF.volume_topic,
+                                            request_spec, filter_properties)
+        elif not host:
             # Cast to the scheduler and let it handle whatever is needed
             # to select the target host for this volume.
             self.scheduler_rpcapi.create_volume(
@@ -753,7 +829,8 @@ class VolumeCastTask(flow_utils.CinderTask):
 
 
 def get_flow(db_api, image_service_api, availability_zones, create_what,
-             scheduler_rpcapi=None, volume_rpcapi=None):
+             scheduler_rpcapi=None, volume_rpcapi=None,
+             scheduler_cast_batcher=None):
     """Constructs and returns the api entrypoint flow.
 
     This flow will do the following:
@@ -782,7 +859,8 @@ def get_flow(db_api, image_service_api, availability_zones, create_what,
     if scheduler_rpcapi and volume_rpcapi:
         # This will cast it out to either the scheduler or volume manager via
         # the rpc apis provided.
-        api_flow.add(VolumeCastTask(scheduler_rpcapi, volume_rpcapi, db_api))
+        api_flow.add(VolumeCastTask(scheduler_rpcapi, volume_rpcapi, db_api,
+                                    scheduler_cast_batcher))
 
     # Now load (but do not run) the flow using the provided initial data.
     return taskflow.engines.load(api_flow, store=create_what)
@@ -20,16 +20,19 @@ import taskflow.engines
 from taskflow.patterns import linear_flow
 from taskflow.types import failure as ft
 
+from cinder import context as cinder_context
 from cinder import exception
 from cinder import flow_utils
-from cinder.i18n import _, _LE, _LI
+from cinder.i18n import _, _LE, _LI, _LW
 from cinder.image import glance
 from cinder import objects
+from cinder import quota
 from cinder import utils
 from cinder.volume.flows import common
 from cinder.volume import utils as volume_utils
 
 LOG = logging.getLogger(__name__)
+QUOTAS = quota.QUOTAS
 
 ACTION = 'volume:create'
 CONF = cfg.CONF
@@ -350,10 +353,11 @@ class CreateVolumeFromSpecTask(flow_utils.CinderTask):
 
     default_provides = 'volume'
 
-    def __init__(self, db, driver):
+    def __init__(self, db, driver, image_volume_cache=None):
         super(CreateVolumeFromSpecTask, self).__init__(addons=[ACTION])
         self.db = db
         self.driver = driver
+        self.image_volume_cache = image_volume_cache
 
     def _handle_bootable_volume_glance_meta(self, context, volume_id,
                                             **kwargs):
@@ -570,6 +574,97 @@ class CreateVolumeFromSpecTask(flow_utils.CinderTask):
         self.db.volume_glance_metadata_bulk_create(context, volume_id,
                                                    volume_metadata)
 
+    def _create_from_image_cache(self, context, internal_context,
+                                 volume_ref, image_id, image_meta):
+        """Attempt to create the volume using the image cache.
+
+        Best case this will simply clone the existing volume in the cache.
+        Worst case the image is out of date and will be evicted. In that case
+        a clone will not be created and the image must be downloaded again.
+        """
+        LOG.debug('Attempting to retrieve cache entry for image = '
+                  '%(image_id)s on host %(host)s.',
+                  {'image_id': image_id, 'host': volume_ref['host']})
+        try:
+            cache_entry = self.image_volume_cache.get_entry(internal_context,
+                                                            volume_ref,
+                                                            image_id,
+                                                            image_meta)
+            if cache_entry:
+                LOG.debug('Creating from source image-volume %(volume_id)s',
+                          {'volume_id': cache_entry['volume_id']})
+                image_volume = self.db.volume_get(context,
+                                                  cache_entry['volume_id'])
+                model_update = self.driver.create_cloned_volume(volume_ref,
+                                                                image_volume)
+                return model_update, True
+        except NotImplementedError:
+            LOG.warning(_LW('Backend does not support creating image-volume '
+                            'clone. Image will be downloaded from Glance.'))
+        return None, False
+
+    def _create_image_cache_volume_entry(self, internal_context, volume_ref,
+                                         image_id, image_meta):
+        """Create a new image-volume and cache entry for it.
+
+        The image-volume is a clone of the freshly downloaded volume owned
+        by the internal tenant. Failures are only logged, the volume being
+        created does not depend on the cache.
+        """
+        image_volume = None
+        reservations = None
+        try:
+            if not self.image_volume_cache.ensure_space(
+                    internal_context,
+                    volume_ref['size'],
+                    volume_ref['host']):
+                LOG.warning(_LW('Unable to ensure space for image-volume in '
+                                'cache. Will skip creating entry for image '
+                                '%(image)s on host %(host)s.'),
+                            {'image': image_id, 'host': volume_ref['host']})
+                return
+
+            reserve_opts = {'volumes': 1, 'gigabytes': volume_ref['size']}
+            QUOTAS.add_volume_type_opts(internal_context,
+                                        reserve_opts,
+                                        volume_ref['volume_type_id'])
+            reservations = QUOTAS.reserve(internal_context, **reserve_opts)
+
+            image_volume = self.db.volume_create(internal_context, {
+                'size': volume_ref['size'],
+                'user_id': internal_context.user_id,
+                'project_id': internal_context.project_id,
+                'status': 'creating',
+                'attach_status': 'detached',
+                'availability_zone': volume_ref['availability_zone'],
+                'host': volume_ref['host'],
+                'volume_type_id': volume_ref['volume_type_id'],
+                'display_name': 'image-%s' % image_id,
+                'bootable': True,
+            })
+            model_update = self.driver.create_cloned_volume(image_volume,
+                                                            volume_ref)
+            updates = dict(model_update or dict(), status='available',
+                           launched_at=timeutils.utcnow())
+            image_volume = self.db.volume_update(internal_context,
+                                                 image_volume['id'],
+                                                 updates)
+            QUOTAS.commit(internal_context, reservations)
+            reservations = None
+
+            self.image_volume_cache.create_cache_entry(internal_context,
+                                                       image_volume,
+                                                       image_id,
+                                                       image_meta)
+        except Exception as ex:
+            LOG.warning(_LW('Failed to create new image-volume cache entry.'
+                            ' Error: %(exception)s'), {'exception': ex})
+            if reservations:
+                QUOTAS.rollback(internal_context, reservations)
+            if image_volume and image_volume['status'] != 'available':
+                self.db.volume_update(internal_context, image_volume['id'],
+                                      {'status': 'error'})
+
     def _create_from_image(self, context, volume_ref,
                            image_location, image_id, image_meta,
                            image_service, **kwargs):
@@ -587,6 +682,26 @@ class CreateVolumeFromSpecTask(flow_utils.CinderTask):
                                                        image_location,
                                                        image_meta,
                                                        image_service)
+
+        # Try and clone the volume from an image-volume of the cache when
+        # the driver could not clone the image itself.
+        should_create_cache_entry = False
+        internal_context = None
+        if not cloned and self.image_volume_cache:
+            internal_context = cinder_context.get_internal_tenant_context()
+            if internal_context:
+                model_update, cloned = self._create_from_image_cache(
+                    context,
+                    internal_context,
+                    volume_ref,
+                    image_id,
+                    image_meta
+                )
+                should_create_cache_entry = not cloned
+            else:
+                LOG.warning(_LW('Unable to get Cinder internal context, will '
+                                'not use image-volume cache.'))
+
         if not cloned:
             # TODO(harlowja): what needs to be rolled back in the clone if this
             # volume create fails?? Likely this should be a subflow or broken
@@ -609,6 +724,12 @@ class CreateVolumeFromSpecTask(flow_utils.CinderTask):
             self._copy_image_to_volume(context, volume_ref,
                                        image_id, image_location, image_service)
 
+            if should_create_cache_entry:
+                self._create_image_cache_volume_entry(internal_context,
+                                                      volume_ref,
+                                                      image_id,
+                                                      image_meta)
+
         self._handle_bootable_volume_glance_meta(context, volume_ref['id'],
                                                  image_id=image_id,
                                                  image_meta=image_meta)
@@ -719,7 +840,7 @@ class CreateVolumeOnFinishTask(NotifyVolumeActionTask):
 
 def get_flow(context, db, driver, scheduler_rpcapi, host, volume_id,
              allow_reschedule, reschedule_context, request_spec,
-             filter_properties):
+             filter_properties, image_volume_cache=None):
     """Constructs and returns the manager entrypoint flow.
 
     This flow will do the following:
@@ -765,7 +886,8 @@ def get_flow(context, db, driver, scheduler_rpcapi, host, volume_id,
 
     volume_flow.add(ExtractVolumeSpecTask(db),
                     NotifyVolumeActionTask(db, "create.start"),
-                    CreateVolumeFromSpecTask(db, driver),
+                    CreateVolumeFromSpecTask(db, driver,
+                                             image_volume_cache),
                     CreateVolumeOnFinishTask(db, "create.end"))
 
     # Now load (but do not run) the flow using the provided initial data.
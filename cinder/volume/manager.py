@@ -57,11 +57,13 @@ from cinder import context
 from cinder import exception
 from cinder import flow_utils
 from cinder.i18n import _, _LE, _LI, _LW
+from cinder.image import cache as image_cache
 from cinder.image import glance
 from cinder import manager
 from cinder import objects
 from cinder import quota
 from cinder import utils
+from cinder import volume as cinder_volume
 from cinder.volume import configuration as config
 from cinder.volume.flows.manager import create_volume
 from cinder.volume.flows.manager import manage_existing
@@ -235,6 +237,21 @@ class VolumeManager(manager.SchedulerDependentManager):
                 LOG.error(_LE("Invalid JSON: %s"),
                           self.driver.configuration.extra_capabilities)
 
+        self.image_volume_cache = None
+        if self.driver.configuration.safe_get('image_volume_cache_enabled'):
+            max_cache_size = self.driver.configuration.safe_get(
+                'image_volume_cache_max_size_gb')
+            max_cache_entries = self.driver.configuration.safe_get(
+                'image_volume_cache_max_count')
+            self.image_volume_cache = image_cache.ImageVolumeCache(
+                self.db,
+                cinder_volume.API(),
+                max_cache_size,
+                max_cache_entries
+            )
+            LOG.info(_LI('Image-volume cache enabled for host %(host)s.'),
+                     {'host': self.host})
+
     def _add_to_threadpool(self, func, *args, **kwargs):
         self._tp.spawn_n(func, *args, **kwargs)
 
@@ -430,7 +447,8 @@ class VolumeManager(manager.SchedulerDependentManager):
                 allow_reschedule,
                 context,
                 request_spec,
-                filter_properties)
+                filter_properties,
+                image_volume_cache=self.image_volume_cache)
         except Exception:
             msg = _("Create manager volume flow failed.")
             LOG.exception(msg, resource={'type': 'volume', 'id': volume_id})
@@ -544,6 +562,15 @@ class VolumeManager(manager.SchedulerDependentManager):
         is_migrating_dest = (is_migrating and
                              volume_ref['migration_status'].startswith(
                                  'target:'))
+
+        # Stop cloning new volumes from an image-volume of the cache before
+        # it goes away.
+        if self.image_volume_cache:
+            cache_entry = self.image_volume_cache.get_by_image_volume(
+                context, volume_id)
+            if cache_entry:
+                self.image_volume_cache.evict(context, cache_entry)
+
         self._notify_about_volume_usage(context, volume_ref, "delete.start")
         try:
             # NOTE(flaper87): Verify the driver is enabled
@@ -15,11 +15,20 @@
 """Volume-related Utilities and helpers."""
 
 
+import contextlib
+import errno
+import fcntl
+import io
 import math
+import mmap
+import os
 import re
+import stat
 import uuid
 
 from Crypto.Random import random
+import eventlet
+from eventlet import tpool
 from oslo_concurrency import processutils
 from oslo_config import cfg
 from oslo_log import log as logging
@@ -332,6 +341,10 @@ def _copy_volume(prefix, srcstr, deststr, size_in_m, blocksize, sync=False,
     # Perform the copy
     start_time = timeutils.utcnow()
     execute(*cmd, run_as_root=True)
+    _log_copy_stats(srcstr, deststr, size_in_m, start_time)
+
+
+def _log_copy_stats(srcstr, deststr, size_in_m, start_time):
     duration = timeutils.delta_seconds(start_time, timeutils.utcnow())
 
     # NOTE(jdg): use a default of 1, mostly for unit test, but in
@@ -349,20 +362,224 @@ def _copy_volume(prefix, srcstr, deststr, size_in_m, blocksize, sync=False,
              {'size_in_m': size_in_m, 'mbps': mbps})
 
 
+# Linux values, os.SEEK_DATA only exists from Python 3.3.
+SEEK_DATA = getattr(os, 'SEEK_DATA', 3)
+O_DIRECT = getattr(os, 'O_DIRECT', 0)
+
+
+@contextlib.contextmanager
+def _volume_file_access(path, mode):
+    """Temporarily own path if the volume service can't access it."""
+    if os.path.exists(path) and not os.access(path, mode):
+        with utils.temporary_chown(path):
+            yield
+    else:
+        yield
+
+
+def _open_volume_file(path, flags, direct):
+    """Open path, with O_DIRECT if requested and supported by the path.
+
+    :returns: a tuple of the file descriptor and whether it uses O_DIRECT
+    """
+    if direct:
+        try:
+            return os.open(path, flags | O_DIRECT), True
+        except OSError as e:
+            if e.errno != errno.EINVAL:
+                raise
+    return os.open(path, flags), False
+
+
+def _next_data_offset(fd, offset, end):
+    """Return the offset of the first data at or after offset in fd."""
+    try:
+        return os.lseek(fd, offset, SEEK_DATA)
+    except OSError as e:
+        # ENXIO: only a hole remains up to the end of the file.
+        if e.errno == errno.ENXIO:
+            return end
+        raise
+
+
+def _read_block(src, buf, offset):
+    src.seek(offset)
+    return src.readinto(buf)
+
+
+def _write_block(dest, buf, offset, length, direct):
+    dest.seek(offset)
+    if length == len(buf):
+        data = buf
+    else:
+        # The buffer is aligned but the partial block at the end of the
+        # copy is not, so it is written through the page cache.
+        if direct:
+            flags = fcntl.fcntl(dest.fileno(), fcntl.F_GETFL)
+            fcntl.fcntl(dest.fileno(), fcntl.F_SETFL, flags & ~O_DIRECT)
+        data = buf[:length]
+    written = dest.write(data)
+    while written < length:
+        written += dest.write(buf[written:length])
+
+
+def _copy_volume_native(srcstr, deststr, size_in_m, blocksize, sync=False,
+                        sparse=False, progress_callback=None):
+    """Copy a volume within the volume service instead of spawning dd.
+
+    The data is copied in blocks of blocksize through two page aligned
+    buffers, so O_DIRECT can be used: a block is read in a native thread
+    while the previous block is written in another one. Unallocated
+    regions of a regular file source are not read, and with sparse the
+    blocks holding only zeros are not written, like dd conv=sparse does.
+
+    :param progress_callback: called with the bytes copied so far and the
+                              total bytes to copy after each block
+    """
+    blocksize, count = _calculate_count(size_in_m, blocksize)
+    bs = strutils.string_to_bytes('%sB' % blocksize, return_int=True)
+    direct = bool(O_DIRECT) and bs % mmap.PAGESIZE == 0
+
+    start_time = timeutils.utcnow()
+    with _volume_file_access(srcstr, os.R_OK), \
+            _volume_file_access(deststr, os.W_OK):
+        _copy_volume_blocks(srcstr, deststr, bs, bs * count, direct,
+                            sync, sparse, progress_callback)
+    _log_copy_stats(srcstr, deststr, size_in_m, start_time)
+
+
+def _copy_volume_blocks(srcstr, deststr, bs, total, direct, sync, sparse,
+                        progress_callback):
+    src = dest = writer = None
+    bufs = [mmap.mmap(-1, bs), mmap.mmap(-1, bs)]
+    zero_buf = mmap.mmap(-1, bs)
+    zero_data = b'\0' * bs if sparse else None
+    try:
+        # /dev/zero is not read, the zeroed buffer is written instead.
+        if srcstr != '/dev/zero':
+            src_fd = _open_volume_file(srcstr, os.O_RDONLY, direct)[0]
+            src = io.FileIO(src_fd, 'r')
+        dest_fd, dest_direct = _open_volume_file(
+            deststr, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, direct)
+        dest = io.FileIO(dest_fd, 'w')
+
+        seek_data = False
+        if src is not None:
+            src_stat = os.fstat(src.fileno())
+            if stat.S_ISREG(src_stat.st_mode):
+                total = min(total, src_stat.st_size)
+                seek_data = True
+        data_offset = 0
+
+        offset = 0
+        write_buf = None
+        while offset < total:
+            length = min(bs, total - offset)
+            if seek_data and data_offset <= offset:
+                data_offset = _next_data_offset(src.fileno(), offset, total)
+
+            if src is None or offset + length <= data_offset:
+                buf = zero_buf
+            else:
+                # Read into the buffer not being written.
+                buf = bufs[1] if write_buf is bufs[0] else bufs[0]
+                length = min(length,
+                             tpool.execute(_read_block, src, buf, offset))
+                if length == 0:
+                    break
+
+            if not (sparse and (buf is zero_buf or
+                                buf[:length] == zero_data[:length])):
+                if writer is not None:
+                    writer.wait()
+                writer = eventlet.spawn(tpool.execute, _write_block, dest,
+                                        buf, offset, length, dest_direct)
+                write_buf = buf
+
+            offset += length
+            if progress_callback:
+                progress_callback(offset, total)
+
+        if writer is not None:
+            writer.wait()
+        # Skipping the zero blocks at the end of the copy would leave a
+        # file shorter than the source.
+        if (stat.S_ISREG(os.fstat(dest_fd).st_mode) and
+                os.fstat(dest_fd).st_size < offset):
+            os.ftruncate(dest_fd, offset)
+        if sync:
+            os.fdatasync(dest_fd)
+    finally:
+        if writer is not None:
+            try:
+                writer.wait()
+            except Exception:
+                # The copy has failed already, this only makes sure the
+                # buffer is not written anymore before releasing it.
+                pass
+        for f in (src, dest):
+            if f is not None:
+                f.close()
+        for buf in bufs + [zero_buf]:
+            buf.close()
+
+
+class CopyProgressLogger(object):
+    """Progress callback of copy_volume logging each tenth of the copy."""
+
+    def __init__(self, srcstr, deststr, steps=10):
+        self.srcstr = srcstr
+        self.deststr = deststr
+        self.steps = steps
+        self._next_step = 1
+
+    def __call__(self, copied, total):
+        if not total:
+            return
+        step = copied * self.steps // total
+        if step < self._next_step:
+            return
+        self._next_step = step + 1
+        LOG.info(_LI("Volume copy from %(src)s to %(dest)s %(percent)d%% "
+                     "done."),
+                 {'src': self.srcstr, 'dest': self.deststr,
+                  'percent': step * 100 // self.steps})
+
+
 def copy_volume(srcstr, deststr, size_in_m, blocksize, sync=False,
-                execute=utils.execute, ionice=None, throttle=None,
-                sparse=False):
+                execute=None, ionice=None, throttle=None,
+                sparse=False, progress_callback=None):
+    """Copy size_in_m MiB of srcstr to deststr.
+
+    The copy is done by dd unless volume_copy_engine is native. A copy
+    given an execute, throttled with a command prefix or run with ionice
+    is always done by dd.
+
+    :param progress_callback: called with the bytes copied and the total
+                              bytes to copy as the copy goes on
+    """
     if not throttle:
         throttle = throttling.Throttle.get_default()
     with throttle.subcommand(srcstr, deststr) as throttle_cmd:
+        if (CONF.volume_copy_engine == 'native' and execute is None and
+                not throttle_cmd['prefix'] and ionice is None):
+            _copy_volume_native(srcstr, deststr, size_in_m, blocksize,
+                                sync=sync, sparse=sparse,
+                                progress_callback=progress_callback)
+            return
+
         _copy_volume(throttle_cmd['prefix'], srcstr, deststr,
                      size_in_m, blocksize, sync=sync,
-                     execute=execute, ionice=ionice, sparse=sparse)
+                     execute=execute or utils.execute, ionice=ionice,
+                     sparse=sparse)
+    if progress_callback:
+        total = size_in_m * units.Mi
+        progress_callback(total, total)
 
 
 def clear_volume(volume_size, volume_path, volume_clear=None,
                  volume_clear_size=None, volume_clear_ionice=None,
-                 throttle=None):
+                 throttle=None, progress_callback=None):
     """Unprovision old volumes to prevent data leaking between users."""
     if volume_clear is None:
         volume_clear = CONF.volume_clear
@@ -381,11 +598,13 @@ def clear_volume(volume_size, volume_path, volume_clear=None,
     # We pass sparse=False explicitly here so that zero blocks are not
     # skipped in order to clear the volume.
     if volume_clear == 'zero':
+        if progress_callback is None:
+            progress_callback = CopyProgressLogger('/dev/zero', volume_path)
         return copy_volume('/dev/zero', volume_path, volume_clear_size,
                            CONF.volume_dd_blocksize,
-                           sync=True, execute=utils.execute,
-                           ionice=volume_clear_ionice,
-                           throttle=throttle, sparse=False)
+                           sync=True, ionice=volume_clear_ionice,
+                           throttle=throttle, sparse=False,
+                           progress_callback=progress_callback)
     elif volume_clear == 'shred':
         clear_cmd = ['shred', '-n3']
         if volume_clear_size: